@@ -0,0 +1,191 @@
+
+class ArrivalTimes:
+    """
+    Tracks the time each stop in a route plan is reached and how much slack remains before
+    the stop's deadline. Times are measured in hours since 8:00am, and vehicles are assumed to
+    drive at a constant speed.
+
+    A route leaves the hub at its scheduled departure time or when its last package reaches
+    the hub, whichever is later. For every route the class keeps arrival times along with prefix
+    and suffix minimums of deadline slack and prefix and suffix maximums of ready times. With
+    these, the effect of exchanging two stops between routes can be checked in O(1) time without
+    re-simulating either route. Exchanging stops within a route takes time proportional to the
+    distance between the two stops. Rebuilding a route after a swap is accepted is O(N).
+
+    Uses extra space proportional to N, the number of stops in the route plan.
+    """
+
+    def __init__(self, short_paths, routes):
+        """ Constructor
+        Worst case time complexity of O(1)
+
+        :param short_paths: shortest paths oracle with a dist(s, t) function
+        :param routes: Routes object holding time windows, departure times and vehicle speed
+        """
+        self.short_paths = short_paths
+        self.routes = routes
+        self.__depart = []
+        self.__arrive = []
+        self.__pre_slack = []
+        self.__suf_slack = []
+        self.__pre_ready = []
+        self.__suf_ready = []
+
+    def track(self, plan):
+        """ Build arrival times for every route in the plan
+        Worst case time complexity of O(N) where N is the number of stops in the route plan
+
+        :param plan: route plan
+        :return:
+        """
+        n_routes = len(plan)
+        self.__depart = [0] * n_routes
+        self.__arrive = [None] * n_routes
+        self.__pre_slack = [None] * n_routes
+        self.__suf_slack = [None] * n_routes
+        self.__pre_ready = [None] * n_routes
+        self.__suf_ready = [None] * n_routes
+        for i in range(n_routes):
+            self.update(plan, i)
+
+    def update(self, plan, i):
+        """ Rebuild arrival times for a route after it has changed
+        Worst case time complexity of O(N) where N is the number of stops in the route
+
+        :param plan: route plan
+        :param i: route index
+        :return:
+        """
+        route = plan[i]
+        n = len(route)
+        ready_times = self.routes.ready_times
+        due_times = self.routes.due_times
+        dist = self.short_paths.dist
+        mph = self.routes.mph
+        inf = float('inf')
+        # ready times fix the departure
+        pre_ready = [0] * n
+        suf_ready = [0] * n
+        latest = 0
+        for k in range(n):
+            latest = max(latest, ready_times.get(route[k], 0))
+            pre_ready[k] = latest
+        latest = 0
+        for k in range(n - 1, -1, -1):
+            latest = max(latest, ready_times.get(route[k], 0))
+            suf_ready[k] = latest
+        depart = max(self.routes.departure_times[i], pre_ready[n - 1] if n else 0)
+        # arrival times and slack
+        arrive = [depart] * n
+        slack = [inf] * n
+        for k in range(1, n):
+            arrive[k] = arrive[k - 1] + dist(route[k - 1], route[k]) / mph
+            slack[k] = due_times.get(route[k], inf) - arrive[k]
+        pre_slack = list(slack)
+        suf_slack = list(slack)
+        for k in range(1, n):
+            pre_slack[k] = min(pre_slack[k - 1], slack[k])
+        for k in range(n - 2, -1, -1):
+            suf_slack[k] = min(suf_slack[k + 1], slack[k])
+        self.__depart[i] = depart
+        self.__arrive[i] = arrive
+        self.__pre_slack[i] = pre_slack
+        self.__suf_slack[i] = suf_slack
+        self.__pre_ready[i] = pre_ready
+        self.__suf_ready[i] = suf_ready
+
+    def departure(self, i):
+        """ Returns the time route i leaves the hub
+        Worst case time complexity of O(1)
+
+        :param i: route index
+        :return: hours since 8:00am
+        """
+        return self.__depart[i]
+
+    def arrival(self, i, j):
+        """ Returns the time route i reaches its j-th stop
+        Worst case time complexity of O(1)
+
+        :param i: route index
+        :param j: index of stop in route
+        :return: hours since 8:00am
+        """
+        return self.__arrive[i][j]
+
+    def lateness(self, i):
+        """ Returns how late the latest stop in route i is reached, or 0 if every deadline is met
+        Worst case time complexity of O(1)
+
+        :param i: route index
+        :return: lateness in hours
+        """
+        slack = self.__pre_slack[i][-1] if self.__pre_slack[i] else float('inf')
+        return max(0, -slack)
+
+    def total_lateness(self):
+        """ Returns the sum of route lateness over all routes
+        Worst case time complexity of O(R) where R is the number of routes
+
+        :return: lateness in hours
+        """
+        return sum(self.lateness(i) for i in range(len(self.__arrive)))
+
+    def swap_lateness(self, plan, i, alt_i, j, alt_j):
+        """ Find the combined lateness of two routes before and after a potential swap
+        Worst case time complexity is O(1) for swaps between routes and O(|alt_j - j|)
+        for swaps within a route
+
+        :param plan: route plan
+        :param i: route index for first route
+        :param alt_i: route index for second route
+        :param j: index of location id in first route list
+        :param alt_j: index of location id in second route list
+        :return: lateness before swap, lateness after swap
+        """
+        if i == alt_i:
+            before = self.lateness(i)
+            return before, max(0, -self.__reorder_slack(plan, i, min(j, alt_j), max(j, alt_j)))
+        before = self.lateness(i) + self.lateness(alt_i)
+        after = (max(0, -self.__replace_slack(plan, i, j, plan[alt_i][alt_j])) +
+                 max(0, -self.__replace_slack(plan, alt_i, alt_j, plan[i][j])))
+        return before, after
+
+    def __replace_slack(self, plan, i, j, v):
+        """ Minimum slack of route i if its j-th stop were replaced by location v """
+        route = plan[i]
+        dist = self.short_paths.dist
+        mph = self.routes.mph
+        prev_v, old_v, next_v = route[j - 1], route[j], route[j + 1]
+        ready = max(self.routes.departure_times[i],
+                    self.__pre_ready[i][j - 1],
+                    self.__suf_ready[i][j + 1],
+                    self.routes.ready_times.get(v, 0))
+        shift = ready - self.__depart[i]
+        delta = (dist(prev_v, v) + dist(v, next_v) - dist(prev_v, old_v) - dist(old_v, next_v)) / mph
+        arrive_v = self.__arrive[i][j - 1] + shift + dist(prev_v, v) / mph
+        return min(self.__pre_slack[i][j - 1] - shift,
+                   self.routes.due_times.get(v, float('inf')) - arrive_v,
+                   self.__suf_slack[i][j + 1] - shift - delta)
+
+    def __reorder_slack(self, plan, i, j, alt_j):
+        """ Minimum slack of route i if its j-th and alt_j-th stops were exchanged """
+        route = plan[i]
+        if j == alt_j:
+            return self.__pre_slack[i][-1]
+        dist = self.short_paths.dist
+        mph = self.routes.mph
+        due_times = self.routes.due_times
+        inf = float('inf')
+        slack = self.__pre_slack[i][j - 1]
+        arrive = self.__arrive[i][j - 1]
+        prev_v = route[j - 1]
+        for k in range(j, alt_j + 1):
+            v = route[alt_j] if k == j else route[j] if k == alt_j else route[k]
+            arrive += dist(prev_v, v) / mph
+            slack = min(slack, due_times.get(v, inf) - arrive)
+            prev_v = v
+        if alt_j + 1 < len(route):
+            arrive += dist(prev_v, route[alt_j + 1]) / mph
+            slack = min(slack, self.__suf_slack[i][alt_j + 1] - (arrive - self.__arrive[i][alt_j + 1]))
+        return slack
@@ -0,0 +1,188 @@
+from array import array
+import argparse
+import json
+import mmap
+import sys
+
+from DirectedEdge import DirectedEdge
+
+# first bytes of a binary graph file
+MAGIC = b'CSRGRAPH1\n'
+
+
+class CSRGraph:
+    """
+    A directed edge-weighted graph in compressed sparse row form. The edges that start in vertex v are
+    stored together, with their end vertices in targets[offsets[v]:offsets[v + 1]] and their weights in the
+    same slice of weights. The three arrays are typed arrays (or memoryviews of a mapped file), so a graph
+    takes about 16 bytes per edge instead of a DirectedEdge object per edge.
+
+    The graph cannot be changed once built. Build it with from_edges() or from_graph(), save it with save()
+    and map a saved graph into memory with load().
+
+    Uses space proportional to V + E
+    """
+
+    def __init__(self, V, offsets, targets, weights):
+        """ Constructor
+        Worst case time complexity of O(1)
+
+        :param V: The number of vertexes in the graph
+        :param offsets: array of V + 1 positions where each vertex's edges start in targets and weights
+        :param targets: array of end vertices of the edges
+        :param weights: array of edge weights
+        """
+        if not isinstance(V, int) or V < 1:
+            raise TypeError("The number of vertexes must be a positive integer")
+        if len(offsets) != V + 1 or len(targets) != len(weights) or offsets[V] != len(targets):
+            raise ValueError("offsets, targets and weights do not describe a graph with V vertexes")
+        self._V = V
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.__mmap = None
+
+    def V(self):
+        """ Returns the number of vertexes
+        Worst case time complexity of O(1)
+
+        :return: V
+        """
+        return self._V
+
+    def E(self):
+        """ Returns the number of edges
+        Worst case time complexity of O(1)
+
+        :return: E
+        """
+        return len(self.targets)
+
+    def adj(self, v):
+        """ Returns all the edges adjacent to vertex v, as DirectedEdge objects made on demand
+        Worst case time complexity of O(K) where K is the number of edges adjacent to v
+
+        :param v: a vertex
+        :return: list of edges adjacent to v
+        """
+        start, end = self.offsets[v], self.offsets[v + 1]
+        return [DirectedEdge(v, w, weight) for w, weight in zip(self.targets[start:end], self.weights[start:end])]
+
+    def edges(self):
+        """ Returns a flattened list of all the edges in the graph
+        Worst case time complexity of O(E)
+
+        :return: list of edges
+        """
+        return [e for v in range(self._V) for e in self.adj(v)]
+
+    def save(self, path):
+        """ Write the graph to a binary file that load() can map into memory. The file holds a JSON header with
+        the number of vertexes and the position of each array, then each array, aligned to 8 bytes.
+        Worst case time complexity of O(V + E)
+
+        :param path: path of the file
+        :return:
+        """
+        blocks = [('offsets', 'q', self.offsets), ('targets', 'i', self.targets), ('weights', 'd', self.weights)]
+        layout = []
+        offset = 0
+        for name, code, values in blocks:
+            size = len(values) * array(code).itemsize
+            layout.append([name, code, offset, size])
+            offset += size + (-size % 8)
+        header = json.dumps({'V': self._V, 'byteorder': sys.byteorder, 'columns': layout}).encode()
+        start = len(MAGIC) + 8 + len(header)
+        start += -start % 8
+        with open(path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(len(header).to_bytes(8, 'little'))
+            file.write(header)
+            for (name, code, block_offset, size), (name, code, values) in zip(layout, blocks):
+                file.write(bytes(start + block_offset - file.tell()))
+                file.write(array(code, values).tobytes())
+
+
+def from_edges(V, sources, targets, weights, symmetric=False):
+    """ Build a graph from parallel arrays of edges, grouping the edges by start vertex with a counting sort
+    Worst case time complexity of O(V + E)
+
+    :param V: The number of vertexes in the graph
+    :param sources: array of start vertices of the edges
+    :param targets: array of end vertices of the edges
+    :param weights: array of edge weights
+    :param symmetric: also add the reverse of every edge
+    :return: CSRGraph
+    """
+    if symmetric:
+        sources, targets = array('i', sources) + array('i', targets), array('i', targets) + array('i', sources)
+        weights = array('d', weights) * 2
+    for v in (sources, targets):
+        if len(v) and (min(v) < 0 or max(v) >= V):
+            raise ValueError(f"edge vertices must be between 0 and {V - 1}")
+    offsets = array('q', bytes(8 * (V + 1)))
+    for v in sources:
+        offsets[v + 1] += 1
+    for v in range(V):
+        offsets[v + 1] += offsets[v]
+    filled = array('q', offsets[:V])
+    sorted_targets = array('i', bytes(4 * len(targets)))
+    sorted_weights = array('d', bytes(8 * len(weights)))
+    for v, w, weight in zip(sources, targets, weights):
+        k = filled[v]
+        sorted_targets[k] = w
+        sorted_weights[k] = weight
+        filled[v] = k + 1
+    return CSRGraph(V, offsets, sorted_targets, sorted_weights)
+
+
+def from_graph(graph):
+    """ Build a CSRGraph with the same edges as a Graph
+    Worst case time complexity of O(V + E)
+
+    :param graph: a graph of type Graph
+    :return: CSRGraph
+    """
+    edges = graph.edges()
+    return from_edges(graph.V(), array('i', [e.start() for e in edges]), array('i', [e.end() for e in edges]),
+                      array('d', [e.weight() for e in edges]))
+
+
+def load(path):
+    """ Map a file written by CSRGraph.save() into memory. The arrays are memoryviews of the mapped file, so
+    loading takes constant time however large the graph is, and pages are read from disk as they are used.
+
+    :param path: path of the file
+    :return: CSRGraph
+    """
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a binary graph file")
+    length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+    start = len(MAGIC) + 8 + length
+    start += -start % 8
+    view = memoryview(buffer)
+    arrays = {name: view[start + offset:start + offset + size].cast(code)
+              for name, code, offset, size in header['columns']}
+    graph = CSRGraph(header['V'], arrays['offsets'], arrays['targets'], arrays['weights'])
+    graph._CSRGraph__mmap = buffer
+    return graph
+
+
+def main(argv=None):
+    import fromcsv
+    parser = argparse.ArgumentParser(description="Convert a distances csv file to a binary graph file")
+    parser.add_argument('source', help="edge list csv file (see fromcsv.import_csr_graph())")
+    parser.add_argument('target', help="binary graph file to write")
+    args = parser.parse_args(argv)
+    graph = fromcsv.import_csr_graph(args.source)
+    graph.save(args.target)
+    print(f"Wrote {graph.V()} vertexes and {graph.E()} edges to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
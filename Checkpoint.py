@@ -0,0 +1,104 @@
+import os
+import pickle
+import threading
+import time
+import zlib
+
+
+class Checkpoint:
+    """
+    Saves the state of a long search to a file now and then, so that a search that is killed can resume
+    where it left off.
+
+    A state is a dictionary of plain values. It is pickled by the caller's thread, which takes a consistent
+    snapshot quickly, then compressed and written by a background thread so the search never waits on the
+    disk. The file is written to a temporary file next to it and moved into place with os.replace(), so a
+    crash while writing leaves the previous checkpoint intact. If the previous write is still running when the
+    next state is saved, the new state is skipped rather than queued.
+    """
+
+    def __init__(self, path, interval=30):
+        """ Constructor
+
+        :param path: path of the checkpoint file
+        :param interval: least number of seconds between checkpoints (0 to save every time save() is called)
+        """
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self.__last = time.perf_counter()
+        self.__writer = None
+        self.__error = None
+
+    def due(self):
+        """ Test if the interval has passed since the last checkpoint
+        Worst case time complexity is O(1)
+
+        :return: True if a checkpoint is due
+        """
+        return time.perf_counter() - self.__last >= self.interval
+
+    def save(self, state, wait=False):
+        """ Save a state in the background
+
+        :param state: dictionary of picklable values
+        :param wait: wait for a write in progress instead of skipping this state, and for this write to finish
+        :return: True if the state is being written, False if it was skipped
+        """
+        if self.__writer is not None and self.__writer.is_alive():
+            if not wait:
+                return False
+            self.__writer.join()
+        self.__raise()
+        data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        self.__last = time.perf_counter()
+        self.__writer = threading.Thread(target=self.__write, args=(data,), daemon=True)
+        self.__writer.start()
+        self.saves += 1
+        if wait:
+            self.wait()
+        return True
+
+    def wait(self):
+        """ Wait for a write in progress to finish, and raise any error it ran into
+
+        :return:
+        """
+        if self.__writer is not None:
+            self.__writer.join()
+        self.__raise()
+
+    def load(self):
+        """ Returns the saved state, or None if there is no checkpoint file
+
+        :return: dictionary
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as file:
+            return pickle.loads(zlib.decompress(file.read()))
+
+    def __write(self, data):
+        """ Compress and write a pickled state. Runs in the background thread.
+
+        :param data: bytes
+        :return:
+        """
+        try:
+            temp = self.path + '.tmp'
+            with open(temp, 'wb') as file:
+                file.write(zlib.compress(data, 1))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, self.path)
+        except OSError as error:
+            self.__error = error
+
+    def __raise(self):
+        """ Raise the error of the last write, if it failed
+
+        :return:
+        """
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
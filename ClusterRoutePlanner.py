@@ -0,0 +1,340 @@
+from SwapRouterPlanner import SwapRoutePlanner
+from DistanceMatrix import submatrix
+from HashDict import HashDict
+from Routes import Routes
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import os
+import random
+import time
+
+
+def _solve_cluster(task):
+    """ Plan the routes of one cluster with a SwapRoutePlanner. The cluster is given with its own
+    numbering of locations, where 0 is the hub, so only the cluster's distances are needed.
+    This function runs in worker processes.
+
+    :param task: (DistanceMatrix, Routes object for the cluster, random seed, dictionary of keyword
+                 arguments for optimize_global())
+    :return: route plan padded with zeros, list of route loads
+    """
+    short_paths, routes, seed, options = task
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        planner = SwapRoutePlanner(None, routes, short_paths)
+        planner.optimize_global(polish=False, **options)
+    plan = planner.plan
+    for route in plan:
+        while len(route) < routes.capacity or route[-1] != 0:
+            route.append(0)
+    return plan, planner.calculate_loads(plan, routes.packages)
+
+
+class ClusterRoutePlanner(SwapRoutePlanner):
+    """
+    Given a Routes object, this class plans large instances by clustering first and routing second, with
+    optimize_clusters().
+
+    Locations are partitioned into clusters with a capacitated k-medoids algorithm on the shortest paths
+    distances. Each cluster is given a group of vehicles, and holds no more packages than its vehicles can
+    carry. Locations constrained to a vehicle are placed in the cluster that vehicle belongs to. Medoids and
+    assignments are updated in turn until the medoids stop changing.
+
+    Each cluster is then planned independently with a SwapRoutePlanner, in parallel in a pool of worker
+    processes, using only the distances between the cluster's locations. The swap neighborhood of a
+    cluster is a small fraction of the neighborhood of the whole instance. Finally, a repair pass makes
+    improving swaps between the routes of neighboring clusters (clusters whose medoids are closest), using
+    the batch SwapEvaluator, since locations near a boundary may be better served by the other cluster.
+
+    The worst case time complexity of clustering is O(TKN + T(N/K)^2 K) where T is the number of medoid
+    updates, K the number of clusters and N the number of locations. Planning a cluster takes the time of
+    SwapRoutePlanner.optimize_global() on N/K locations.
+    """
+
+    def optimize_clusters(self, cluster_routes=4, starts=3, iterations=20, neighbors=None, workers=None,
+                          adjacent=2, max_updates=20, polish=True, verbose=0, time_budget=None, callback=None,
+                          cancel=None, gap=None, report_gap=False):
+        """ Cluster the locations, plan each cluster in parallel and repair the boundaries between clusters.
+        optimize_global() is inherited from SwapRoutePlanner unchanged, so this planner can stand in wherever
+        a SwapRoutePlanner is expected.
+
+        With a time budget, each cluster is planned with its share of the time that is left, and the repair pass stops
+        when the budget runs out or the cancellation flag is set, keeping the swaps made so far. The reason
+        the search stopped is kept in stop_reason.
+
+        If gap is given (or report_gap is set), the merged plan and the final plan are compared against a lower
+        bound on the mileage of any plan (see LowerBound), and the optimality gap is kept in gap. If the merged
+        plan is on time and within the gap threshold, the repair pass is skipped, with stop_reason 'gap'.
+
+        :param cluster_routes: number of vehicles in each cluster
+        :param starts: number of starts of the SwapRoutePlanner of each cluster
+        :param iterations: number of iterations of each start
+        :param neighbors: candidate list size for the SwapRoutePlanner of each cluster, or None for every swap
+        :param workers: number of worker processes, or None for the number of CPUs (0 or 1 to run serially)
+        :param adjacent: number of nearest clusters each cluster exchanges locations with in the repair pass
+        :param max_updates: largest number of medoid updates
+        :param polish: reorder the stops of each route in the final plan exactly, with the Held-Karp algorithm,
+                       or with 2-opt and or-opt if it has too many stops, within the time budget
+        :param verbose: 0, 1, or 2 indicates the amount of detail to print to console while the algorithm operates
+        :param time_budget: seconds of wall-clock time to search for, or None for no limit
+        :param callback: function called with (cost, lateness, plan, 0) for the merged plan of the clusters and
+                         for the repaired plan if it improves on it, where plan is a copy, or None
+        :param cancel: object with an is_set() method or a function returning True when the repair pass should
+                       stop, or None
+        :param gap: skip the repair pass if the optimality gap of the merged plan is at most this fraction of its
+                    mileage (e.g. 0.05), or None to always repair
+        :param report_gap: compute the optimality gap of the plan without a gap threshold, to report it
+        :return: route plan, list of route loads, total mileage
+        """
+        self._start_budget(time_budget, None, cancel)
+        reporting = gap is not None or report_gap
+        self.gap = None
+        print(f"Start cost: {self.cost}")
+        medoids, members, vehicles = self.cluster(cluster_routes, max_updates)
+        if verbose > 0:
+            print(f"Clusters: {len(medoids)}, sizes: {[len(m) for m in members]}")
+        # plan each cluster
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        processes = min(workers, len(medoids)) if workers > 1 else 1
+        options = {'starts': starts, 'iterations': iterations, 'neighbors': neighbors}
+        if self._deadline is not None:
+            # the clusters run in waves of one per process, and the time left is shared between the waves
+            waves = -(-len(medoids) // processes)
+            options['time_budget'] = max(0, self._deadline - time.perf_counter()) / waves
+        tasks = []
+        for c in range(len(medoids)):
+            tasks.append((submatrix(self.short_paths, [0] + members[c]), self._cluster_routes(members[c], vehicles[c]),
+                          random.randrange(2 ** 32), options))
+        if processes > 1:
+            with ProcessPoolExecutor(processes) as executor:
+                results = list(executor.map(_solve_cluster, tasks))
+        else:
+            results = [_solve_cluster(task) for task in tasks]
+        # merge the clusters' routes into one plan, with the original location id's
+        plan = [[0] * self.routes.capacity for i in range(self.routes.n_routes)]
+        loads = [0 for i in range(self.routes.n_routes)]
+        for c, (sub_plan, sub_loads) in enumerate(results):
+            local = [0] + members[c]
+            for k, i in enumerate(vehicles[c]):
+                plan[i] = [local[v] for v in sub_plan[k]]
+                loads[i] = sub_loads[k]
+        merged = self.score_all(plan)
+        merged_lateness = self.score_lateness(plan)
+        if reporting:
+            self.gap = self.bound.gap(merged)
+        if verbose > 0:
+            print(f"Cost before repair: {merged}{self._gap_text()}")
+        if callback is not None:
+            callback(merged, merged_lateness, [list(route) for route in plan], 0)
+        if gap is not None and merged_lateness <= 1e-9 and self.gap <= gap:
+            self.stop_reason = 'gap'
+        # repair the boundaries between neighboring clusters
+        if self.timed:
+            self.times.track(plan)
+        for c, d in self._adjacent_clusters(medoids, adjacent):
+            if self._out_of_budget():
+                break
+            for i in vehicles[c]:
+                for alt_i in vehicles[d]:
+                    self._exchange(plan, loads, i, alt_i)
+        self.plan, self.loads = plan, loads
+        self.clean_plan(self.plan)
+        if polish:
+            self.plan = self._polish(self.plan)
+        self.cost = self.score_all(self.plan)
+        self.lateness = self.score_lateness(self.plan)
+        if callback is not None and (self.lateness, self.cost) < (merged_lateness, merged):
+            callback(self.cost, self.lateness, [list(route) for route in self.plan], 0)
+        print(f"End cost: {self.cost}")
+        if reporting:
+            self.gap = self.bound.gap(self.cost)
+            if verbose > 0:
+                print(f"Lower bound: {self.bound.value():.1f}, gap: {self.gap:.1%}")
+        if self.lateness > 0:
+            print(f"Total lateness: {self.lateness:.2f} hours")
+        if self.stop_reason is not None and verbose > 0:
+            print(f"Stopped early: {self.stop_reason}")
+        return self.plan, self.loads, self.cost
+
+    def cluster(self, cluster_routes=4, max_updates=20):
+        """ Partition the locations into clusters with a capacitated k-medoids algorithm, and divide the
+        vehicles between the clusters. Each cluster gets cluster_routes vehicles (the last cluster gets the
+        rest) and at most as many packages as its vehicles can carry, if the locations allow it.
+
+        :param cluster_routes: number of vehicles in each cluster
+        :param max_updates: largest number of medoid updates
+        :return: list of medoids, list of lists of locations in each cluster, list of lists of route indexes
+        """
+        packages = self.routes.packages
+        n_routes = self.routes.n_routes
+        locations = [v for v in packages.keys() if v != 0]
+        k = max(1, min(len(locations), -(-n_routes // cluster_routes)))
+        vehicles = [list(range(c * cluster_routes, min((c + 1) * cluster_routes, n_routes))) for c in range(k)]
+        dist = self.short_paths.dist
+        medoids = self._seed_medoids(locations, k)
+        members = None
+        for update in range(max_updates):
+            members, vehicles = self._assign(locations, medoids, vehicles)
+            new_medoids = []
+            for c in range(k):
+                group = members[c] or [medoids[c]]
+                new_medoids.append(min(group, key=lambda m: sum(dist(m, v) + dist(v, m) for v in group)))
+            if new_medoids == medoids:
+                break
+            medoids = new_medoids
+        return medoids, members, vehicles
+
+    def _seed_medoids(self, locations, k):
+        """ Choose k starting medoids, each as far as possible from the hub and the medoids chosen before it
+
+        :param locations: list of location id's
+        :param k: number of medoids
+        :return: list of medoids
+        """
+        dist = self.short_paths.dist
+        nearest = {v: dist(0, v) for v in locations}
+        medoids = []
+        for c in range(k):
+            m = max(nearest, key=lambda v: (nearest[v], -v))
+            medoids.append(m)
+            for v in nearest:
+                nearest[v] = min(nearest[v], dist(m, v))
+            nearest[m] = -1
+        return medoids
+
+    def _assign(self, locations, medoids, vehicles):
+        """ Assign locations to medoids. Vehicles with constrained locations move to the cluster nearest their
+        locations, then the constrained locations are placed. The other locations are placed in order of regret
+        (how much farther the second nearest medoid is than the nearest), each in the nearest cluster with room.
+        If no cluster has room for a location, a location is moved between clusters to make room (see
+        _make_room()), and ValueError is raised if that is not possible.
+
+        :param locations: list of location id's
+        :param medoids: list of medoids
+        :param vehicles: list of lists of route indexes in each cluster
+        :return: list of lists of locations in each cluster, list of lists of route indexes in each cluster
+        """
+        packages = self.routes.packages
+        capacity = self.routes.capacity
+        constraints = self.routes.constraints
+        dist = self.short_paths.dist
+        k = len(medoids)
+        # vehicles with constraints go to the cluster nearest their locations, keeping each cluster's count
+        slots = [len(group) for group in vehicles]
+        owner = [None] * self.routes.n_routes
+        constrained = [i for i in range(self.routes.n_routes) if constraints[i]]
+        for i in sorted(constrained, key=lambda i: -len(constraints[i])):
+            order = sorted(range(k), key=lambda c: sum(dist(medoids[c], v) for v in constraints[i]))
+            c = next(c for c in order if slots[c] > 0)
+            owner[i] = c
+            slots[c] -= 1
+        free = [i for i in range(self.routes.n_routes) if owner[i] is None]
+        for c in range(k):
+            for s in range(slots[c]):
+                owner[free.pop(0)] = c
+        vehicles = [[i for i in range(self.routes.n_routes) if owner[i] == c] for c in range(k)]
+        room = [len(vehicles[c]) * capacity for c in range(k)]
+        members = [[] for c in range(k)]
+        placed = set()
+        for i in constrained:
+            for v in constraints[i]:
+                members[owner[i]].append(v)
+                room[owner[i]] -= len(packages.get(v))
+                placed.add(v)
+        # place the rest in order of regret
+        ranked = []
+        for v in locations:
+            if v in placed:
+                continue
+            near = sorted(dist(m, v) for m in medoids)
+            ranked.append((near[1] - near[0] if k > 1 else 0, v))
+        ranked.sort(reverse=True)
+        for regret, v in ranked:
+            load = len(packages.get(v))
+            order = sorted(range(k), key=lambda c: dist(medoids[c], v))
+            c = next((c for c in order if room[c] >= load), None)
+            if c is None:
+                c = self._make_room(members, room, medoids, v, placed)
+            members[c].append(v)
+            room[c] -= load
+        return members, vehicles
+
+    def _make_room(self, members, room, medoids, v, fixed):
+        """ Make room for a location when no cluster has enough, by moving a location from one cluster to
+        another cluster with room for it. Of the moves that free enough room, the one that adds the least
+        distance to the medoids is made.
+        Worst case time complexity is O(NK) where N is the number of locations and K the number of clusters
+
+        :param members: list of lists of locations in each cluster, changed in place
+        :param room: list of the number of packages each cluster has room for, changed in place
+        :param medoids: list of medoids
+        :param v: location id that does not fit
+        :param fixed: set of constrained locations, which cannot move
+        :return: index of the cluster that now has room for v
+        """
+        packages = self.routes.packages
+        dist = self.short_paths.dist
+        load = len(packages.get(v))
+        best = None
+        for c in range(len(medoids)):
+            for u in members[c]:
+                size = len(packages.get(u))
+                if u in fixed or room[c] + size < load:
+                    continue
+                for d in range(len(medoids)):
+                    if d != c and room[d] >= size:
+                        added = dist(medoids[c], v) + dist(medoids[d], u) - dist(medoids[c], u)
+                        if best is None or added < best[0]:
+                            best = (added, c, d, u)
+        if best is None:
+            raise ValueError(f"the vehicles have no room for the packages of location {v}")
+        added, c, d, u = best
+        members[c].remove(u)
+        members[d].append(u)
+        room[c] += len(packages.get(u))
+        room[d] -= len(packages.get(u))
+        return c
+
+    def _cluster_routes(self, members, vehicles):
+        """ Returns a Routes object for one cluster, with locations numbered 1, 2, ... in the order of members
+        and the hub numbered 0
+
+        :param members: list of location id's in the cluster
+        :param vehicles: list of route indexes of the cluster's vehicles
+        :return: Routes object
+        """
+        routes = self.routes
+        local = {v: k + 1 for k, v in enumerate(members)}
+        packages = HashDict()
+        packages.put(0, [])
+        for v in members:
+            packages.put(local[v], routes.packages.get(v))
+        sub = Routes(packages, n_routes=len(vehicles), capacity=routes.capacity)
+        sub.mph = routes.mph
+        for k, i in enumerate(vehicles):
+            sub.set_departure_time(k, routes.departure_times[i])
+            for v in routes.constraints[i]:
+                sub.constrain(k, local[v])
+        for v in members:
+            if v in routes.due_times:
+                sub.set_due_time(local[v], routes.due_times[v])
+            if v in routes.ready_times:
+                sub.set_ready_time(local[v], routes.ready_times[v])
+        return sub
+
+    def _adjacent_clusters(self, medoids, adjacent):
+        """ Returns the pairs of clusters where one cluster's medoid is among the nearest medoids of the other
+
+        :param medoids: list of medoids
+        :param adjacent: number of nearest medoids of each cluster
+        :return: sorted list of (cluster, cluster) pairs, each listed once
+        """
+        dist = self.short_paths.dist
+        pairs = set()
+        for c in range(len(medoids)):
+            others = sorted((d for d in range(len(medoids)) if d != c), key=lambda d: dist(medoids[c], medoids[d]))
+            for d in others[:adjacent]:
+                pairs.add((min(c, d), max(c, d)))
+        return sorted(pairs)
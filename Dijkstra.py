@@ -1,4 +1,6 @@
 from IndexMinPQ import IndexMinPQ
+from CSRGraph import CSRGraph
+from DirectedEdge import DirectedEdge
 from Graph import Graph
 
 
@@ -17,11 +19,11 @@ class Dijkstra:
         """ Constructor
         Worst case time complexity of O(E*logV)
 
-        :param graph: a graph of type Graph
+        :param graph: a graph of type Graph or CSRGraph
         :param source: source vertex from which paths are discovered
         """
-        if not isinstance(graph, Graph):
-            raise TypeError("only Graph objects are currently supported")
+        if not isinstance(graph, (Graph, CSRGraph)):
+            raise TypeError("only Graph and CSRGraph objects are currently supported")
         if not isinstance(source, int):
             raise TypeError("source vertex must be an integer")
         # instantiate data structures
@@ -31,8 +33,9 @@ class Dijkstra:
         self.__pq = IndexMinPQ(graph.V())
         # run algorithm
         self.__pq.insert(source, 0)
+        relax = self.__relax_csr if isinstance(graph, CSRGraph) else self.__relax
         while not self.__pq.empty():
-            self.__relax(graph, self.__pq.del_min())
+            relax(graph, self.__pq.del_min())
 
     def __relax(self, graph, v):
         for edge in graph.adj(v):
@@ -45,6 +48,20 @@ class Dijkstra:
                 else:
                     self.__pq.insert(w, self.__distto[w])
 
+    def __relax_csr(self, graph, v):
+        # reads the edges straight from the graph's arrays, making an edge object only for the path tree
+        targets = graph.targets
+        weights = graph.weights
+        for k in range(graph.offsets[v], graph.offsets[v + 1]):
+            w = targets[k]
+            if self.__distto[w] > self.__distto[v] + weights[k]:
+                self.__distto[w] = self.__distto[v] + weights[k]
+                self.__edgeto[w] = DirectedEdge(v, w, weights[k])
+                if self.__pq.contains(w):
+                    self.__pq.change_key(w, self.__distto[w])
+                else:
+                    self.__pq.insert(w, self.__distto[w])
+
     def dist(self, v):
         """ Returns shortest path distance from source vertex to vertex v,
         or float('inf') if no path exists.
@@ -94,11 +111,13 @@ class AllPairsDijkstra:
         """ Constructor
         Worst case time complexity of O(V*E*logV)
 
-        :param graph: a graph of type Graph
+        :param graph: a graph of type Graph or CSRGraph
         """
-        if not isinstance(graph, Graph):
-            raise TypeError("only Graph objects are currently supported")
+        if not isinstance(graph, (Graph, CSRGraph)):
+            raise TypeError("only Graph and CSRGraph objects are currently supported")
         self.__paths = [Dijkstra(graph, s) for s in range(graph.V())]
+        self.__neighbors = [None] * graph.V()
+        self.__matrix = None
 
     def dist(self, s, t):
         """ Returns shortest path distance from vertex s to vertex t,
@@ -133,4 +152,28 @@ class AllPairsDijkstra:
         """
         return self.__paths[s].path(t)
 
+    def neighbors(self, s):
+        """ Returns the vertices reachable from vertex s, ordered from nearest to farthest.
+        Ties are broken by vertex number. Lists are computed on first use and cached.
+        Worst case time complexity of O(VlogV) on first use, then O(1)
 
+        :param s: source vertex
+        :return: list of vertices, excluding s
+        """
+        if self.__neighbors[s] is None:
+            paths = self.__paths[s]
+            reachable = [t for t in range(len(self.__paths)) if t != s and paths.ispath(t)]
+            self.__neighbors[s] = sorted(reachable, key=lambda t: (paths.dist(t), t))
+        return self.__neighbors[s]
+
+    def matrix(self):
+        """ Returns a dense matrix of shortest path distances, where element [s][t] is the distance
+        from vertex s to vertex t. The matrix is computed on first use and cached.
+        Worst case time complexity of O(VV) on first use, then O(1)
+
+        :return: list of lists of distances
+        """
+        if self.__matrix is None:
+            V = len(self.__paths)
+            self.__matrix = [[self.dist(s, t) for t in range(V)] for s in range(V)]
+        return self.__matrix
@@ -0,0 +1,103 @@
+def submatrix(short_paths, vertices):
+    """ Returns the distances between a subset of vertices of a shortest paths oracle,
+    renumbered 0, 1, 2, ... in the order given
+    Worst case time complexity of O(NN) where N is the number of vertices in the subset
+
+    :param short_paths: shortest paths oracle with a dist(s, t) function
+    :param vertices: list of vertices
+    :return: DistanceMatrix
+    """
+    dist = short_paths.dist
+    return DistanceMatrix([[dist(s, t) for t in vertices] for s in vertices])
+
+
+def shortest_paths(matrix):
+    """ Returns the shortest path distances of a dense matrix of direct distances, such as the one from
+    fromcsv.import_distance_table(), using the Floyd-Warshall algorithm. Each row is updated as a whole with
+    list comprehensions, which for dense graphs is faster than running Dijkstra's algorithm from every vertex.
+    Worst case time complexity of O(VVV)
+
+    :param matrix: square matrix (list of lists) where element [s][t] is the length of the edge from s to t,
+                   or float('inf') if there is no edge
+    :return: DistanceMatrix
+    """
+    dist = [list(row) for row in matrix]
+    for k in range(len(dist)):
+        via = dist[k]
+        for s in range(len(dist)):
+            to_k = dist[s][k]
+            if to_k < float('inf'):
+                dist[s] = [d if d <= to_k + d_k else to_k + d_k for d, d_k in zip(dist[s], via)]
+    return DistanceMatrix(dist)
+
+
+class DistanceMatrix:
+    """
+    Shortest paths oracle backed by a dense matrix of distances, with the same dist(), ispath(), neighbors()
+    and matrix() functions as AllPairsDijkstra. Unlike AllPairsDijkstra, it holds only plain lists, so it is
+    cheap to pickle and send to worker processes, and a submatrix for a subset of locations can be taken
+    without running Dijkstra's algorithm again. Paths are not kept, only their lengths.
+
+    Uses space proportional to VV
+    """
+
+    def __init__(self, matrix):
+        """ Constructor
+        Worst case time complexity of O(1)
+
+        :param matrix: square matrix (list of lists) where element [s][t] is the distance from s to t,
+                       or float('inf') if there is no path
+        """
+        self.__matrix = matrix
+        self.__neighbors = [None] * len(matrix)
+
+    def V(self):
+        """ Returns the number of vertices
+        Worst case time complexity of O(1)
+
+        :return: V
+        """
+        return len(self.__matrix)
+
+    def dist(self, s, t):
+        """ Returns shortest path distance from vertex s to vertex t,
+        or float('inf') if no path exists.
+        Worst case time complexity of O(1)
+
+        :param s: source vertex
+        :param t: target vertex
+        :return: distance from s to t
+        """
+        return self.__matrix[s][t]
+
+    def ispath(self, s, t):
+        """ Test if path exists from vertex s to vertex t
+        Worst case time complexity of O(1)
+
+        :param s: source vertex
+        :param t: target vertex
+        :return: True if path exists, False otherwise
+        """
+        return self.__matrix[s][t] < float('inf')
+
+    def neighbors(self, s):
+        """ Returns the vertices reachable from vertex s, ordered from nearest to farthest.
+        Ties are broken by vertex number. Lists are computed on first use and cached.
+        Worst case time complexity of O(VlogV) on first use, then O(1)
+
+        :param s: source vertex
+        :return: list of vertices, excluding s
+        """
+        if self.__neighbors[s] is None:
+            row = self.__matrix[s]
+            reachable = [t for t in range(len(row)) if t != s and row[t] < float('inf')]
+            self.__neighbors[s] = sorted(reachable, key=lambda t: (row[t], t))
+        return self.__neighbors[s]
+
+    def matrix(self):
+        """ Returns the dense matrix of distances
+        Worst case time complexity of O(1)
+
+        :return: list of lists of distances
+        """
+        return self.__matrix
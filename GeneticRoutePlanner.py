@@ -0,0 +1,307 @@
+from SwapRouterPlanner import SwapRoutePlanner
+
+from itertools import repeat
+from operator import add, mul
+import random
+
+
+class GeneticRoutePlanner(SwapRoutePlanner):
+    """
+    Given a Routes object, this class implements a genetic (memetic) algorithm that evolves a population of
+    route plans with evolve(). Unlike the restarts of SwapRoutePlanner.optimize_global(), which start over from
+    a shuffled plan, each generation is bred from the best plans found so far.
+
+    The population is held as a 2-D integer array: one row per plan, where each row is the plan's routes
+    laid end to end, each padded with zeros (the hub) to the same width. Every route starts and ends at the
+    hub and the hub is zero miles from itself, so the mileage of a plan is the sum of the distances between
+    neighbouring entries of its row. The fitness of the whole population is computed in one gather from a
+    flattened distance matrix.
+
+    Children are bred with an order-preserving crossover. A random subset of routes is copied from one
+    parent, and the remaining locations are added in the order they appear in the other parent. Each
+    location goes to the same route as in that parent if it has room, or otherwise to the route with the
+    most room. Locations constrained to a vehicle are placed first, on their vehicle, and are left out of
+    routes copied from the first parent if that route is not theirs. Children are then
+    mutated with random swaps that obey constraints and capacities, and some are improved with the local
+    search of SwapRoutePlanner. If the Routes object has time windows, plans are ranked by lateness first
+    and mileage second.
+
+    The worst case time complexity is O(GP(RW + L)) after finding shortest paths, where G is the number of
+    generations, P the population size, R the number of routes, W the route width and L the time taken by
+    the local search of a child.
+
+    The space complexity is proportional to VV + PRW.
+    """
+
+    def __init__(self, graph, routes, short_paths=None, initializer='balanced', stats=None, cache=None,
+                 polish_workers=1):
+        """ Constructor
+
+        :param graph: a graph of type Graph
+        :param routes: Routes object with packages, constraints, time windows, number of routes and capacity
+        :param short_paths: shortest paths oracle to share with another planner, or None to find shortest paths
+        :param initializer: 'balanced' or 'savings', used for the first plan in the population
+        :param stats: OptimizerStats object to record counters for the local search of children, or None
+        :param cache: RouteCostCache to share with another planner, or None to make a new cache
+        :param polish_workers: number of processes to polish the routes of the best plan in (see SwapRoutePlanner)
+        """
+        super().__init__(graph, routes, short_paths, initializer, stats, cache, polish_workers)
+        # every route holds at most capacity stops, plus the hub at each end
+        self.width = routes.capacity + 2
+        matrix = self.short_paths.matrix()
+        self.__n_vertices = len(matrix)
+        self.__flat = [d for row in matrix for d in row]
+        # locations constrained to a vehicle, read from the Routes object by evolve()
+        self.__fixed = {}
+
+    def encode(self, plan):
+        """ Lay a route plan out as a single row, with each route padded with zeros to the route width
+        Worst case time complexity is O(RW) where R is the number of routes and W the route width
+
+        :param plan: route plan
+        :return: list of location id's
+        """
+        row = []
+        for route in plan:
+            stops = [v for v in route if v != 0]
+            if len(stops) > self.width - 2:
+                raise ValueError("route has more stops than the route width")
+            row.append(0)
+            row.extend(stops)
+            row.extend(repeat(0, self.width - 1 - len(stops)))
+        return row
+
+    def decode(self, row):
+        """ Split a row into a route plan
+
+        :param row: list of location id's
+        :return: route plan, with every route as wide as the route width
+        """
+        width = self.width
+        return [row[k:k + width] for k in range(0, len(row), width)]
+
+    def fitness(self, rows):
+        """ Returns the mileage of every row in a population, gathered from the flattened distance matrix
+        Worst case time complexity is O(PRW) where P is the number of rows
+
+        :param rows: list of rows
+        :return: list of miles
+        """
+        flat = self.__flat
+        n = self.__n_vertices
+        return [sum(map(flat.__getitem__, map(add, map(mul, row, repeat(n)), row[1:]))) for row in rows]
+
+    def _rank(self, rows, costs):
+        """ Returns the sort key of each row: (lateness, miles) with time windows, otherwise miles
+
+        :param rows: list of rows
+        :param costs: list of miles of each row
+        :return: list of sort keys
+        """
+        if not self.timed:
+            return costs
+        return [(self.score_lateness(self.decode(row)), cost) for row, cost in zip(rows, costs)]
+
+    def evolve(self, generations=50, population=30, elite=2, tournament=3, mutation=0.3, local_search=0.2,
+               iterations=5, neighbors=None, verbose=0, polish=True, time_budget=None, eval_budget=None,
+               callback=None, cancel=None, gap=None, report_gap=False):
+        """ Evolve a population of route plans, and keep the best plan found. optimize_global() is inherited
+        from SwapRoutePlanner unchanged, so this planner can stand in wherever a SwapRoutePlanner is expected.
+        Worst case time complexity is O(GP(RW + L)) where G is the number of generations, P the population
+        size, R the number of routes, W the route width and L the time taken by the local search of a child
+
+        :param generations: number of generations
+        :param population: number of plans in the population
+        :param elite: number of best plans carried over unchanged to the next generation
+        :param tournament: number of plans drawn at random when selecting each parent, of which the best is used
+        :param mutation: probability that a child is mutated with a random swap, tried again with the same
+                         probability after each swap
+        :param local_search: probability that a child is improved with the local search of SwapRoutePlanner
+        :param iterations: number of iterations of the local search
+        :param neighbors: candidate list size for the local search, or None to consider every swap
+        :param verbose: 0, 1, or 2 indicates the amount of detail to print to console while the algorithm operates
+        :param polish: reorder the stops of each route in the best plan exactly, with the Held-Karp algorithm,
+                       or with 2-opt and or-opt if it has too many stops, within the time budget
+        :param time_budget: seconds of wall-clock time to search for, or None for no limit
+        :param eval_budget: number of swaps to evaluate in local search, or None for no limit
+        :param callback: function called with (cost, lateness, plan, generation) each time the best plan
+                         improves, where plan is a copy of the best plan, or None
+        :param cancel: object with an is_set() method or a function returning True to stop, or None
+        :param gap: stop once the optimality gap of the best plan is at most this fraction of its mileage,
+                    or None to run every generation
+        :param report_gap: compute the optimality gap of the best plan without a gap threshold, to report it
+        :return: route plan, list of route loads, total mileage
+        """
+        self._start_budget(time_budget, eval_budget, cancel)
+        # constraints may have changed since the planner was made, so the initial plan is repaired if it breaks one
+        self.__fixed = self._fixed_routes()
+        if any(self.__fixed.get(v, i) != i for i, route in enumerate(self.plan) for v in route):
+            self.plan = self._crossover(self.plan, self.plan)
+            self.loads = self.calculate_loads(self.plan, self.routes.packages)
+            self.cost = self.score_all(self.plan)
+            self.lateness = self.score_lateness(self.plan)
+        self.gap = self.bound.gap(self.cost) if gap is not None or report_gap else None
+        print(f"Start cost: {self.cost}")
+        # first generation: the initial plan and shuffled copies of it
+        rows = [self.encode(self.plan)]
+        while len(rows) < population:
+            plan = self.decode(rows[0])
+            loads = self.calculate_loads(plan, self.routes.packages)
+            self.shuffle(plan, loads, 2)
+            rows.append(self.encode(plan))
+        for generation in range(generations):
+            if self._out_of_budget():
+                break
+            costs = self.fitness(rows)
+            keys = self._rank(rows, costs)
+            order = sorted(range(len(rows)), key=keys.__getitem__)
+            best = order[0]
+            self._record(rows[best], costs[best], generation, verbose, callback, gap)
+            if verbose > 1:
+                print(f"\tGeneration {generation}: best {costs[best]}")
+            # breed the next generation
+            next_rows = [rows[k] for k in order[:elite]]
+            seen = {self.fingerprint(self.decode(row)) for row in next_rows}
+            attempts = 0
+            while len(next_rows) < population and attempts < 4 * population:
+                attempts += 1
+                a = self._select(keys, tournament)
+                b = self._select(keys, tournament)
+                plan = self._crossover(self.decode(rows[a]), self.decode(rows[b]))
+                loads = self.calculate_loads(plan, self.routes.packages)
+                while random.random() < mutation:
+                    self._mutate(plan, loads)
+                if random.random() < local_search and not self._out_of_budget():
+                    self._optimize_local(plan, loads, self.score_all(plan), generation, iterations=iterations,
+                                         neighbors=neighbors)
+                # duplicates reduce diversity
+                fingerprint = self.fingerprint(plan)
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                next_rows.append(self.encode(plan))
+            while len(next_rows) < population:
+                next_rows.append(rows[order[len(next_rows)]])
+            rows = next_rows
+        # score the last generation
+        costs = self.fitness(rows)
+        keys = self._rank(rows, costs)
+        best = min(range(len(rows)), key=keys.__getitem__)
+        self._record(rows[best], costs[best], generations, verbose, callback, gap)
+        self.clean_plan(self.plan)
+        if polish:
+            self.plan = self._polish(self.plan)
+        self.cost = self.score_all(self.plan)
+        self.lateness = self.score_lateness(self.plan)
+        print(f"End cost: {self.cost}")
+        if self.gap is not None:
+            self.gap = self.bound.gap(self.cost)
+            if verbose > 0:
+                print(f"Lower bound: {self.bound.value():.1f}, gap: {self.gap:.1%}")
+        if self.lateness > 0:
+            print(f"Total lateness: {self.lateness:.2f} hours")
+        return self.plan, self.loads, self.cost
+
+    def _record(self, row, cost, generation, verbose, callback, gap=None):
+        """ Keep a row as the best plan if it improves on the best plan found so far, and stop the search
+        with stop_reason 'gap' once the optimality gap of an on-time best plan is at most gap
+
+        :param row: row of the best plan in a generation
+        :param cost: mileage of the row
+        :param generation: index of the generation
+        :param verbose: 0, 1, or 2 indicates the amount of detail to print to console
+        :param callback: function called with (cost, lateness, plan, generation) on improvement, or None
+        :param gap: optimality gap threshold, or None
+        :return:
+        """
+        plan = self.decode(row)
+        lateness = self.score_lateness(plan)
+        if self._improves(lateness, cost):
+            self.plan = plan
+            self.loads = self.calculate_loads(plan, self.routes.packages)
+            self.cost = cost
+            self.lateness = lateness
+            if self.gap is not None:
+                self.gap = self.bound.gap(cost)
+            if verbose > 0:
+                print(f"New minimum cost: {self.cost}{self._gap_text()}")
+            if callback is not None:
+                callback(cost, lateness, [list(route) for route in plan], generation)
+            if gap is not None and lateness <= 1e-9 and self.gap <= gap:
+                self.stop_reason = 'gap'
+
+    def _select(self, keys, tournament):
+        """ Tournament selection: returns the index of the best of a few rows drawn at random
+
+        :param keys: list of sort keys of each row
+        :param tournament: number of rows to draw
+        :return: index of row
+        """
+        return min(random.sample(range(len(keys)), min(tournament, len(keys))), key=keys.__getitem__)
+
+    def _fixed_routes(self):
+        """ Returns a dictionary of location id's to the route index they are constrained to
+
+        :return: dictionary of location id's to route indexes
+        """
+        fixed = {}
+        for i, constrained in enumerate(self.routes.constraints):
+            for v in constrained:
+                fixed[v] = i
+        return fixed
+
+    def _crossover(self, a, b):
+        """ Breed a child from two parent plans. Routes chosen at random are copied from the first parent,
+        and the remaining locations are added in the order of the second parent.
+        Worst case time complexity is O(RW) where R is the number of routes and W the route width
+
+        :param a: first parent route plan
+        :param b: second parent route plan
+        :return: child route plan, or a copy of the first parent if some location does not fit
+        """
+        packages = self.routes.packages
+        capacity = self.routes.capacity
+        max_stops = self.width - 2
+        n_routes = len(a)
+        child = [[] for i in range(n_routes)]
+        loads = [0 for i in range(n_routes)]
+        placed = set()
+        for i in range(n_routes):
+            if random.random() < 0.5:
+                child[i] = [v for v in a[i] if v != 0 and self.__fixed.get(v, i) == i]
+                loads[i] = sum(len(packages.get(v)) for v in child[i])
+                placed.update(child[i])
+        pending = [(i, v) for i in range(n_routes) for v in b[i] if v != 0 and v not in placed]
+        # constrained locations first, so their vehicle has room for them
+        pending.sort(key=lambda item: item[1] not in self.__fixed)
+        for i, v in pending:
+            load = len(packages.get(v))
+            target = self.__fixed.get(v, i)
+            if v not in self.__fixed and (loads[target] + load > capacity or len(child[target]) >= max_stops):
+                target = min(range(n_routes), key=lambda k: loads[k])
+            if loads[target] + load > capacity or len(child[target]) >= max_stops:
+                return [list(route) for route in a]
+            child[target].append(v)
+            loads[target] += load
+        return [[0] + route + [0] * (self.width - 1 - len(route)) for route in child]
+
+    def _mutate(self, plan, loads):
+        """ Swap two random stops, if the swap obeys constraints and capacities
+
+        :param plan: route plan
+        :param loads: list of route loads
+        :return: True if the swap was made
+        """
+        i = random.randrange(len(plan))
+        alt_i = random.randrange(len(plan))
+        j = random.randrange(1, len(plan[i]) - 1)
+        alt_j = random.randrange(1, len(plan[alt_i]) - 1)
+        if plan[i][j] == plan[alt_i][alt_j] or not self._validate_constraints(plan, i, alt_i, j, alt_j):
+            return False
+        valid_cap, new_i_cap, new_alt_i_cap = self._validate_capacities(plan, loads, i, alt_i, j, alt_j)
+        if not valid_cap:
+            return False
+        self.swap(plan, i, alt_i, j, alt_j)
+        loads[i] = new_i_cap
+        loads[alt_i] = new_alt_i_cap
+        return True
@@ -18,6 +18,8 @@ class HashDict:
         :param m: the number of bins
         """
         self._m = m
+        # the table never shrinks below its starting number of bins
+        self.__min_m = m
         self.__table = [LinkedListST() for i in range(m)]
         self.__len = 0
 
@@ -38,22 +40,27 @@ class HashDict:
         :param value: value
         :return:
         """
-        self.__len += 1
         if len(self) >= 8 * self._m:
             self.__resize(2 * self._m)
-        self.__table[self.__hash_bin(key)].put(key, value)
+        chain = self.__table[self.__hash_bin(key)]
+        size = len(chain)
+        chain.put(key, value)
+        self.__len += len(chain) - size
 
     def delete(self, key):
-        """Remove and return item associated with key from dict
+        """Remove and return item associated with key from dict, or None if key not found
         Worst case time complexity is O(N/m), which is effectively O(1)
 
         :param key: key
         :return: deleted item
         """
-        self.__len -= 1
-        if 0 < len(self) <= 2 * self._m:
+        chain = self.__table[self.__hash_bin(key)]
+        size = len(chain)
+        item = chain.delete(key)
+        self.__len -= size - len(chain)
+        if self._m > self.__min_m and len(self) <= 2 * self._m:
             self.__resize(self._m // 2)
-        return self.__table[self.__hash_bin(key)].delete(key)
+        return item
 
     def keys(self):
         """Return list of all keys in dictionary
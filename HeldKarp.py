@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from operator import add
+import time
+
+
+def solve_tour(d, due=None, departure=0, mph=1, deadline=None):
+    """ Find the shortest tour that starts at index 0 of a distance matrix, visits every other index
+    once and returns to index 0, using the Held-Karp bitmask dynamic programming algorithm.
+
+    Subsets of stops are held as bitmasks. For each subset, the table holds a row with the length of the
+    shortest path from the hub through the subset that ends at each stop. A row is computed from the rows
+    of smaller subsets one column at a time, each column as a single min over an element-wise sum of a row
+    and a column of the distance matrix. If due times are given, paths that reach a stop after its due time
+    are dropped, which keeps the solution exact because vehicles never wait.
+
+    Worst case time complexity is O(NN2^N) and space is proportional to N2^N, where N is the number of stops.
+
+    :param d: square distance matrix (list of lists), where index 0 is the hub
+    :param due: list of due times for each index, or None to ignore time windows
+    :param departure: time the vehicle leaves the hub
+    :param mph: vehicle speed, to convert miles to hours
+    :param deadline: time.perf_counter() value at which to give up, or None to always finish
+    :return: (tour as a list of indexes starting and ending with 0, tour length), or (None, inf) if no tour
+             meets every due time or the deadline passed
+    """
+    inf = float('inf')
+    n = len(d) - 1
+    if n <= 0:
+        return [0, 0], 0
+    full = (1 << n) - 1
+    # columns of the distance matrix between stops, indexed from 0
+    columns = [[d[k + 1][j + 1] if k != j else inf for k in range(n)] for j in range(n)]
+    # rows are appended in mask order, so the table only takes the space of the subsets reached before the deadline
+    table = [None]
+    for mask in range(1, full + 1):
+        if deadline is not None and not mask & 255 and time.perf_counter() >= deadline:
+            return None, inf
+        row = [inf] * n
+        if mask & (mask - 1) == 0:
+            j = mask.bit_length() - 1
+            row[j] = d[0][j + 1]
+        else:
+            for j in range(n):
+                if mask >> j & 1:
+                    row[j] = min(map(add, table[mask ^ (1 << j)], columns[j]))
+        if due is not None:
+            for j in range(n):
+                if row[j] < inf and departure + row[j] / mph > due[j + 1]:
+                    row[j] = inf
+        table.append(row)
+    # close the tour
+    last_row = table[full]
+    best = inf
+    end = -1
+    for j in range(n):
+        length = last_row[j] + d[j + 1][0]
+        if length < best:
+            best, end = length, j
+    if end < 0:
+        return None, inf
+    # walk back through the table
+    tour = [0]
+    mask = full
+    j = end
+    while True:
+        tour.append(j + 1)
+        prev = mask ^ (1 << j)
+        if prev == 0:
+            break
+        target = table[mask][j]
+        prev_row = table[prev]
+        column = columns[j]
+        j = min(range(n), key=lambda k: abs(prev_row[k] + column[k] - target))
+        mask = prev
+    tour.append(0)
+    tour.reverse()
+    return tour, best
+
+
+class HeldKarpSolver:
+    """
+    Orders the stops of a route exactly, using the Held-Karp algorithm in solve_tour(). Routes with
+    more than max_stops stops are left as they are, since the algorithm takes time exponential in the
+    number of stops. If the Routes object has time windows, the order must also meet every due time.
+
+    Solutions are cached by stop set (and by departure and due times, if there are time windows),
+    so polishing a route that has already been solved is O(N). Like RouteCostCache, the cache holds at most
+    max_cache solutions and evicts the one used least recently when it is full.
+    """
+
+    def __init__(self, short_paths, routes=None, max_stops=15, max_cache=1000):
+        """ Constructor
+
+        :param short_paths: shortest paths oracle with a dist(s, t) function
+        :param routes: Routes object with time windows, departure times and vehicle speed,
+                       or None to ignore time windows
+        :param max_stops: largest number of stops to solve exactly
+        :param max_cache: largest number of solutions to keep
+        """
+        if max_cache < 1:
+            raise ValueError("max_cache must be a positive integer")
+        self.short_paths = short_paths
+        self.routes = routes
+        self.max_stops = max_stops
+        self.max_cache = max_cache
+        self.__cache = OrderedDict()
+
+    def solve(self, route, departure=0, deadline=None):
+        """ Returns the shortest order of a route's stops that starts and ends at the hub
+        Worst case time complexity is O(NN2^N) where N is the number of stops, or O(N) if cached
+
+        :param route: list of location id's
+        :param departure: time the route leaves the hub, in hours since 8:00am
+        :param deadline: time.perf_counter() value at which to give up, or None to always finish
+        :return: (ordered route starting and ending at the hub, miles), or (None, inf) if the route has too
+                 many stops, no order meets every due time or the deadline passed
+        """
+        stops = sorted(set(v for v in route if v != 0))
+        if len(stops) > self.max_stops:
+            return None, float('inf')
+        due_times = self.routes.due_times if self.routes is not None else {}
+        timed = any(v in due_times for v in stops)
+        key = (tuple(stops), departure, tuple(due_times.get(v) for v in stops)) if timed else tuple(stops)
+        if key not in self.__cache:
+            local = [0] + stops
+            dist = self.short_paths.dist
+            d = [[dist(a, b) for b in local] for a in local]
+            if timed:
+                due = [float('inf')] + [due_times.get(v, float('inf')) for v in stops]
+                tour, length = solve_tour(d, due, departure, self.routes.mph, deadline)
+            else:
+                tour, length = solve_tour(d, deadline=deadline)
+            # an unfinished search is not cached
+            if tour is None and deadline is not None and time.perf_counter() >= deadline:
+                return None, float('inf')
+            self.__cache[key] = ([local[k] for k in tour] if tour is not None else None), length
+            if len(self.__cache) > self.max_cache:
+                self.__cache.popitem(last=False)
+        else:
+            self.__cache.move_to_end(key)
+        tour, length = self.__cache[key]
+        return (list(tour) if tour is not None else None), length
+
+    def __len__(self):
+        return len(self.__cache)
+
+    def polish(self, plan, deadline=None):
+        """ Reorder each route in a cleaned route plan (routes start and end at the hub)
+        if the exact order is shorter than the current order. Departure times come from the
+        Routes object, if there is one. Once the deadline passes, the remaining routes keep their order.
+
+        :param plan: list of lists of location id's
+        :param deadline: time.perf_counter() value at which to stop polishing, or None to polish every route
+        :return: polished route plan
+        """
+        dist = self.short_paths.dist
+        polished = []
+        for i, route in enumerate(plan):
+            departure = 0
+            if self.routes is not None:
+                departure = self.routes.departure_times[i]
+                for v in route:
+                    departure = max(departure, self.routes.ready_times.get(v, 0))
+            tour, length = self.solve(route, departure, deadline)
+            current = sum(dist(route[k], route[k + 1]) for k in range(len(route) - 1))
+            if tour is not None and (length < current or self._late(route, departure)):
+                polished.append(tour)
+            else:
+                polished.append(list(route))
+        return polished
+
+    def _late(self, route, departure):
+        """ Test if a route misses any due time
+
+        :param route: list of location id's
+        :param departure: time the route leaves the hub, in hours since 8:00am
+        :return: True if a stop is reached after its due time
+        """
+        if self.routes is None:
+            return False
+        dist = self.short_paths.dist
+        due_times = self.routes.due_times
+        arrival = departure
+        for k in range(1, len(route)):
+            arrival += dist(route[k - 1], route[k]) / self.routes.mph
+            if arrival > due_times.get(route[k], float('inf')):
+                return True
+        return False
@@ -47,7 +47,7 @@ class LinkedListST:
         self.__len += 1
 
     def delete(self, key):
-        """Remove and return item associated with key from list
+        """Remove and return item associated with key from list, or None if key not found
         Worst case time complexity is O(N)
 
         :param key: key
@@ -55,9 +55,12 @@ class LinkedListST:
         """
         item = None
         # check if head is item
+        if self.__head is None:
+            return None
         if self.__head.key == key:
             item = self.__head.val
             self.__head = self.__head.next
+            self.__len -= 1
         # iterate through list
         else:
             current = self.__head
@@ -65,8 +68,9 @@ class LinkedListST:
                 if current.next.key == key:
                     item = current.next.val
                     current.next = current.next.next
+                    self.__len -= 1
+                    break
                 current = current.next
-        self.__len -= 1
         return item
 
     def __len__(self):
@@ -0,0 +1,158 @@
+def k_tree(d, penalties, m):
+    """ Find the minimum weight k-tree of a distance matrix with vertex penalties: a minimum spanning tree
+    of every vertex, plus at least m more edges from the hub (index 0) to distinct vertices, where the weight
+    of edge (a, b) is d[a][b] + penalties[a] + penalties[b]. Hub edges beyond m are added only while their
+    weight is negative. The spanning tree is found with Prim's algorithm on the dense matrix.
+    Worst case time complexity is O(VV) where V is the number of vertices
+
+    :param d: symmetric square distance matrix (list of lists), where index 0 is the hub
+    :param penalties: list of penalties for each index, where the penalty of the hub is 0
+    :param m: least number of extra hub edges
+    :return: (weight of the k-tree, list of the degree of each vertex)
+    """
+    inf = float('inf')
+    n = len(d)
+    degrees = [0] * n
+    if n <= 1:
+        return 0, degrees
+    # Prim's algorithm, starting from the hub
+    key = [d[0][v] + penalties[v] for v in range(n)]
+    parent = [0] * n
+    in_tree = [False] * n
+    in_tree[0] = True
+    key[0] = inf
+    weight = 0
+    for step in range(n - 1):
+        u = min((v for v in range(n) if not in_tree[v]), key=key.__getitem__)
+        in_tree[u] = True
+        weight += key[u]
+        degrees[u] += 1
+        degrees[parent[u]] += 1
+        row = d[u]
+        penalty = penalties[u]
+        for v in range(n):
+            if not in_tree[v]:
+                w = row[v] + penalty + penalties[v]
+                if w < key[v]:
+                    key[v] = w
+                    parent[v] = u
+    # extra hub edges, one for each route
+    hub = sorted((d[0][v] + penalties[v], v) for v in range(1, n))
+    for k, (w, v) in enumerate(hub):
+        if k >= m and w >= 0:
+            break
+        weight += w
+        degrees[0] += 1
+        degrees[v] += 1
+    return weight, degrees
+
+
+class LowerBound:
+    """
+    Computes a lower bound on the total mileage of any route plan for a Routes object, so the mileage of a plan
+    can be reported as an optimality gap.
+
+    Every route leaves the hub and returns to it, and a location is visited by one route only. Removing the
+    last edge of every route (back to the hub) from a plan leaves a spanning tree of the hub and every location,
+    so the mileage of a plan is at least the weight of a minimum spanning tree plus the m shortest edges from
+    the hub to distinct locations, where m is the least number of routes that can carry every package. This
+    is the k-tree relaxation of the Vehicle Routing Problem.
+
+    The bound is tightened with Lagrangian relaxation, as in the Held-Karp bound for the Traveling Salesman
+    Problem. Every location has degree 2 in a plan, so penalties are added to the edges of locations whose
+    degree in the k-tree is not 2, and updated by subgradient optimization. Each weighted k-tree, minus twice
+    the sum of the penalties, is a lower bound, and the best one is kept.
+
+    Distances are taken as the shorter of the two directions between each pair of locations, so the bound
+    holds even if shortest paths are not symmetric. Time windows are ignored, so the bound holds for plans
+    that are late.
+
+    The worst case time complexity is O(IVV) where I is the number of subgradient iterations and V the number
+    of locations. The space complexity is proportional to VV.
+    """
+
+    def __init__(self, short_paths, routes, iterations=50):
+        """ Constructor. The bound is computed on first use.
+
+        :param short_paths: shortest paths oracle with a dist(s, t) function
+        :param routes: Routes object with packages, constraints, number of routes and capacity
+        :param iterations: number of subgradient iterations, or 0 for the plain k-tree bound
+        """
+        self.short_paths = short_paths
+        self.routes = routes
+        self.iterations = iterations
+        self.__value = None
+
+    def min_routes(self):
+        """ Returns the least number of routes that can carry every package: enough routes for the total
+        number of packages, and every route with constrained locations
+        Worst case time complexity is O(N) where N is the number of locations
+
+        :return: number of routes
+        """
+        routes = self.routes
+        n_packages = sum(len(routes.packages.get(v)) for v in routes.packages.keys() if v != 0)
+        needed = -(-n_packages // routes.capacity) if routes.capacity > 0 else 0
+        constrained = sum(1 for constraint in routes.constraints if constraint)
+        return max(needed, constrained)
+
+    def value(self, upper=None):
+        """ Returns the lower bound on total mileage, computed on the first call and cached
+        Worst case time complexity is O(IVV) on the first call, then O(1)
+
+        :param upper: mileage of a known plan, used to size the subgradient steps, or None
+        :return: miles
+        """
+        if self.__value is None:
+            self.__value = self.__compute(upper)
+        return self.__value
+
+    def gap(self, cost):
+        """ Returns the optimality gap of a plan: the fraction of its mileage that may be above the optimum
+
+        :param cost: total mileage of a plan
+        :return: gap between 0 and 1
+        """
+        if cost <= 0:
+            return 0
+        return max(0, (cost - self.value(cost)) / cost)
+
+    def __compute(self, upper):
+        """ Computes the bound with subgradient optimization of the k-tree penalties
+
+        :param upper: mileage of a known plan, or None
+        :return: miles
+        """
+        dist = self.short_paths.dist
+        vertices = [0] + [v for v in self.routes.packages.keys() if v != 0]
+        n = len(vertices)
+        if n <= 1:
+            return 0
+        d = [[min(dist(a, b), dist(b, a)) for b in vertices] for a in vertices]
+        m = min(self.min_routes(), n - 1)
+        penalties = [0] * n
+        best, degrees = k_tree(d, penalties, m)
+        if upper is None:
+            upper = 2 * sum(d[0])
+        scale = 2
+        stale = 0
+        for iteration in range(self.iterations):
+            subgradient = [0] + [degrees[v] - 2 for v in range(1, n)]
+            norm = sum(g * g for g in subgradient)
+            if norm == 0:
+                # every location has degree 2: the k-tree is a plan, and the bound is exact
+                break
+            step = scale * max(upper - best, 1e-6 * upper) / norm
+            for v in range(1, n):
+                penalties[v] += step * subgradient[v]
+            weight, degrees = k_tree(d, penalties, m)
+            bound = weight - 2 * sum(penalties)
+            if bound > best + 1e-9:
+                best = bound
+                stale = 0
+            else:
+                stale += 1
+                if stale >= 5:
+                    scale /= 2
+                    stale = 0
+        return best
@@ -1,13 +1,31 @@
+import argparse
+
 import fromcsv
 import reporting
+from profiling import Profiler
+from Dijkstra import AllPairsDijkstra
+from RouteCostCache import RouteCostCache
 from NNRoutePlanner import NNRoutePlanner
 from SwapRouterPlanner import SwapRoutePlanner
-from Routes import Routes
+from Routes import Routes, split_location
+
 
+def main(profiler=None, workers=1):
+    """ Plan the day's routes and report package statuses
 
-def main():
-    graph = fromcsv.import_distances()
-    packages_pid, packages_lid = fromcsv.import_packages()
+    :param profiler: Profiler to time each stage with, or None
+    :param workers: number of processes to polish the final routes in, or None for the number of CPUs
+    :return:
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    with profiler.span('import distances'):
+        graph = fromcsv.import_distances()
+    with profiler.span('import packages'):
+        packages_pid, packages_lid = fromcsv.import_packages()
+    # package 9 reaches its corrected address (location 21) only after 10:20, but package 37 there is due by 10:30
+    # -> give package 9 a stop of its own, so the planner can visit the address twice
+    graph, corrected = split_location(graph, packages_lid, 21, {9})
 
     # prepare route parameters
     routes = Routes(packages_lid, n_routes=4, capacity=16)
@@ -20,46 +38,41 @@ def main():
     routes.constrain(0, 2)
     routes.constrain(0, 5)
     routes.constrain(0, 6)
-    # arrives at 9:05 am
-    routes.constrain(2, 9) # 10:30am deadline
-    routes.constrain(2, 25) # 10:30am deadline
-    routes.constrain(2, 16)
-    routes.constrain(2, 15)
-    # arrives at 10:20 am
-    # routes.constrain(3, 21)
+    # deadlines, delayed packages and the corrected address become time windows
+    routes.load_time_windows()
+    # there are only two drivers -> the last two routes are second trips that leave later in the morning
+    routes.set_departure_time(2, 1+5/60)
+    routes.set_departure_time(3, 2+20/60)
+
+    # find shortest paths once and share them, and the route mileage cache, between planners
+    with profiler.span('shortest paths'):
+        short_paths = AllPairsDijkstra(graph)
+    cache = RouteCostCache(short_paths)
 
     # optimize routes
-    planner = SwapRoutePlanner(graph, routes)
-    routes.plan, routes.loads, routes.cost = planner.optimize_global(starts=100, verbose=1)
-    # manually load the delayed package and recalculate mileage
-    routes.plan[3].append(21)
-    planner.clean_plan(routes.plan)
-    routes.cost = planner.score_all(routes.plan)
-    routes.loads = planner.calculate_loads(routes.plan, packages_lid)
+    with profiler.span('optimize'):
+        planner = SwapRoutePlanner(graph, routes, short_paths, cache=cache, polish_workers=workers)
+        routes.plan, routes.loads, routes.cost = planner.optimize_global(starts=100, verbose=1, report_gap=True)
     # calculate distances between route stops (these are shortest paths)
-    routes.distances = planner.distances(routes.plan)
+    with profiler.span('distances'):
+        routes.distances = planner.distances(routes.plan)
     # view cost
     print()
-    print(f"Final mileage: {routes.cost}")
+    print(f"Final mileage: {routes.cost} (gap: {planner.gap:.1%}, lateness: {planner.lateness:.2f} hours)")
     print("Final plan (by route and location id):")
     print(routes.plan)
 
-    # set departure time for status checking
-    routes.set_departure_time(0, 0)
-    routes.set_departure_time(1, 0)
-    routes.set_departure_time(2, 1+5/60)
-    routes.set_departure_time(3, 2+20/60)
-
     # get SP version
     sp_routes = Routes(packages_lid, n_routes=4, capacity=16)
     sp_plan = [[0, 1, 6, 2, 5, 0],
                [0, 18, 10, 3, 12, 21, 13, 4, 20, 23, 19, 0],
                [0, 15, 14, 9, 7, 17, 16, 22, 11, 24, 8, 25, 26, 0],
-               [0, 21, 0]]
-    nn_planner = NNRoutePlanner(graph)
-    sp_routes.plan = nn_planner.optimize_plan(sp_plan)
-    sp_routes.cost = nn_planner.score_all(sp_routes.plan)
-    sp_routes.distances = nn_planner.distances(sp_routes.plan)
+               [0, corrected, 0]]
+    with profiler.span('nearest neighbor'):
+        nn_planner = NNRoutePlanner(graph, short_paths, cache=cache)
+        sp_routes.plan = nn_planner.optimize_plan(sp_plan)
+        sp_routes.cost = nn_planner.score_all(sp_routes.plan)
+        sp_routes.distances = nn_planner.distances(sp_routes.plan)
     print()
     print(f"Final mileage: {sp_routes.cost}")
     print("Final plan (by route and location id):")
@@ -74,19 +87,36 @@ def main():
     # set time of day to 9:00am and view statuses
     print()
     print("Time is 9:00am")
-    routes.set_time(1)
-    reporting.print_all_statuses(packages_pid)
+    with profiler.span('simulate'):
+        routes.set_time(1)
+    with profiler.span('report'):
+        reporting.print_all_statuses(packages_pid)
     # set time of day to 10:25am and view statuses
     print()
     print("Time is 10:25am")
-    routes.set_time(2+25/60)
-    reporting.print_all_statuses(packages_pid)
+    with profiler.span('simulate'):
+        routes.set_time(2+25/60)
+    with profiler.span('report'):
+        reporting.print_all_statuses(packages_pid)
     # set time of day to 1:00pm and view statuses
     print()
     print("Time is 1:00pm")
-    routes.set_time(5)
-    reporting.print_all_statuses(packages_pid)
+    with profiler.span('simulate'):
+        routes.set_time(5)
+    with profiler.span('report'):
+        reporting.print_all_statuses(packages_pid)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Plan WGUPS delivery routes")
+    parser.add_argument('--profile', action='store_true', help="report the time taken by each stage")
+    parser.add_argument('--cprofile', action='store_true', help="also profile the functions called in each stage")
+    parser.add_argument('--memory', action='store_true', help="also report the peak memory of each stage")
+    parser.add_argument('--workers', type=int, default=1, help="processes to polish the final routes in")
+    args = parser.parse_args()
+    profiling = args.profile or args.cprofile or args.memory
+    profiler = Profiler(enabled=profiling, cprofile=args.cprofile, memory=args.memory)
+    main(profiler, args.workers)
+    if profiling:
+        print()
+        print(profiler.report())
@@ -1,50 +1,158 @@
 from Dijkstra import AllPairsDijkstra
+from RouteCostCache import RouteCostCache
 
 
 class NNRoutePlanner:
     """
-    Given a Graph, this class implements nearest-neighbor optimization functions that take
-    a set of location id's (e.g., a list) and find a low-mileage order in which to drive
-    to each location. The classes uses Dijkstra's shortest paths algorithm to determine the
-    distances between locations. It uses a greedy approach wherein at each step it chooses
-    the next closest location not visited in previous steps.
+    Given a Graph, this class implements construction functions that take a set of location id's
+    (e.g., a list) and find a low-mileage order in which to drive to each location. The class uses
+    Dijkstra's shortest paths algorithm to determine the distances between locations.
 
-    The worst case time complexity of the algorithm is O(VElogV). Here, V is the number of vertices (locations)
-    in the underlying graph and E is the number of edges in the graph.
+    Two methods are available. The nearest-neighbor method is greedy: at each step it chooses the next
+    closest location not visited in previous steps, using lists of each location's neighbors sorted by
+    distance. The cheapest-insertion method grows a tour from the hub, at each step inserting the location
+    that adds the fewest miles. Each location's best insertion point is kept up to date as the tour grows,
+    and locations whose best insertion point was used are only re-evaluated from scratch when needed.
 
-    The space complexity is proportional to V+E.
+    The worst case time complexity of finding shortest paths is O(VElogV). Here, V is the number of
+    vertices (locations) in the underlying graph and E is the number of edges in the graph.
+
+    The space complexity is proportional to VV.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, short_paths=None, cache=None):
+        """ Constructor
+
+        :param graph: a graph of type Graph
+        :param short_paths: shortest paths oracle to share with another planner, or None to find shortest paths
+        :param cache: RouteCostCache to share with another planner, or None to make a new cache
+        """
         # find shortest paths -> O(VElogV)
-        self.short_paths = AllPairsDijkstra(graph)
+        self.short_paths = short_paths if short_paths is not None else AllPairsDijkstra(graph)
+        # route mileage is memoized
+        self.cache = cache if cache is not None else RouteCostCache(self.short_paths)
 
-    def optimize_route(self, locations):
-        """ Arrange list of locations into optimized path.
-        The worst case time complexity is O(NN), where N is
-        the number of delivery stops in the route.
+    def optimize_route(self, locations, method='nearest'):
+        """ Arrange list of locations into optimized path that starts and ends at the hub.
+        Duplicate locations and the hub are ignored.
+        The worst case time complexity is O(NV) for the nearest-neighbor method and O(NN)
+        for the cheapest-insertion method, where N is the number of delivery stops in the route
+        and V is the number of locations in the graph.
 
         :param locations: iterable of location id's
+        :param method: 'nearest' for nearest-neighbor or 'insertion' for cheapest-insertion
         :return: optimized path (as an ordered list)
         """
+        unvisited = set(locations)
+        unvisited.discard(0)
+        if method == 'insertion':
+            return self._insertion_route(unvisited)
+        if method != 'nearest':
+            raise ValueError("method must be 'nearest' or 'insertion'")
         path = [0]
-        for i in range(len(locations)):
-            nn = 0
-            minimum = float('inf')
-            for j in locations:
-                if j in path:
-                    continue
-                dist = self.short_paths.dist(path[i], j)
-                if dist < minimum:
-                    minimum = dist
-                    nn = j
-            if nn in path:
-                continue
+        while unvisited:
+            nn = self._nearest(path[-1], unvisited)
+            unvisited.remove(nn)
             path.append(nn)
         path.append(0)
         return path
 
-    def optimize_plan(self, plan):
+    def _nearest(self, v, unvisited):
+        """ Returns the closest unvisited location to location v, breaking ties by location id.
+        Worst case time complexity is O(min(V, N)) where N is the number of unvisited locations
+
+        :param v: location id
+        :param unvisited: set of location id's
+        :return: location id
+        """
+        neighbors = self.short_paths.neighbors(v)
+        # scanning the sorted neighbors pays off while few of them have been visited
+        limit = min(len(neighbors), 2 * len(unvisited))
+        for k in range(limit):
+            if neighbors[k] in unvisited:
+                return neighbors[k]
+        dist = self.short_paths.dist
+        return min(unvisited, key=lambda w: (dist(v, w), w))
+
+    def _insertion_route(self, unvisited):
+        """ Arrange locations into a path with the cheapest-insertion method. The path is held as
+        a linked list of successors, and each unvisited location remembers the edge where inserting
+        it adds the fewest miles. After an insertion replaces edge (a, b) with edges (a, v) and (v, b),
+        every location only checks the two new edges. Locations that wanted edge (a, b) keep their old cost
+        as a lower bound, and are re-evaluated against the whole path only if they become the cheapest.
+        Distances between the route's locations are copied into a local matrix first.
+        Worst case time complexity is O(NN) where N is the number of delivery stops in the route
+
+        :param unvisited: set of location id's
+        :return: optimized path (as an ordered list)
+        """
+        # local matrix, where index 0 is the hub
+        stops = [0] + sorted(unvisited)
+        dist = self.short_paths.dist
+        d = [[dist(a, b) for b in stops] for a in stops]
+        d_to = [list(column) for column in zip(*d)]
+        n = len(stops)
+        succ = [-1] * n
+        succ[0] = 0
+        # best insertion cost and edge (identified by its start) for each location
+        best_cost = [d[0][w] + d[w][0] for w in range(n)]
+        best_edge = [0] * n
+        stale = [False] * n
+        remaining = set(range(1, n))
+        while remaining:
+            v = min(remaining, key=lambda w: (best_cost[w], w))
+            if stale[v]:
+                # the cost is a lower bound, so the true cost must be found before v can be chosen
+                best_cost[v], best_edge[v] = self._best_insertion(d, succ, v)
+                stale[v] = False
+                continue
+            remaining.remove(v)
+            a = best_edge[v]
+            b = succ[a]
+            succ[a] = v
+            succ[v] = b
+            from_a, to_v, from_v, to_b = d[a], d_to[v], d[v], d_to[b]
+            base_a, base_v = d[a][v], d[v][b]
+            for w in remaining:
+                if best_edge[w] == a:
+                    # edge (a, b) no longer exists, but every other edge costs at least as much
+                    stale[w] = True
+                cost = from_a[w] + to_v[w] - base_a
+                if cost < best_cost[w] or stale[w] and cost == best_cost[w]:
+                    best_cost[w], best_edge[w], stale[w] = cost, a, False
+                cost = from_v[w] + to_b[w] - base_v
+                if cost < best_cost[w] or stale[w] and cost == best_cost[w]:
+                    best_cost[w], best_edge[w], stale[w] = cost, v, False
+        path = [0]
+        v = succ[0]
+        while v != 0:
+            path.append(stops[v])
+            v = succ[v]
+        path.append(0)
+        return path
+
+    def _best_insertion(self, d, succ, v):
+        """ Find the edge of the path where inserting location v adds the fewest miles
+        Worst case time complexity is O(N) where N is the number of locations in the path
+
+        :param d: local distance matrix
+        :param succ: list of successors in the path, or -1 for locations not in the path
+        :param v: local index of location
+        :return: cost of insertion, start of edge
+        """
+        best_cost = float('inf')
+        best_edge = 0
+        a = 0
+        while True:
+            b = succ[a]
+            cost = d[a][v] + d[v][b] - d[a][b]
+            if cost < best_cost:
+                best_cost, best_edge = cost, a
+            a = b
+            if a == 0:
+                return best_cost, best_edge
+
+    def optimize_plan(self, plan, method='nearest'):
         """ Arrange each list of locations into optimized paths.
         This is a convenience function that runs the
         optimize_route() function on each element in the argument.
@@ -52,11 +160,12 @@ class NNRoutePlanner:
         number of delivery stops in the route plan.
 
         :param plan: list of iterables containing location id's
+        :param method: 'nearest' for nearest-neighbor or 'insertion' for cheapest-insertion
         :return: list of optimized paths (as ordered lists)
         """
         optimized = []
         for route in plan:
-            optimized.append(self.optimize_route(route))
+            optimized.append(self.optimize_route(route, method))
         return optimized
 
     def score_all(self, plan):
@@ -70,9 +179,8 @@ class NNRoutePlanner:
         :return: total of path costs (in miles)
         """
         cost = 0
-        for i in range(len(plan)):
-            for j in range(len(plan[i]) - 1):
-                cost += self.short_paths.dist(plan[i][j], plan[i][j + 1])
+        for route in plan:
+            cost += self.cache.cost(route)
         return cost
 
     def score_route(self, route):
@@ -85,10 +193,7 @@ class NNRoutePlanner:
         :param route: list of location id's
         :return: path cost (in miles)
         """
-        cost = 0
-        for i in range(len(route) - 1):
-            cost += self.short_paths.dist(route[i], route[i + 1])
-        return cost
+        return self.cache.cost(route)
 
     def distances(self, plan):
         """ Given a list of paths (ordered lists of location id's), returns
@@ -101,12 +206,7 @@ class NNRoutePlanner:
         :param plan: list of lists of location id's
         :return: list of lists of distances from prior elements in paths
         """
-        distances = []
-        for i in range(len(plan)):
-            distances.append([0])
-            for j in range(len(plan[i]) - 1):
-                distances[i].append(self.short_paths.dist(plan[i][j], plan[i][j + 1]))
-        return distances
+        return [self.cache.legs(route) for route in plan]
 
     def calculate_loads(self, plan, packages):
         """ calculates the number of packages on each vehicle/route.
@@ -121,6 +221,7 @@ class NNRoutePlanner:
         for i in range(len(plan)):
             for loc_id in plan[i]:
                 loads[i] += len(packages.get(loc_id))
+        return loads
 
     def path(self, s, t):
         """ Returns shortest path from vertex s to vertex t
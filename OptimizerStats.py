@@ -0,0 +1,172 @@
+import json
+import time
+
+
+class OptimizerStats:
+    """
+    Records where the SwapRoutePlanner spends its effort. Pass an OptimizerStats object to the planner to turn
+    recording on; without one, the planner skips every counter.
+
+    For each start (each run of optimize_local()) and each iteration within a start, the stats hold the number
+    of candidate swaps evaluated, the number rejected by vehicle constraints, by vehicle capacities and by
+    lateness, the number of swaps made, the cost and lateness after the iteration, and the seconds it took.
+    Candidates that pass every check but would add miles are the remainder.
+
+    The counters for the current iteration are plain attributes, so the planner can increment them directly.
+    Finished iterations and starts are kept as dictionaries, which can be written out as JSON with dump().
+    """
+
+    # counters recorded for each iteration
+    COUNTERS = ('candidates', 'constraint_rejections', 'capacity_rejections', 'time_rejections', 'accepted')
+
+    def __init__(self):
+        """ Constructor
+        """
+        self.starts = []
+        self.constraint_rejections = 0
+        self.capacity_rejections = 0
+        self.time_rejections = 0
+        self.accepted = 0
+        self.__evaluations = 0
+        self.__clock = 0
+
+    def begin_start(self, start, cost, evaluations=0):
+        """ Begin recording a start
+
+        :param start: index of the start
+        :param cost: mileage of the plan before local optimization
+        :param evaluations: the planner's evaluation count, from which candidates are counted
+        :return:
+        """
+        self.starts.append({'start': start, 'initial_cost': cost, 'final_cost': cost, 'lateness': 0,
+                            'seconds': 0, 'iterations': []})
+        self.__reset(evaluations)
+
+    def end_iteration(self, iteration, cost, lateness=0, evaluations=0):
+        """ Record the counters of an iteration and reset them for the next one
+
+        :param iteration: index of the iteration within the start
+        :param cost: mileage of the plan after the iteration
+        :param lateness: total lateness of the plan after the iteration (in hours)
+        :param evaluations: the planner's evaluation count
+        :return:
+        """
+        record = {'iteration': iteration,
+                  'candidates': evaluations - self.__evaluations,
+                  'constraint_rejections': self.constraint_rejections,
+                  'capacity_rejections': self.capacity_rejections,
+                  'time_rejections': self.time_rejections,
+                  'accepted': self.accepted,
+                  'cost': cost,
+                  'lateness': lateness,
+                  'seconds': time.perf_counter() - self.__clock}
+        current = self.starts[-1]
+        current['iterations'].append(record)
+        current['final_cost'] = cost
+        current['lateness'] = lateness
+        current['seconds'] += record['seconds']
+        self.__reset(evaluations)
+
+    def __reset(self, evaluations):
+        """ Reset the counters of the current iteration
+
+        :param evaluations: the planner's evaluation count
+        :return:
+        """
+        self.constraint_rejections = 0
+        self.capacity_rejections = 0
+        self.time_rejections = 0
+        self.accepted = 0
+        self.__evaluations = evaluations
+        self.__clock = time.perf_counter()
+
+    def state(self, starts=None):
+        """ Returns a copy of the recorded starts and the counters of the current iteration, as a dictionary of
+        plain values that restore() takes back, so a search resumed from a checkpoint keeps recording
+        Worst case time complexity is O(SI) where S is the number of starts and I the iterations per start
+
+        :param starts: number of starts to keep, to leave out a start that was cut short, or None to keep every start
+        :return: dictionary
+        """
+        return {'starts': [dict(current, iterations=list(current['iterations'])) for current in self.starts[:starts]],
+                'counters': {name: getattr(self, name) for name in self.COUNTERS if name != 'candidates'},
+                'evaluations': self.__evaluations}
+
+    def restore(self, state):
+        """ Replace the recorded starts and counters with a state from state(). The clock of the current
+        iteration restarts now.
+
+        :param state: dictionary from state()
+        :return:
+        """
+        self.starts = [dict(current, iterations=list(current['iterations'])) for current in state['starts']]
+        for name, value in state['counters'].items():
+            setattr(self, name, value)
+        self.__evaluations = state['evaluations']
+        self.__clock = time.perf_counter()
+
+    def totals(self):
+        """ Returns the counters and seconds summed over every recorded iteration
+        Worst case time complexity is O(SI) where S is the number of starts and I the iterations per start
+
+        :return: dictionary of counter names to totals, with the number of starts, iterations and seconds
+        """
+        totals = {name: 0 for name in self.COUNTERS}
+        totals['iterations'] = 0
+        totals['seconds'] = 0
+        for current in self.starts:
+            for record in current['iterations']:
+                for name in self.COUNTERS:
+                    totals[name] += record[name]
+                totals['iterations'] += 1
+                totals['seconds'] += record['seconds']
+        totals['starts'] = len(self.starts)
+        return totals
+
+    def trajectory(self):
+        """ Returns the cost after every iteration, one list per start
+
+        :return: list of lists of costs
+        """
+        return [[record['cost'] for record in current['iterations']] for current in self.starts]
+
+    def to_dict(self):
+        """ Returns the recorded statistics as a dictionary of plain values
+
+        :return: dictionary with the totals and the list of starts
+        """
+        return {'totals': self.totals(), 'starts': self.starts}
+
+    def dump(self, out, indent=None):
+        """ Write the recorded statistics as JSON
+
+        :param out: file path or text stream
+        :param indent: JSON indentation, or None for a single line
+        :return:
+        """
+        if hasattr(out, 'write'):
+            json.dump(self.to_dict(), out, indent=indent)
+        else:
+            with open(out, 'w') as file:
+                json.dump(self.to_dict(), file, indent=indent)
+
+    def summary(self):
+        """ Returns a short report with one line per start and a line of totals
+
+        :return: string
+        """
+        lines = []
+        for current in self.starts:
+            records = current['iterations']
+            lines.append(f"Start {current['start']}: {current['initial_cost']:.1f} -> {current['final_cost']:.1f} "
+                         f"miles in {len(records)} iterations, "
+                         f"{sum(record['candidates'] for record in records)} candidates, "
+                         f"{sum(record['accepted'] for record in records)} accepted, "
+                         f"{current['seconds']:.3f}s")
+        totals = self.totals()
+        lines.append(f"Total: {totals['candidates']} candidates, "
+                     f"{totals['constraint_rejections']} constraint, "
+                     f"{totals['capacity_rejections']} capacity and "
+                     f"{totals['time_rejections']} time rejections, "
+                     f"{totals['accepted']} accepted, {totals['seconds']:.3f}s")
+        return "\n".join(lines)
@@ -3,7 +3,11 @@ class Package:
     The Package class holds package data
     """
 
-    def __init__(self, pid, lid, address, city, state, zip_code, weight, deadline, status):
+    __slots__ = ('pid', 'lid', 'address', 'city', 'state', 'zip_code', 'weight', 'deadline', 'status',
+                 'due_time', 'ready_time', 'notes')
+
+    def __init__(self, pid, lid, address, city, state, zip_code, weight, deadline, status,
+                 due_time=float('inf'), ready_time=0, notes=''):
         self.pid = pid
         self.lid = lid
         self.address = address
@@ -13,6 +17,10 @@ class Package:
         self.weight = weight
         self.deadline = deadline
         self.status = status
+        # delivery deadline and earliest departure, in hours since 8:00am
+        self.due_time = due_time
+        self.ready_time = ready_time
+        self.notes = notes
 
     def __eq__(self, other):
         return (self.pid == other.pid and
@@ -0,0 +1,392 @@
+from array import array
+from bisect import bisect_left
+import json
+import mmap
+import sys
+
+# package statuses, stored as their index in this tuple
+STATUSES = ('At hub', 'In route', 'Delivered')
+# minutes stored for a package without a deadline
+NO_TIME = 2 ** 31 - 1
+# first bytes of a package store file
+MAGIC = b'PKGSTORE1\n'
+
+
+def _minutes(hours):
+    """ Convert hours since 8:00am to whole minutes, with float('inf') stored as NO_TIME """
+    return NO_TIME if hours == float('inf') else round(hours * 60)
+
+
+def _hours(minutes):
+    """ Convert minutes since 8:00am to hours, with NO_TIME read as float('inf') """
+    return float('inf') if minutes == NO_TIME else minutes / 60
+
+
+class PackageStore:
+    """
+    Column store of packages. Each field is held in a typed array with one entry per package (a row), instead
+    of one Python object per package: pid, lid and weight, deadline and ready time in minutes since 8:00am,
+    and status as a small code. Text fields are dictionary encoded, so each distinct city, state, zip code,
+    address, deadline and note is stored once and rows hold its index.
+
+    Packages are found by pid through an array of rows sorted by pid, searched with binary search, and by
+    location id through an array of rows grouped by location, with an array of offsets where each location's
+    rows start. Neither index holds package objects.
+
+    PackageView objects give the existing callers (Routes, the planners, reporting) the attributes of a
+    Package, read from the columns; packages_pid() and packages_lid() give the get(), keys(), values(),
+    len() and iteration of the HashDict dictionaries that fromcsv.import_packages() returns.
+
+    A store can be saved to a file and loaded back with load(), which maps the file into memory, so columns
+    are read from the page cache without being parsed or copied. Statuses can be changed in a loaded store;
+    the changes stay in memory and are not written back to the file.
+
+    Space is proportional to N plus the length of the distinct strings, where N is the number of packages.
+    """
+
+    # dictionary encoded text fields, in the order of Package's constructor
+    TEXT = ('address', 'city', 'state', 'zip_code', 'deadline', 'notes')
+    # typed columns, with their array type codes
+    COLUMNS = (('pid', 'q'), ('lid', 'i'), ('weight', 'd'), ('due', 'i'), ('ready', 'i'), ('status', 'b'),
+               ('address', 'i'), ('city', 'i'), ('state', 'i'), ('zip_code', 'i'), ('deadline', 'i'),
+               ('notes', 'i'))
+    # index arrays, built by build_indexes()
+    INDEXES = ('pid_order', 'lid_offsets', 'lid_rows')
+
+    def __init__(self):
+        """ Constructor for an empty store
+        Worst case time complexity of O(1)
+        """
+        self.columns = {name: array(code) for name, code in self.COLUMNS}
+        self.strings = {name: [] for name in self.TEXT}
+        self.indexes = None
+        self.__codes = {name: {} for name in self.TEXT}
+        self.__mmap = None
+
+    def append(self, pid, lid, address, city, state, zip_code, weight, deadline, status='At hub',
+               due_time=float('inf'), ready_time=0, notes=''):
+        """ Add a package, with the same arguments as the Package constructor
+        Worst case time complexity of O(1) amortized
+
+        :return: row of the package
+        """
+        if self.__mmap is not None:
+            raise ValueError("packages cannot be added to a store loaded from a file")
+        columns = self.columns
+        columns['pid'].append(pid)
+        columns['lid'].append(lid)
+        columns['weight'].append(weight)
+        columns['due'].append(_minutes(due_time))
+        columns['ready'].append(_minutes(ready_time))
+        columns['status'].append(STATUSES.index(status))
+        for name, text in zip(self.TEXT, (address, city, state, zip_code, deadline, notes)):
+            codes = self.__codes[name]
+            code = codes.get(text)
+            if code is None:
+                code = codes[text] = len(self.strings[name])
+                self.strings[name].append(text)
+            columns[name].append(code)
+        self.indexes = None
+        return len(columns['pid']) - 1
+
+    def __len__(self):
+        return len(self.columns['pid'])
+
+    def build_indexes(self):
+        """ Build the pid and location id indexes. Called on first lookup after packages are added.
+        Worst case time complexity of O(NlogN + L) where L is the largest location id
+
+        :return:
+        """
+        pids = self.columns['pid']
+        lids = self.columns['lid']
+        n = len(pids)
+        pid_order = array('i', sorted(range(n), key=pids.__getitem__))
+        # counting sort of rows by location id
+        n_lids = max(lids, default=0) + 1
+        lid_offsets = array('i', bytes(4 * (n_lids + 1)))
+        for lid in lids:
+            lid_offsets[lid + 1] += 1
+        for lid in range(n_lids):
+            lid_offsets[lid + 1] += lid_offsets[lid]
+        lid_rows = array('i', bytes(4 * n))
+        filled = array('i', lid_offsets[:n_lids])
+        for row in range(n):
+            lid = lids[row]
+            lid_rows[filled[lid]] = row
+            filled[lid] += 1
+        self.indexes = {'pid_order': pid_order, 'lid_offsets': lid_offsets, 'lid_rows': lid_rows}
+
+    def row(self, pid):
+        """ Returns the row of a package, or None if no package has the pid
+        Worst case time complexity of O(logN)
+
+        :param pid: package id
+        :return: row
+        """
+        if self.indexes is None:
+            self.build_indexes()
+        order = self.indexes['pid_order']
+        pids = self.columns['pid']
+        k = bisect_left(order, pid, key=pids.__getitem__)
+        if k < len(order) and pids[order[k]] == pid:
+            return order[k]
+        return None
+
+    def rows_at(self, lid):
+        """ Returns the rows of the packages delivered to a location
+        Worst case time complexity of O(K) where K is the number of packages at the location
+
+        :param lid: location id
+        :return: sequence of rows
+        """
+        if self.indexes is None:
+            self.build_indexes()
+        offsets = self.indexes['lid_offsets']
+        if lid < 0 or lid + 1 >= len(offsets):
+            return []
+        return self.indexes['lid_rows'][offsets[lid]:offsets[lid + 1]]
+
+    def get(self, pid):
+        """ Returns a view of a package, or None if no package has the pid
+
+        :param pid: package id
+        :return: PackageView
+        """
+        row = self.row(pid)
+        return PackageView(self, row) if row is not None else None
+
+    def at(self, lid):
+        """ Returns views of the packages delivered to a location
+
+        :param lid: location id
+        :return: list of PackageView objects
+        """
+        return [PackageView(self, row) for row in self.rows_at(lid)]
+
+    def packages_pid(self):
+        """ Returns a dictionary view of the packages with package id's as keys
+
+        :return: PidIndex
+        """
+        return PidIndex(self)
+
+    def packages_lid(self):
+        """ Returns a dictionary view of the packages with location id's as keys and lists of packages as values.
+        The hub (location 0) is always a key.
+
+        :return: LidIndex
+        """
+        return LidIndex(self)
+
+    def nbytes(self):
+        """ Returns the number of bytes held by the columns and indexes, without the distinct strings
+
+        :return: bytes
+        """
+        if self.indexes is None:
+            self.build_indexes()
+        arrays = list(self.columns.values()) + list(self.indexes.values())
+        return sum(len(column) * column.itemsize for column in arrays)
+
+    def save(self, path):
+        """ Write the store to a file that load() can map into memory. The file holds a JSON header with the
+        distinct strings and the position of each column, then each column, aligned to 8 bytes.
+        Worst case time complexity of O(N)
+
+        :param path: path of the file
+        :return:
+        """
+        if self.indexes is None:
+            self.build_indexes()
+        blocks = [(name, code, self.columns[name]) for name, code in self.COLUMNS]
+        blocks += [(name, 'i', self.indexes[name]) for name in self.INDEXES]
+        layout = []
+        offset = 0
+        for name, code, column in blocks:
+            size = len(column) * column.itemsize
+            layout.append([name, code, offset, size])
+            offset += size + (-size % 8)
+        header = json.dumps({'rows': len(self), 'byteorder': sys.byteorder, 'columns': layout,
+                             'strings': self.strings}).encode()
+        start = len(MAGIC) + 8 + len(header)
+        start += -start % 8
+        with open(path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(len(header).to_bytes(8, 'little'))
+            file.write(header)
+            file.write(bytes(start - file.tell()))
+            for (name, code, block_offset, size), (name, code, column) in zip(layout, blocks):
+                file.write(bytes(start + block_offset - file.tell()))
+                file.write(column.tobytes())
+
+
+def load(path):
+    """ Map a file written by PackageStore.save() into memory. Columns are memoryviews of the mapped file, so
+    loading takes time proportional to the number of distinct strings, not the number of packages.
+
+    :param path: path of the file
+    :return: PackageStore
+    """
+    with open(path, 'rb') as file:
+        # copy on write: statuses can change in memory without changing the file
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a package store file")
+    length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+    start = len(MAGIC) + 8 + length
+    start += -start % 8
+    view = memoryview(buffer)
+    arrays = {name: view[start + offset:start + offset + size].cast(code)
+              for name, code, offset, size in header['columns']}
+    store = PackageStore()
+    store.columns = {name: arrays[name] for name, code in PackageStore.COLUMNS}
+    store.indexes = {name: arrays[name] for name in PackageStore.INDEXES}
+    store.strings = header['strings']
+    store._PackageStore__mmap = buffer
+    return store
+
+
+class PackageView:
+    """
+    A package read from a row of a PackageStore, with the attributes of Package. Only the store and the
+    row are held, so a view is small and quick to make. Setting status changes the store.
+    """
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def pid(self):
+        return self._store.columns['pid'][self._row]
+
+    @property
+    def lid(self):
+        return self._store.columns['lid'][self._row]
+
+    @property
+    def weight(self):
+        return self._store.columns['weight'][self._row]
+
+    @property
+    def due_time(self):
+        return _hours(self._store.columns['due'][self._row])
+
+    @property
+    def ready_time(self):
+        return _hours(self._store.columns['ready'][self._row])
+
+    @property
+    def status(self):
+        return STATUSES[self._store.columns['status'][self._row]]
+
+    @status.setter
+    def status(self, status):
+        self._store.columns['status'][self._row] = STATUSES.index(status)
+
+    @property
+    def address(self):
+        return self._text('address')
+
+    @property
+    def city(self):
+        return self._text('city')
+
+    @property
+    def state(self):
+        return self._text('state')
+
+    @property
+    def zip_code(self):
+        return self._text('zip_code')
+
+    @property
+    def deadline(self):
+        return self._text('deadline')
+
+    @property
+    def notes(self):
+        return self._text('notes')
+
+    def _text(self, name):
+        return self._store.strings[name][self._store.columns[name][self._row]]
+
+    def __eq__(self, other):
+        return (self.pid == other.pid and
+                self.lid == other.lid and
+                self.weight == other.weight)
+
+    def __hash__(self):
+        hash_code = 1
+        hash_code = 31 * hash_code + hash(self.pid)
+        hash_code = 31 * hash_code + hash(self.lid)
+        return hash_code
+
+    def __repr__(self):
+        return f"PackageView({self.pid}, {self.lid}, {self.deadline}, {self.status})"
+
+
+class PidIndex:
+    """
+    Dictionary view of a PackageStore with package id's as keys and PackageView objects as values
+    """
+
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, pid):
+        return self.store.get(pid)
+
+    def keys(self):
+        return list(self.store.columns['pid'])
+
+    def values(self):
+        return [PackageView(self.store, row) for row in range(len(self.store))]
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        store = self.store
+        return ((pid, PackageView(store, row)) for row, pid in enumerate(store.columns['pid']))
+
+
+class LidIndex:
+    """
+    Dictionary view of a PackageStore with location id's as keys and lists of PackageView objects as values.
+    The hub (location 0) is a key with an empty list if no package is delivered there.
+    """
+
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, lid):
+        packages = self.store.at(lid)
+        if not packages and lid != 0:
+            return None
+        return packages
+
+    def keys(self):
+        if self.store.indexes is None:
+            self.store.build_indexes()
+        offsets = self.store.indexes['lid_offsets']
+        return [lid for lid in range(len(offsets) - 1) if lid == 0 or offsets[lid + 1] > offsets[lid]]
+
+    def values(self):
+        return [self.get(lid) for lid in self.keys()]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __iter__(self):
+        return ((lid, self.get(lid)) for lid in self.keys())
@@ -0,0 +1,263 @@
+from Dijkstra import AllPairsDijkstra
+from NNRoutePlanner import NNRoutePlanner
+from SwapRouterPlanner import SwapRoutePlanner
+from GeneticRoutePlanner import GeneticRoutePlanner
+
+import contextlib
+import io
+import multiprocessing
+from multiprocessing.connection import wait
+import random
+import time
+import traceback
+
+# planners that search under a time budget, by name, with the name of their search function
+PLANNERS = {'swap': (SwapRoutePlanner, 'optimize_global'), 'genetic': (GeneticRoutePlanner, 'evolve')}
+
+
+class Incumbent:
+    """
+    The best plan found by any runner of a Portfolio, held in shared memory so every process can read and
+    update it. The plan is held as a flat integer array with one row per route, each padded with zeros to
+    the same width. Updates are made under a lock, and only if the plan improves on the incumbent, first
+    by lateness, then by mileage.
+    """
+
+    def __init__(self, n_routes, width, n_configs, context=multiprocessing):
+        """ Constructor
+
+        :param n_routes: number of routes in a plan
+        :param width: largest number of entries in a route, including the hub at each end
+        :param n_configs: number of runners, each with its own best cost
+        :param context: multiprocessing context to allocate shared memory from
+        """
+        self.n_routes = n_routes
+        self.width = width
+        self.lock = context.Lock()
+        self.cost = context.Value('d', float('inf'), lock=False)
+        self.lateness = context.Value('d', float('inf'), lock=False)
+        self.winner = context.Value('i', -1, lock=False)
+        self.plan = context.Array('i', n_routes * width, lock=False)
+        # best mileage of each runner, for reporting
+        self.costs = context.Array('d', [float('inf')] * n_configs, lock=False)
+
+    def publish(self, k, cost, lateness, plan):
+        """ Offer the plan of runner k, and keep it if it improves on the incumbent
+        Worst case time complexity is O(RW) where R is the number of routes and W the route width
+
+        :param k: index of the runner
+        :param cost: total mileage of the plan
+        :param lateness: total lateness of the plan (in hours)
+        :param plan: route plan
+        :return: True if the plan is the new incumbent
+        """
+        with self.lock:
+            self.costs[k] = min(self.costs[k], cost)
+            if (lateness, cost) >= (self.lateness.value, self.cost.value):
+                return False
+            row = []
+            for route in plan:
+                stops = [v for v in route if v != 0]
+                if len(stops) > self.width - 2:
+                    raise ValueError("route has more stops than the route width")
+                row += [0] + stops + [0] * (self.width - 1 - len(stops))
+            self.plan[:] = row
+            self.cost.value = cost
+            self.lateness.value = lateness
+            self.winner.value = k
+            return True
+
+    def behind(self, cost, lateness, margin):
+        """ Test if a runner's best plan is worse than the incumbent: later, or more than margin (a fraction)
+        longer. Reads the incumbent without the lock, since a stale value only delays pruning.
+        Worst case time complexity is O(1)
+
+        :param cost: mileage of the runner's best plan
+        :param lateness: lateness of the runner's best plan (in hours)
+        :param margin: fraction of the incumbent's mileage a runner may be behind by
+        :return: True if the runner is behind
+        """
+        if lateness > self.lateness.value + 1e-9:
+            return True
+        return lateness >= self.lateness.value - 1e-9 and cost > self.cost.value * (1 + margin)
+
+    def get(self):
+        """ Returns the incumbent plan, with every route starting and ending at the hub
+
+        :return: route plan, or None if no plan was published
+        """
+        if self.winner.value < 0:
+            return None
+        row = self.plan[:]
+        width = self.width
+        return [[0] + [v for v in row[k:k + width] if v != 0] + [0] for k in range(0, len(row), width)]
+
+
+def _run_config(k, config, graph, routes, short_paths, incumbent, deadline, prune, prune_after, seed):
+    """ Run one planner configuration of a Portfolio until it finishes, its deadline passes or it falls behind
+    the incumbent, and publish each improvement. This function runs in worker processes.
+
+    :param k: index of the configuration
+    :param config: dictionary with the planner name under 'planner', and keyword arguments for the planner
+    :param graph: a graph of type Graph
+    :param routes: Routes object
+    :param short_paths: shortest paths oracle
+    :param incumbent: shared Incumbent
+    :param deadline: time.time() at which to stop
+    :param prune: fraction of the incumbent's mileage a run may be behind by before it stops
+    :param prune_after: time.time() after which runs that are behind stop
+    :param seed: random seed
+    :return:
+    """
+    random.seed(seed)
+    options = dict(config)
+    name = options.pop('planner')
+    initializer = options.pop('initializer', 'balanced')
+    with contextlib.redirect_stdout(io.StringIO()):
+        if name == 'nearest':
+            planner = SwapRoutePlanner(graph, routes, short_paths, initializer=initializer)
+            plan = NNRoutePlanner(graph, short_paths, planner.cache).optimize_plan(planner.plan,
+                                                                                     options.get('method', 'nearest'))
+            incumbent.publish(k, planner.score_all(plan), planner.score_lateness(plan), plan)
+            return
+        planner_class, search = PLANNERS[name]
+        planner = planner_class(graph, routes, short_paths, initializer=initializer)
+
+        def publish(cost, lateness, plan, start):
+            incumbent.publish(k, cost, lateness, plan)
+
+        def cancel():
+            now = time.time()
+            return now >= deadline or (now >= prune_after and incumbent.behind(planner.cost, planner.lateness, prune))
+
+        publish(planner.cost, planner.lateness, planner.plan, 0)
+        plan, loads, cost = getattr(planner, search)(time_budget=max(0, deadline - time.time()), callback=publish,
+                                                     cancel=cancel, **options)
+    incumbent.publish(k, cost, planner.lateness, plan)
+
+
+def _run_reporting(errors, k, *task):
+    """ Run one planner configuration with _run_config(), and report an exception it raises to the parent
+    instead of losing it in the worker process
+
+    :param errors: queue the index of the configuration and the traceback are put on if the run fails
+    :param k: index of the configuration
+    :param task: the remaining arguments of _run_config()
+    :return:
+    """
+    try:
+        _run_config(k, *task)
+    except Exception:
+        errors.put((k, traceback.format_exc()))
+
+
+class Portfolio:
+    """
+    Runs several planner configurations concurrently, one process each, under one time budget, and returns
+    the best plan found by any of them. Different instances suit different planners: NNRoutePlanner orders
+    an initial assignment instantly, while SwapRoutePlanner with many starts is slow but finds better plans.
+
+    The runners share the incumbent (the best plan so far, with its mileage and lateness) through shared
+    memory. Every runner publishes each improvement as it is found. Once a fraction of the budget has passed,
+    a runner whose best plan is later than the incumbent, or more than a margin longer, cancels itself and
+    frees its core for the others.
+
+    Configurations are dictionaries with the planner under 'planner' ('nearest', 'swap' or 'genetic') and
+    keyword arguments for its search function (SwapRoutePlanner.optimize_global() or
+    GeneticRoutePlanner.evolve()), plus an 'initializer' for the initial plan. The
+    'nearest' planner takes a 'method' ('nearest' or 'insertion') for NNRoutePlanner.optimize_plan().
+
+    The time taken is about the time budget, with the work spread over one core per configuration, or over
+    a given number of worker processes that each take the next configuration when their runner ends. A runner
+    that raises an exception is reported in errors, and the other runners carry on.
+    """
+
+    # configurations run when none are given
+    CONFIGS = ({'planner': 'nearest', 'method': 'insertion', 'initializer': 'savings'},
+               {'planner': 'swap', 'starts': 1000, 'neighbors': 10},
+               {'planner': 'swap', 'starts': 1000, 'initializer': 'savings'},
+               {'planner': 'genetic', 'generations': 1000})
+
+    def __init__(self, graph, routes, short_paths=None, configs=None, prune=0.1, prune_after=0.5):
+        """ Constructor
+
+        :param graph: a graph of type Graph
+        :param routes: Routes object with packages, constraints, time windows, number of routes and capacity
+        :param short_paths: shortest paths oracle to share with the runners, or None to find shortest paths
+        :param configs: list of configuration dictionaries, or None for the default CONFIGS
+        :param prune: fraction of the incumbent's mileage a runner may be behind by before it cancels itself
+        :param prune_after: fraction of the time budget after which runners that are behind cancel themselves
+        """
+        self.graph = graph
+        self.routes = routes
+        self.short_paths = short_paths if short_paths is not None else AllPairsDijkstra(graph)
+        self.configs = list(configs) if configs is not None else list(self.CONFIGS)
+        for config in self.configs:
+            if config.get('planner') not in PLANNERS and config.get('planner') != 'nearest':
+                raise ValueError(f"unknown planner: {config.get('planner')}")
+        self.prune = prune
+        self.prune_after = prune_after
+        # set by run()
+        self.winner = None
+        self.costs = None
+        self.lateness = None
+        self.errors = None
+
+    def run(self, time_budget=10, workers=None, seed=None, grace=5):
+        """ Run every configuration under the time budget, and return the best plan found
+        Worst case time complexity is the time budget plus the time a runner takes to notice it ran out
+
+        :param time_budget: seconds of wall-clock time
+        :param workers: 0 or 1 to run configurations one after another in this process (sharing the budget),
+                        the largest number of runner processes at a time, or None to run each in its own process
+        :param seed: random seed; runner k is seeded with seed + k, or at random if None
+        :param grace: seconds to wait past the budget for runners to finish before they are terminated
+        :return: route plan, list of route loads, total mileage
+        """
+        routes = self.routes
+        width = min(routes.capacity, len(routes.packages.keys())) + 2
+        context = multiprocessing.get_context()
+        incumbent = Incumbent(routes.n_routes, width, len(self.configs), context)
+        start = time.time()
+        deadline = start + time_budget
+        prune_after = start + self.prune_after * time_budget
+        seed = seed if seed is not None else random.randrange(2 ** 32)
+        errors = context.SimpleQueue()
+        tasks = [(errors, k, config, self.graph, routes, self.short_paths, incumbent, deadline, self.prune,
+                  prune_after, seed + k) for k, config in enumerate(self.configs)]
+        if workers is not None and workers <= 1:
+            for task in tasks:
+                _run_reporting(*task)
+        else:
+            size = workers if workers is not None else len(tasks)
+            waiting = [context.Process(target=_run_reporting, args=task, daemon=True) for task in tasks]
+            waiting.reverse()
+            running = []
+            while running or waiting and time.time() < deadline:
+                # a configuration that has not started by the deadline is not run
+                while waiting and len(running) < size and time.time() < deadline:
+                    running.append(waiting.pop())
+                    running[-1].start()
+                left = deadline + grace - time.time()
+                if not running or left <= 0:
+                    break
+                wait([process.sentinel for process in running], left)
+                running = [process for process in running if process.is_alive()]
+            for process in running:
+                process.terminate()
+                process.join()
+        self.errors = {}
+        while not errors.empty():
+            k, message = errors.get()
+            self.errors[k] = message
+        plan = incumbent.get()
+        if plan is None:
+            if self.errors:
+                raise RuntimeError("every configuration failed or found no plan; the first error was:\n"
+                                   + self.errors[min(self.errors)])
+            raise RuntimeError("no configuration found a plan within the time budget")
+        self.winner = incumbent.winner.value
+        self.costs = list(incumbent.costs)
+        self.lateness = incumbent.lateness.value
+        loads = [sum(len(routes.packages.get(v)) for v in route if v != 0) for route in plan]
+        return plan, loads, incumbent.cost.value
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+
+class RouteCostCache:
+    """
+    Least-recently-used cache of route mileage, keyed by the route's sequence of location id's.
+    Each entry holds the miles of the route and the miles of each leg, so a route that has been scored
+    once can be scored again, or broken into legs for Routes.distances, in the time it takes to hash it.
+
+    The cache holds at most max_size routes. When it is full, the route that was used least recently is
+    evicted. Hits, misses and evictions are counted, so the cache can be sized against a workload.
+
+    A single cache can be shared by planners that use the same shortest paths oracle.
+
+    Where N is the number of stops in a route, scoring a route is O(N) for hits and misses alike, but a hit
+    only hashes the route instead of looking up N shortest path distances.
+    Uses extra space proportional to SN, where S is max_size
+    """
+
+    def __init__(self, short_paths, max_size=100000):
+        """ Constructor
+
+        :param short_paths: shortest paths oracle with a dist(s, t) function
+        :param max_size: largest number of routes to keep
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be a positive integer")
+        self.short_paths = short_paths
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+
+    def __entry(self, route):
+        """ Returns the (miles, legs) entry of a route, computing and caching it on a miss
+
+        :param route: list of location id's
+        :return: (total miles, tuple of miles from the prior stop, starting with 0)
+        """
+        key = tuple(route)
+        entries = self.__entries
+        entry = entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        dist = self.short_paths.dist
+        legs = (0,) + tuple(map(dist, key[:-1], key[1:]))
+        cost = 0
+        for leg in legs:
+            cost += leg
+        entry = entries[key] = (cost, legs)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def cost(self, route):
+        """ Returns the miles required to drive a route
+        Worst case time complexity is O(N) where N is the number of stops in the route
+
+        :param route: list of location id's
+        :return: path cost (in miles)
+        """
+        return self.__entry(route)[0]
+
+    def legs(self, route):
+        """ Returns the miles from each stop in a route to the next stop
+        Worst case time complexity is O(N) where N is the number of stops in the route
+
+        :param route: list of location id's
+        :return: list of distances from the prior stop, starting with 0 for the first stop
+        """
+        return list(self.__entry(route)[1])
+
+    def hit_rate(self):
+        """ Returns the fraction of lookups that were hits
+
+        :return: hit rate, or 0 if there have been no lookups
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def clear(self):
+        """ Remove every entry and reset the counters
+
+        :return:
+        """
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, route):
+        return tuple(route) in self.__entries
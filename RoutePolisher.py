@@ -0,0 +1,235 @@
+from HeldKarp import solve_tour
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+
+def tour_length(d, tour):
+    """ Returns the length of a tour through a distance matrix
+
+    :param d: square distance matrix (list of lists)
+    :param tour: list of indexes
+    :return: length
+    """
+    return sum(d[tour[k]][tour[k + 1]] for k in range(len(tour) - 1))
+
+
+def tour_lateness(d, tour, due, departure=0, mph=1):
+    """ Returns the total number of hours by which a tour misses due times
+
+    :param d: square distance matrix (list of lists)
+    :param tour: list of indexes
+    :param due: list of due times for each index, or None
+    :param departure: time the vehicle leaves the first index
+    :param mph: vehicle speed, to convert miles to hours
+    :return: hours late
+    """
+    if due is None:
+        return 0
+    late = 0
+    arrival = departure
+    for k in range(1, len(tour)):
+        arrival += d[tour[k - 1]][tour[k]] / mph
+        late += max(0, arrival - due[tour[k]])
+    return late
+
+
+def two_opt(d, tour):
+    """ Improve a tour in place by reversing segments while that makes it shorter. The distance
+    matrix is assumed to be symmetric, as shortest path distances on the road graph are.
+    Each pass has worst case time complexity of O(NN) where N is the number of stops
+
+    :param d: square distance matrix (list of lists)
+    :param tour: list of indexes starting and ending at the hub
+    :return: True if the tour changed
+    """
+    changed = False
+    improved = True
+    n = len(tour)
+    while improved:
+        improved = False
+        for a in range(n - 3):
+            u, u_next = tour[a], tour[a + 1]
+            row = d[u]
+            for b in range(a + 2, n - 1):
+                v, v_next = tour[b], tour[b + 1]
+                delta = row[v] + d[u_next][v_next] - row[u_next] - d[v][v_next]
+                if delta < -1e-9:
+                    tour[a + 1:b + 1] = tour[b:a:-1]
+                    u_next = tour[a + 1]
+                    improved = changed = True
+    return changed
+
+
+def or_opt(d, tour, max_segment=3):
+    """ Improve a tour in place by moving segments of up to max_segment stops to another position,
+    while that makes it shorter.
+    Each pass has worst case time complexity of O(SNN) where S is max_segment and N is the number of stops
+
+    :param d: square distance matrix (list of lists)
+    :param tour: list of indexes starting and ending at the hub
+    :param max_segment: longest segment to move
+    :return: True if the tour changed
+    """
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        n = len(tour)
+        for length in range(1, max_segment + 1):
+            for a in range(1, n - length):
+                b = a + length - 1
+                prev_v, first, last, next_v = tour[a - 1], tour[a], tour[b], tour[b + 1]
+                removed = d[prev_v][first] + d[last][next_v] - d[prev_v][next_v]
+                best, best_k = -1e-9, None
+                for k in range(n - 1):
+                    if a - 1 <= k <= b:
+                        continue
+                    v, w = tour[k], tour[k + 1]
+                    delta = d[v][first] + d[last][w] - d[v][w] - removed
+                    if delta < best:
+                        best, best_k = delta, k
+                if best_k is not None:
+                    segment = tour[a:b + 1]
+                    del tour[a:b + 1]
+                    k = best_k if best_k < a else best_k - length
+                    tour[k + 1:k + 1] = segment
+                    improved = changed = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+def polish_order(d, due=None, departure=0, mph=1, max_exact=10, deadline=None):
+    """ Find a short order for a route given as a distance matrix, where index 0 is the hub and the
+    current order is 0, 1, 2, ... Routes with up to max_exact stops are solved exactly with Held-Karp,
+    and longer routes are improved with 2-opt and or-opt. An order is only used if it is shorter than
+    the current order and not later in total. Once the deadline passes, the current order is kept.
+    This function runs in worker processes, so it only takes and returns plain lists.
+
+    :param d: square distance matrix (list of lists) of the hub and the route's stops, in route order
+    :param due: list of due times for each index, or None to ignore time windows
+    :param departure: time the vehicle leaves the hub
+    :param mph: vehicle speed, to convert miles to hours
+    :param max_exact: largest number of stops to solve exactly
+    :param deadline: time.perf_counter() value at which to give up, or None to always finish
+    :return: (tour as a list of indexes starting and ending with 0, tour length)
+    """
+    current = list(range(len(d))) + [0]
+    length = tour_length(d, current)
+    late = tour_lateness(d, current, due, departure, mph)
+    if deadline is not None and time.perf_counter() >= deadline:
+        return current, length
+    if len(d) - 1 <= max_exact:
+        tour, best = solve_tour(d, due, departure, mph, deadline)
+        if tour is None:
+            tour, best = solve_tour(d, deadline=deadline)
+        if tour is None:
+            return current, length
+    else:
+        tour = list(current)
+        two_opt(d, tour)
+        or_opt(d, tour)
+        best = tour_length(d, tour)
+    if best < length - 1e-9 and tour_lateness(d, tour, due, departure, mph) <= late + 1e-9:
+        return tour, best
+    return current, length
+
+
+def _polish_task(task):
+    """ Polish one route in a worker process. The deadline comes as a time.time() value, since
+    time.perf_counter() values of different processes cannot be compared.
+
+    :param task: (arguments of polish_order() up to max_exact, time.time() deadline or None)
+    :return: (tour, tour length) from polish_order()
+    """
+    *arguments, deadline = task
+    if deadline is not None:
+        deadline = time.perf_counter() + deadline - time.time()
+    return polish_order(*arguments, deadline=deadline)
+
+
+class RoutePolisher:
+    """
+    Reorders the stops of each route in a route plan once locations have been assigned to routes. Each route
+    is an independent problem, so routes are solved in parallel in a pool of worker processes. Only the small
+    distance matrix of each route's stops is sent to a worker, not the shortest paths oracle.
+
+    Routes with up to max_exact stops are solved exactly with the Held-Karp algorithm. Longer routes are
+    improved with 2-opt and or-opt moves. If the Routes object has time windows, a new order is only used
+    if it is not later in total than the current order.
+
+    Where R is the number of routes, N the number of stops in the longest route and W the number of
+    workers, the time taken is proportional to the slowest route when R <= W.
+    """
+
+    def __init__(self, short_paths, routes=None, workers=None, max_exact=10, executor=None):
+        """ Constructor
+
+        :param short_paths: shortest paths oracle with a dist(s, t) function
+        :param routes: Routes object with time windows, departure times and vehicle speed,
+                       or None to ignore time windows
+        :param workers: number of worker processes, or None for the number of CPUs (0 or 1 to run serially)
+        :param max_exact: largest number of stops to solve exactly
+        :param executor: concurrent.futures executor to share, or None to start a process pool when needed
+        """
+        self.short_paths = short_paths
+        self.routes = routes
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.max_exact = max_exact
+        self.executor = executor
+
+    def polish(self, plan, deadline=None):
+        """ Reorder each route in a cleaned route plan (routes start and end at the hub). Routes that are not
+        solved before the deadline keep their order.
+
+        :param plan: list of lists of location id's
+        :param deadline: time.perf_counter() value at which to stop polishing, or None to polish every route
+        :return: polished route plan
+        """
+        if deadline is not None:
+            deadline = time.time() + deadline - time.perf_counter()
+        tasks = []
+        stops = []
+        dist = self.short_paths.dist
+        for i, route in enumerate(plan):
+            local = [0] + [v for v in route if v != 0]
+            stops.append(local)
+            d = [[dist(a, b) for b in local] for a in local]
+            due, departure, mph = None, 0, 1
+            if self.routes is not None:
+                departure = self.routes.departure_times[i]
+                for v in local:
+                    departure = max(departure, self.routes.ready_times.get(v, 0))
+                mph = self.routes.mph
+                if any(v in self.routes.due_times for v in local):
+                    due = [self.routes.due_times.get(v, float('inf')) for v in local]
+                    due[0] = float('inf')
+            tasks.append((d, due, departure, mph, self.max_exact, deadline))
+        if self.executor is not None:
+            results = list(self.executor.map(_polish_task, tasks))
+        elif self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(min(self.workers, len(tasks))) as executor:
+                results = list(executor.map(_polish_task, tasks))
+        else:
+            results = [_polish_task(task) for task in tasks]
+        return [[local[k] for k in tour] for local, (tour, length) in zip(stops, results)]
+
+    def apply(self, routes, cache=None):
+        """ Polish the plan held by a Routes object, and update its cost and distances
+
+        :param routes: Routes object with a plan
+        :param cache: RouteCostCache to score routes with, or None to use the shortest paths oracle
+        :return: polished route plan
+        """
+        routes.plan = self.polish(routes.plan)
+        if cache is not None:
+            routes.distances = [cache.legs(route) for route in routes.plan]
+        else:
+            dist = self.short_paths.dist
+            routes.distances = [[0] + [dist(route[k], route[k + 1]) for k in range(len(route) - 1)]
+                                for route in routes.plan]
+        routes.cost = sum(sum(legs) for legs in routes.distances)
+        return routes.plan
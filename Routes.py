@@ -1,3 +1,57 @@
+from DirectedEdge import DirectedEdge
+from Graph import Graph
+
+
+def routes_from_config(packages_lid, config):
+    """ Build a Routes object from a configuration dictionary, such as one read from a JSON file.
+    Time windows are loaded from the packages' deadlines and notes, then overridden by the configuration.
+
+    :param packages_lid: package dictionary where keys are location ids
+    :param config: dictionary with n_routes, capacity, constraints (route index to list of location id's),
+                   departure_times (route index to hours since 8:00am), and ready_times and due_times
+                   (location id to hours since 8:00am). Keys may be strings, as in JSON.
+    :return: Routes object
+    """
+    try:
+        routes = Routes(packages_lid, n_routes=int(config.get('n_routes', 4)), capacity=int(config.get('capacity', 16)))
+        for i, locations in config.get('constraints', {}).items():
+            for v in locations:
+                routes.constrain(int(i), int(v))
+        routes.load_time_windows()
+        for v, hours in config.get('ready_times', {}).items():
+            routes.set_ready_time(int(v), float(hours))
+        for v, hours in config.get('due_times', {}).items():
+            routes.set_due_time(int(v), float(hours))
+        for i, hours in config.get('departure_times', {}).items():
+            routes.set_departure_time(int(i), float(hours))
+    except (AttributeError, IndexError, TypeError) as error:
+        raise ValueError(f"invalid routes configuration: {error}")
+    return routes
+
+
+def split_location(graph, packages_lid, v, pids):
+    """ Move packages to a new location id at the same address as location v, so that a route plan can stop
+    there twice, e.g. once for packages that are due early and once for a package that reaches the hub late.
+    The new location is joined to v by edges of 0 miles, so it has the same shortest paths as v.
+    Worst case time complexity of O(V + E)
+
+    :param graph: Graph the location ids are vertexes of
+    :param packages_lid: package dictionary where keys are location ids, which is changed in place
+    :param v: location id
+    :param pids: package ids to move from location v
+    :return: (Graph with one more vertex, new location id)
+    """
+    w = graph.V()
+    split = Graph(w + 1)
+    for e in graph.edges():
+        split.add_edge(e)
+    split.add_edge(DirectedEdge(v, w, 0))
+    split.add_edge(DirectedEdge(w, v, 0))
+    packages = packages_lid.get(v)
+    packages_lid.put(v, [package for package in packages if package.pid not in pids])
+    packages_lid.put(w, [package for package in packages if package.pid in pids])
+    return split, w
+
 
 class Routes:
     """
@@ -32,8 +86,11 @@ class Routes:
         self.distances = None
         # initialize constraints lists
         self.constraints = [set() for i in range(n_routes)]
+        # time windows by location id, in hours since 8:00am
+        self.due_times = {}
+        self.ready_times = {}
         # time/speed for package statuses -> this is for demonstration purposes
-        self.departure_times = [0, 0, 0, 0]
+        self.departure_times = [0 for i in range(n_routes)]
         self.time_since_eight = 0
         self.mph = 18
 
@@ -64,6 +121,95 @@ class Routes:
         if v in self.constraints[route]:
             self.constraints[route].remove(v)
 
+    def set_due_time(self, v, hours_since_8am):
+        """ Require that a vertex (location id) is reached by the given time
+
+        :param v: location id
+        :param hours_since_8am: deadline in number of hours since 8:00am
+        :return:
+        """
+        self.due_times[v] = hours_since_8am
+
+    def set_ready_time(self, v, hours_since_8am):
+        """ Prevent a route that visits a vertex (location id) from leaving the hub before the given time
+
+        :param v: location id
+        :param hours_since_8am: earliest departure in number of hours since 8:00am
+        :return:
+        """
+        self.ready_times[v] = hours_since_8am
+
+    def time_window(self, v):
+        """ Returns the ready time and due time of a vertex (location id)
+        Worst case time complexity of O(1)
+
+        :param v: location id
+        :return: (ready time, due time) in hours since 8:00am
+        """
+        return self.ready_times.get(v, 0), self.due_times.get(v, float('inf'))
+
+    def load_time_windows(self):
+        """ Set location time windows from package deadlines and delays. A location is due by the
+        earliest deadline of its packages and is ready when the last of its packages reaches the hub.
+        Worst case time complexity of O(N) where N is the number of packages
+
+        :return:
+        """
+        for v, packages in self.packages:
+            due = min([package.due_time for package in packages], default=float('inf'))
+            ready = max([package.ready_time for package in packages], default=0)
+            if due < float('inf'):
+                self.set_due_time(v, due)
+            if ready > 0:
+                self.set_ready_time(v, ready)
+
+    def departure(self, route):
+        """ Returns the time a route leaves the hub, which is its scheduled departure time
+        or the time its last package reaches the hub, whichever is later
+
+        :param route: index of route in route plan
+        :return: departure in number of hours since 8:00am
+        """
+        departure = self.departure_times[route]
+        for v in self.plan[route]:
+            departure = max(departure, self.ready_times.get(v, 0))
+        return departure
+
+    def positions(self, hours_since_8am):
+        """ Returns the index of the last stop each route has reached at a given time. Stops
+        up to and including this index have been delivered; 0 means the vehicle has not left the hub,
+        and the last index of a route means the vehicle has returned to the hub.
+        Worst case time complexity of O(N) where N is the number of stops in the route plan
+
+        :param hours_since_8am: number of hours since 8:00am
+        :return: list of stop indexes, one for each route
+        """
+        positions = []
+        for i in range(self.n_routes):
+            progress = self.mph * (hours_since_8am - self.departure(i))
+            dist = 0
+            reached = 0
+            # vehicles without stops never leave the hub
+            if len(self.plan[i]) <= 2:
+                progress = -1
+            for j in range(1, len(self.plan[i])):
+                dist += self.distances[i][j]
+                if progress < dist:
+                    break
+                reached = j
+            positions.append(reached)
+        return positions
+
+    def departed(self, hours_since_8am):
+        """ Returns which vehicles have left the hub at a given time. A vehicle that has left cannot take on
+        packages it did not leave with, and cannot hand its packages over to another vehicle.
+        Worst case time complexity of O(N) where N is the number of stops in the route plan
+
+        :param hours_since_8am: number of hours since 8:00am
+        :return: list of booleans, one for each route
+        """
+        return [len(self.plan[i]) > 2 and hours_since_8am >= self.departure(i) for i in range(self.n_routes)]
+
     def set_departure_time(self, route, hours_since_8am):
         """ Set departure time for route, specified in number of hours since 8:00am
 
@@ -73,34 +219,52 @@ class Routes:
         """
         self.departure_times[route] = hours_since_8am
 
-    def set_time(self, hours_since_8am):
-        """ Updates statuses of packages to simulate their projected status at a given time
+    def schedule(self):
+        """ Returns where each package is in the route plan: the route carrying it, the time the route leaves
+        the hub and the miles driven before the package is delivered. The schedule only changes with the plan,
+        so it can be kept and passed to statuses() for any number of times of day.
+        Worst case time complexity of O(N) where N is the number of packages in the route plan
 
-        :param hours_since_8am: number of hours since 8:00am
-        :return:
+        :return: list of (route index, package, departure in hours since 8:00am, miles) tuples
         """
-        progress = []
+        rows = []
         for i in range(self.n_routes):
-            progress.append(self.mph * (hours_since_8am - self.departure_times[i]))
+            departure = self.departure(i)
             dist = 0
             for j in range(len(self.plan[i])):
                 dist += self.distances[i][j]
                 for package in self.packages.get(self.plan[i][j]):
-                    if package.pid == 9 and i == 1 or \
-                       package.pid == 5 and i == 3 or \
-                       package.pid == 37 and i == 3 or \
-                       package.pid == 38 and i == 3:
-                        continue
-                    if progress[i] < 0:
-                        package.status = 'At hub'
-                    elif progress[i] >= dist:
-                        package.status = 'Delivered'
-                    else:
-                        package.status = 'In route'
-
-
-
+                    rows.append((i, package, departure, dist))
+        return rows
 
+    def statuses(self, hours_since_8am, schedule=None):
+        """ Returns the projected status of every package in the route plan at a given time,
+        without changing the packages
+        Worst case time complexity of O(N) where N is the number of packages in the route plan
 
+        :param hours_since_8am: number of hours since 8:00am
+        :param schedule: list returned by schedule(), or None to compute it
+        :return: list of (route index, package, status) tuples
+        """
+        if schedule is None:
+            schedule = self.schedule()
+        mph = self.mph
+        result = []
+        for i, package, departure, dist in schedule:
+            progress = mph * (hours_since_8am - departure)
+            if progress < 0:
+                result.append((i, package, 'At hub'))
+            elif progress >= dist:
+                result.append((i, package, 'Delivered'))
+            else:
+                result.append((i, package, 'In route'))
+        return result
 
+    def set_time(self, hours_since_8am):
+        """ Updates statuses of packages to simulate their projected status at a given time
 
+        :param hours_since_8am: number of hours since 8:00am
+        :return:
+        """
+        for i, package, status in self.statuses(hours_since_8am):
+            package.status = status
@@ -0,0 +1,179 @@
+from Dijkstra import AllPairsDijkstra
+
+import heapq
+
+
+class SavingsRoutePlanner:
+    """
+    Given a Routes object, this class implements the Clarke-Wright savings algorithm, a construction
+    heuristic that builds a route plan in a single pass.
+
+    Every location starts on its own route from the hub and back. Joining the end of one route to the start
+    of another saves the miles of one trip back to the hub and one trip out, less the miles between the two
+    locations. The algorithm takes pairs of locations from a heap in order of decreasing savings and joins their
+    routes whenever both locations are at the ends of different routes, the joined route fits in a vehicle, and
+    the joined route does not contain locations constrained to different vehicles. The resulting routes are then
+    assigned to vehicles, with constrained routes going to the vehicle they are constrained to.
+
+    The plan is a good starting point for the SwapRoutePlanner, and can be used on its own when a plan is
+    needed quickly. Time windows are not considered.
+
+    The worst case time complexity is O(VElogV + NNlogN), where V is the number of vertices and E the number
+    of edges in the underlying graph (for finding shortest paths), and N is the number of locations in the plan.
+
+    The space complexity is proportional to NN, for the heap of savings.
+    """
+
+    def __init__(self, graph, routes, short_paths=None):
+        """ Constructor
+
+        :param graph: a graph of type Graph
+        :param routes: Routes object with packages, constraints, number of routes and capacity
+        :param short_paths: shortest paths oracle to share with another planner, or None to find shortest paths
+        """
+        self.routes = routes
+        # find shortest paths -> O(VElogV)
+        self.short_paths = short_paths if short_paths is not None else AllPairsDijkstra(graph)
+
+    def optimize(self):
+        """ Build a route plan with the savings algorithm
+
+        :return: route plan (list of lists of location id's starting and ending at the hub),
+                 list of route loads, total mileage
+        """
+        plan, loads = self.build()
+        plan = [[0] + [v for v in route if v != 0] + [0] for route in plan]
+        return plan, loads, self.score_all(plan)
+
+    def build(self):
+        """ Build routes and assign them to vehicles.
+        Worst case time complexity is O(NNlogN) where N is the number of locations
+
+        :return: route plan (list of lists of location id's starting at the hub), list of route loads
+        """
+        packages = self.routes.packages
+        capacity = self.routes.capacity
+        dist = self.short_paths.dist
+        # each location starts on its own route
+        locations = [v for v in packages.keys() if v != 0]
+        fixed = self._fixed_routes()
+        members = {v: [v] for v in locations}
+        route_of = {v: v for v in locations}
+        loads = {v: len(packages.get(v)) for v in locations}
+        tags = {v: {fixed[v]} if v in fixed else set() for v in locations}
+        # heap of pairwise savings
+        heap = []
+        for a in locations:
+            for b in locations:
+                if a != b:
+                    saving = dist(a, 0) + dist(0, b) - dist(a, b)
+                    if saving > 0:
+                        heap.append((-saving, a, b))
+        heapq.heapify(heap)
+        # join routes in order of decreasing savings
+        while heap:
+            saving, a, b = heapq.heappop(heap)
+            route_a = route_of[a]
+            route_b = route_of[b]
+            if route_a == route_b:
+                continue
+            # a must end its route and b must start its route
+            if members[route_a][-1] != a or members[route_b][0] != b:
+                continue
+            if loads[route_a] + loads[route_b] > capacity:
+                continue
+            if len(tags[route_a] | tags[route_b]) > 1:
+                continue
+            for v in members[route_b]:
+                route_of[v] = route_a
+            members[route_a].extend(members.pop(route_b))
+            loads[route_a] += loads.pop(route_b)
+            tags[route_a] |= tags.pop(route_b)
+        return self._assign([(members[r], loads[r], tags[r]) for r in members])
+
+    def _fixed_routes(self):
+        """ Returns a dictionary of location id's to the route index they are constrained to
+
+        :return: dictionary of location id's to route indexes
+        """
+        fixed = {}
+        for i, constrained in enumerate(self.routes.constraints):
+            for v in constrained:
+                fixed[v] = i
+        return fixed
+
+    def _assign(self, built):
+        """ Assign routes to vehicles. Constrained routes go to their vehicle, and the remaining routes
+        go to empty vehicles, largest first. If the constrained routes of a vehicle do not fit in it together,
+        their unconstrained locations are moved to a route of their own. Once every vehicle has a route,
+        leftover routes are appended to the vehicle with the most room, or split stop by stop between vehicles
+        with room for each stop if no single vehicle has enough room.
+        Worst case time complexity is O(NR) where N is the number of locations and R is the number of vehicles
+
+        :param built: list of (route, load, set of constrained route indexes) tuples
+        :return: route plan padded with zeros to vehicle capacity, list of route loads
+        """
+        packages = self.routes.packages
+        capacity = self.routes.capacity
+        n_routes = self.routes.n_routes
+        plan = [[0] for i in range(n_routes)]
+        loads = [0 for i in range(n_routes)]
+        fixed = self._fixed_routes()
+        leftover = []
+        for route, load, tag in built:
+            if tag:
+                i = next(iter(tag))
+                if loads[i] + load > capacity:
+                    # several routes are constrained to the vehicle: keep only its constrained locations on it
+                    rest = [v for v in route if v not in fixed]
+                    route = [v for v in route if v in fixed]
+                    rest_load = sum(len(packages.get(v)) for v in rest)
+                    load -= rest_load
+                    if rest:
+                        leftover.append((rest, rest_load))
+                plan[i].extend(route)
+                loads[i] += load
+            else:
+                leftover.append((route, load))
+        leftover.sort(key=lambda item: -item[1])
+        for route, load in leftover:
+            empty = [i for i in range(n_routes) if len(plan[i]) == 1]
+            roomiest = min(range(n_routes), key=lambda i: loads[i])
+            if empty:
+                i = empty[0]
+            elif loads[roomiest] + load <= capacity:
+                i = roomiest
+            else:
+                # split route between vehicles
+                for v in route:
+                    size = len(packages.get(v))
+                    room = [k for k in range(n_routes) if loads[k] + size <= capacity]
+                    if not room:
+                        raise ValueError(f"no vehicle has room for the {size} packages of location {v}")
+                    i = min(room, key=lambda k: loads[k])
+                    plan[i].append(v)
+                    loads[i] += size
+                continue
+            plan[i].extend(route)
+            loads[i] += load
+        # fill empty slots with zeros to represent hub (keeps lists at length of capacity, ending at the hub)
+        for route in plan:
+            while len(route) < capacity or route[-1] != 0:
+                route.append(0)
+        return plan, loads
+
+    def score_all(self, plan):
+        """ Given a list of paths (ordered list of location id's), determines
+        the miles required to complete the paths based on shortest-paths
+        distances between locations.
+        The worst case time complexity is O(N) where N is the number of
+        delivery stops in the route plan
+
+        :param plan: list of lists of location id's
+        :return: total of path costs (in miles)
+        """
+        cost = 0
+        for i in range(len(plan)):
+            for j in range(len(plan[i]) - 1):
+                cost += self.short_paths.dist(plan[i][j], plan[i][j + 1])
+        return cost
@@ -0,0 +1,99 @@
+from operator import add
+
+# tolerance for floating point comparisons of miles
+_EPS = 1e-9
+
+
+class SwapEvaluator:
+    """
+    Evaluates every swap of locations between two routes at once. For a pair of routes, the change in
+    mileage of each swap is the cost of inserting each location into the other route, less the cost of
+    removing both locations from their own routes. A whole row of the cost-delta matrix (one position in
+    the first route against every position in the second) is built in one pass from rows and columns of
+    a dense distance matrix, instead of scoring swaps one at a time.
+
+    Constraints and capacities are checked with per-location arrays: the route each location is constrained
+    to, and the number of packages at each location.
+
+    Worst case time complexity is O(CC) per pair of routes, where C is vehicle capacity.
+    Uses extra space proportional to VV, where V is the number of locations in the graph.
+    """
+
+    def __init__(self, matrix, routes):
+        """ Constructor
+        Worst case time complexity of O(VV)
+
+        :param matrix: dense matrix of shortest path distances (list of lists)
+        :param routes: Routes object with packages, constraints and capacity
+        """
+        self.d = matrix
+        # transposed matrix, so distances into a location can be read as a row
+        self.d_to = [list(column) for column in zip(*matrix)]
+        self.load_routes(routes)
+
+    def load_routes(self, routes):
+        """ Rebuild the per-location arrays after constraints or packages change, keeping the distance matrix
+        Worst case time complexity of O(V)
+
+        :param routes: Routes object with packages, constraints and capacity
+        :return:
+        """
+        self.routes = routes
+        V = len(self.d)
+        self.fixed = [-1] * V
+        for i, constrained in enumerate(routes.constraints):
+            for v in constrained:
+                self.fixed[v] = i
+        self.size = [0] * V
+        for v, packages in routes.packages:
+            self.size[v] = len(packages)
+
+    def improving_swaps(self, plan, loads, i, alt_i, first_i=1, first_alt=1):
+        """ Find the swaps between two different routes that obey constraints and capacities and reduce mileage
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param i: route index for first route
+        :param alt_i: route index for second route
+        :param first_i: index of the first stop that may move in the first route
+        :param first_alt: index of the first stop that may move in the second route
+        :return: list of (change in miles, index in first route, index in second route), best first
+        """
+        d, d_to, size, fixed = self.d, self.d_to, self.size, self.fixed
+        capacity = self.routes.capacity
+        route = plan[i]
+        alt_route = plan[alt_i]
+        positions = range(first_alt, len(alt_route) - 1)
+        if not positions:
+            return []
+        # per-position arrays for the second route
+        alt_v = [alt_route[k] for k in positions]
+        alt_prev = [alt_route[k - 1] for k in positions]
+        alt_next = [alt_route[k + 1] for k in positions]
+        alt_remove = [d[p][v] + d[v][q] for p, v, q in zip(alt_prev, alt_v, alt_next)]
+        # constrained locations cannot leave, which is the same as being too big to move
+        big = 2 * capacity + 1
+        alt_size = [size[v] if fixed[v] < 0 else big for v in alt_v]
+        inf = float('inf')
+        swaps = []
+        for j in range(first_i, len(route) - 1):
+            v = route[j]
+            if fixed[v] >= 0:
+                continue
+            prev_v, next_v = route[j - 1], route[j + 1]
+            remove = d[prev_v][v] + d[v][next_v]
+            # sizes of swapped locations that keep both routes within capacity
+            low = loads[alt_i] + size[v] - capacity
+            high = capacity - loads[i] + size[v]
+            # insert each location of the second route in place of v
+            insert = list(map(add, map(d[prev_v].__getitem__, alt_v), map(d_to[next_v].__getitem__, alt_v)))
+            # insert v in place of each location of the second route
+            to_v, from_v = d_to[v], d[v]
+            alt_insert = list(map(add, map(to_v.__getitem__, alt_prev), map(from_v.__getitem__, alt_next)))
+            row = [a + b - r - remove if low <= s <= high and w != v else inf
+                   for a, b, r, s, w in zip(insert, alt_insert, alt_remove, alt_size, alt_v)]
+            for k, delta in enumerate(row):
+                if delta < -_EPS:
+                    swaps.append((delta, j, positions[k]))
+        swaps.sort()
+        return swaps
@@ -1,6 +1,18 @@
 from Dijkstra import AllPairsDijkstra
+from RouteCostCache import RouteCostCache
+from ArrivalTimes import ArrivalTimes
+from SavingsRoutePlanner import SavingsRoutePlanner
+from HeldKarp import HeldKarpSolver
+from RoutePolisher import RoutePolisher
+from SwapEvaluator import SwapEvaluator
+from LowerBound import LowerBound
+from Checkpoint import Checkpoint
 
 import random
+import time
+
+# tolerance for floating point comparisons of miles and hours
+_EPS = 1e-9
 
 
 class SwapRoutePlanner:
@@ -15,6 +27,10 @@ class SwapRoutePlanner:
     multiple times, randomly shuffling the initial starting conditions between each repeat. In doing so, it
     increases the likelihood of finding a global optimum.
 
+    If any location in the Routes object has a ready time or due time, the algorithm treats them as
+    time windows. Arrival times are tracked incrementally, and a swap is only made if it reduces the
+    combined lateness of the affected routes, or keeps lateness the same without adding miles.
+
     The time complexity of the algorithm is VElogV + R(V + 2CV^2 I), with worst case
     time complexity proportional to O(VElogV). Here, V is the number of vertices (locations) in the underlying
     graph, E is the number of edges in the graph, R is the number of restarts used to search for a global
@@ -24,57 +40,465 @@ class SwapRoutePlanner:
     Dijkstra's algorithm is based.
     """
 
-    def __init__(self, graph, routes):
+    def __init__(self, graph, routes, short_paths=None, initializer='balanced', stats=None, cache=None,
+                 polish_workers=1):
+        """ Constructor
+
+        :param graph: a graph of type Graph
+        :param routes: Routes object with packages, constraints, time windows, number of routes and capacity
+        :param short_paths: shortest paths oracle to share with another planner, or None to find shortest paths
+        :param initializer: 'balanced' to spread locations evenly over routes, or 'savings' to build
+                            the initial plan with the Clarke-Wright savings algorithm
+        :param stats: OptimizerStats object to record counters for every start and iteration, or None
+        :param cache: RouteCostCache to share with another planner, or None to make a new cache
+        :param polish_workers: number of processes to polish the routes of the final plan in, one route each, or
+                               None for the number of CPUs. The default of 1 polishes in this process, which
+                               suits small plans and planners that already run in worker processes.
+        """
+        if initializer not in ('balanced', 'savings'):
+            raise ValueError("initializer must be 'balanced' or 'savings'")
         self.graph = graph
         self.routes = routes
         # find shortest paths
-        self.short_paths = AllPairsDijkstra(self.graph)
+        self.short_paths = short_paths if short_paths is not None else AllPairsDijkstra(self.graph)
+        # route mileage is memoized, since restarts keep scoring the same routes
+        self.cache = cache if cache is not None else RouteCostCache(self.short_paths)
+        self.initializer = initializer
+        # track arrival times if any location has a time window
+        self.timed = bool(routes.due_times or routes.ready_times)
+        self.times = ArrivalTimes(self.short_paths, routes)
+        # exact solver for ordering stops within a route
+        self.exact = HeldKarpSolver(self.short_paths, routes)
+        # 2-opt and or-opt for routes with too many stops to order exactly, or, with more than one worker,
+        # every route ordered in its own process, exactly if it has few enough stops
+        self.polisher = RoutePolisher(self.short_paths, routes, workers=polish_workers)
+        self.polisher.max_exact = self.exact.max_stops if self.polisher.workers > 1 else 0
+        # batch evaluator for swaps between pairs of routes, built on first use
+        self.evaluator = None
+        # budgets for anytime optimization, set by optimize_global()
+        self.evaluations = 0
+        self.stop_reason = None
+        self._deadline = None
+        self._max_evaluations = None
+        self._cancel = None
+        # routes whose vehicle has left the hub, whose stops may only be reordered, set by replan()
+        self._departed = frozenset()
+        self.stats = stats
+        # number of starts that ended in a known local optimum, set by optimize_global()
+        self.duplicates = 0
+        # lower bound on total mileage, computed on first use, and the optimality gap of the best plan
+        self.bound = LowerBound(self.short_paths, routes)
+        self.gap = None
         # initialize route plan
-        self.plan, self.loads = self._initialize()
-        # find initial route costs (in miles)
+        if initializer == 'savings':
+            self.plan, self.loads = SavingsRoutePlanner(graph, routes, self.short_paths).build()
+        else:
+            self.plan, self.loads = self._initialize()
+        # find initial route costs (in miles) and lateness (in hours)
         self.cost = self.score_all(self.plan)
+        self.lateness = self.score_lateness(self.plan)
 
-    def optimize_global(self, starts=3, iterations=20, early_stopping=2, tol=1, verbose=0):
+    def optimize_global(self, starts=3, iterations=20, early_stopping=2, tol=1, verbose=0, polish=True,
+                        neighbors=None, batch=False, time_budget=None, eval_budget=None, callback=None,
+                        cancel=None, dedupe=True, shuffles=2, max_shuffles=10, gap=None, checkpoint=None,
+                        checkpoint_interval=30, resume=False, report_gap=False):
         """ Repeatedly shuffles route plan and runs optimize_local() function in order to increase the likelihood
         that a global optimum is found.
         Worst case time complexity is O(R(V + 2CIVV) where R is the number of restarts/repeats, V is the number
         of delivery addresses in the route plan, C is vehicle capacity, and I is the number of iterations required to
         converge to local optima in the optimize_local() algorithm.
 
+        The search can also run as an anytime algorithm. If a time budget, an evaluation budget or a cancellation
+        flag is given, the search stops as soon as the budget runs out or the flag is set, and returns the best
+        plan found so far. The reason the search stopped is kept in stop_reason ('time', 'evaluations',
+        'cancelled', 'gap', or None if every start finished). The best plan is checked after every iteration of
+        every start, and the callback is called each time it improves.
+
+        Restarts often converge back to a local optimum that an earlier start already found. With dedupe, the
+        fingerprint of each local optimum (see fingerprint()) is kept, and a start stops as soon as its plan
+        matches a known local optimum. Each duplicate makes the shuffle before the next start one repetition
+        stronger, up to max_shuffles, and each new local optimum makes it one repetition weaker, down to
+        shuffles. The number of starts that ended in a duplicate is kept in duplicates.
+
+        If gap is given (or report_gap is set), the mileage of each new best plan is compared against a lower bound
+        on the mileage of any plan (see LowerBound), and the optimality gap of the best plan is kept in gap. Once
+        the gap of an on-time plan falls to the given threshold, the search stops with stop_reason 'gap', since
+        further starts cannot improve the plan by more than the gap.
+
+        If a checkpoint path is given, the state of the search is saved to it after a start finishes, at most
+        once every checkpoint_interval seconds, and once more when the search ends (see Checkpoint). The state
+        holds the best plan, the plan the next start shuffles, the random number generator state, the index of
+        the next start, the shuffle strength, the known local optima, the evaluation count and the whole state of
+        the stats. After every start only the plan the next start shuffles and a few counters are copied; the
+        rest is copied when a checkpoint is saved. With resume, a search given the same arguments continues from
+        the checkpoint and ends with the same plan as a search that was never stopped.
+
         :param starts: Number of restarts/repeats of the shuffle + optimize_local() function
         :param iterations: Number of iterations for each optimize_local() run
         :param early_stopping: stop early if this many subsequent iterations does not lead to improvement
         :param tol: definition of "no improvement" used in early stopping, where improvements less than tol are ignored
         :param verbose: 0, 1, or 2 indicates the amount of detail to print to console while the algorithm operates
-        :return:
+        :param polish: reorder the stops of each route in the best plan exactly, with the Held-Karp algorithm,
+                       or with 2-opt and or-opt if it has too many stops, within the time budget
+                       (skipped if the search was cancelled)
+        :param neighbors: only consider swaps that move a location next to one of its k nearest neighbors,
+                          where k is this number, or None to consider every swap
+        :param batch: evaluate all swaps between each pair of routes at once and make the best one
+        :param time_budget: seconds of wall-clock time to search for, or None for no limit
+        :param eval_budget: number of swaps to evaluate, or None for no limit
+        :param callback: function called with (cost, lateness, plan, start) each time the best plan improves,
+                         where plan is a copy of the best plan, or None
+        :param cancel: object with an is_set() method (such as threading.Event) or a function returning True
+                       when the search should stop, or None
+        :param dedupe: stop starts that reach a known local optimum, and adapt the shuffle strength
+        :param shuffles: number of shuffle repetitions before each start
+        :param max_shuffles: largest number of shuffle repetitions, when starts keep ending in duplicates
+        :param gap: stop once the optimality gap of the best plan is at most this fraction of its mileage
+                    (e.g. 0.05), or None to run every start
+        :param checkpoint: path of a checkpoint file, or None to not save checkpoints
+        :param checkpoint_interval: least number of seconds between checkpoints
+        :param resume: continue from the checkpoint file, if it exists
+        :param report_gap: compute the optimality gap of the best plan without a gap threshold, to report it
+        :return: route plan, list of route loads, total mileage
         """
+        self._start_budget(time_budget, eval_budget, cancel)
+        self.duplicates = 0
+        reporting = gap is not None or report_gap
+        self.gap = self.bound.gap(self.cost) if reporting else None
+        optima = set()
+        strength = shuffles
         print(f"Start cost: {self.cost}")
-        plan = self.plan
-        loads = self.loads
+        plan = [list(route) for route in self.plan]
+        loads = list(self.loads)
         cost = self.cost
-        for start in range(starts):
-            self.shuffle(plan, loads, 2)
-            cost = self._optimize_local(plan, loads, cost, start,
-                                        iterations=iterations,
-                                        early_stopping=early_stopping,
-                                        tol=tol,
-                                        verbose=verbose)
-            if cost < self.cost:
+        first_start = 0
+        saver = Checkpoint(checkpoint, checkpoint_interval) if checkpoint is not None else None
+        state = saver.load() if saver is not None and resume else None
+        if state is not None:
+            if state['instance'] != self._instance():
+                raise ValueError("checkpoint was saved for a different instance")
+            self.plan, self.loads, self.cost, self.lateness = state['best']
+            plan, loads, cost = state['current']
+            first_start, strength, optima = state['start'], state['strength'], state['optima']
+            self.duplicates = state['duplicates']
+            self.evaluations = state['evaluations']
+            if self.stats is not None and state['stats'] is not None:
+                self.stats.restore(state['stats'])
+            random.setstate(state['random'])
+            if reporting:
+                self.gap = self.bound.gap(self.cost)
+            if verbose > 0:
+                print(f"Resumed at start {first_start} with cost: {self.cost}")
+        # where a resumed search starts: the end of the last finished start
+        resume_point = None
+        if saver is not None:
+            resume_point = self._resume_point(plan, loads, cost, first_start, strength)
+
+        def record(plan, loads, cost, start):
+            lateness = self.times.total_lateness() if self.timed else 0
+            if self._improves(lateness, cost):
                 self.plan = [list(route) for route in plan]
                 self.loads = list(loads)
                 self.cost = cost
+                self.lateness = lateness
+                if reporting:
+                    self.gap = self.bound.gap(cost)
                 if verbose > 0:
-                    print(f"New minimum cost: {self.cost}")
+                    print(f"New minimum cost: {self.cost}{self._gap_text()}")
+                if callback is not None:
+                    callback(cost, lateness, [list(route) for route in plan], start)
+                # stop the search once the best plan is close enough to the lower bound
+                if gap is not None and self.lateness <= _EPS and self.gap <= gap:
+                    self.stop_reason = 'gap'
+                    return True
+            # stop the start once it reaches a known local optimum
+            return dedupe and self.fingerprint(plan) in optima
+
+        for start in range(first_start, starts):
+            if self._out_of_budget():
+                break
+            self.shuffle(plan, loads, strength)
+            cost = self._optimize_local(plan, loads, cost, start,
+                                        iterations=iterations,
+                                        early_stopping=early_stopping,
+                                        tol=tol,
+                                        verbose=verbose,
+                                        neighbors=neighbors,
+                                        batch=batch,
+                                        on_iteration=record)
+            if dedupe and self.stop_reason is None:
+                optimum = self.fingerprint(plan)
+                if optimum in optima:
+                    self.duplicates += 1
+                    strength = min(strength + 1, max_shuffles)
+                else:
+                    optima.add(optimum)
+                    strength = max(strength - 1, shuffles)
+            if saver is not None and self.stop_reason is None:
+                resume_point = self._resume_point(plan, loads, cost, start + 1, strength)
+                if saver.due():
+                    saver.save(self._checkpoint_state(resume_point, optima))
+        if saver is not None:
+            # a start cut short by a budget is run again on resume, keeping the best plan found so far
+            saver.save(self._checkpoint_state(resume_point, optima), wait=True)
+        if dedupe and verbose > 0:
+            print(f"Starts ending in a known local optimum: {self.duplicates} of {starts}")
         self.clean_plan(self.plan)
+        if polish:
+            self.plan = self._polish(self.plan)
         self.cost = self.score_all(self.plan)
+        self.lateness = self.score_lateness(self.plan)
         print(f"End cost: {self.cost}")
+        if reporting:
+            self.gap = self.bound.gap(self.cost)
+            if verbose > 0:
+                print(f"Lower bound: {self.bound.value():.1f}, gap: {self.gap:.1%}")
+        if self.lateness > 0:
+            print(f"Total lateness: {self.lateness:.2f} hours")
+        if self.stop_reason is not None and verbose > 0:
+            print(f"Stopped early: {self.stop_reason}")
         return self.plan, self.loads, self.cost
 
-    def _optimize_local(self, plan, loads, cost, start=1, iterations=15, early_stopping=2, tol=1, verbose=0):
+    def replan(self, hours_since_8am, changed=None, iterations=20, early_stopping=2, tol=1, verbose=0):
+        """ Re-optimize the plan held by the Routes object after deadlines or packages change during the day.
+        Instead of starting over, the search starts from the current plan. Stops that have already been
+        delivered at the given time stay where they are, and only swaps that involve a route visiting one
+        of the changed locations are considered. Vehicles that have left the hub keep the packages they left
+        with, so their remaining stops can only be reordered, and stops only move between vehicles that are
+        still at the hub. A changed location that is in no route (a new package) is inserted where it adds
+        the fewest miles into a vehicle still at the hub. Routes.plan and Routes.distances must hold the plan
+        that vehicles are driving.
+        Worst case time complexity is O(2CIVV), the same as a single optimize_local() run
+
+        :param hours_since_8am: current time, in number of hours since 8:00am
+        :param changed: iterable of location id's whose packages or time windows changed,
+                        or None to re-optimize every route
+        :param iterations: number of iterations for the optimize_local() run
+        :param early_stopping: stop early if this many subsequent iterations does not lead to improvement
+        :param tol: definition of "no improvement" used in early stopping, where improvements less than tol are ignored
+        :param verbose: 0, 1, or 2 indicates the amount of detail to print to console while the algorithm operates
+        :return: route plan, list of route loads, total mileage
+        """
+        routes = self.routes
+        capacity = routes.capacity
+        self.timed = bool(routes.due_times or routes.ready_times)
+        self._start_budget()
+        # pad routes with zeros so stops can move between routes
+        plan = [list(route) for route in routes.plan]
+        for route in plan:
+            while len(route) < capacity or route[-1] != 0:
+                route.append(0)
+        # delivered stops are frozen, as are routes that have returned to the hub
+        first = []
+        for i, position in enumerate(routes.positions(hours_since_8am)):
+            first.append(len(plan[i]) if position == len(routes.plan[i]) - 1 else position + 1)
+        departed = {i for i, gone in enumerate(routes.departed(hours_since_8am)) if gone}
+        loads = self.calculate_loads(plan, routes.packages)
+        # only routes visiting changed locations are re-optimized
+        active = None
+        if changed is not None:
+            changed = set(changed)
+            planned = {v for route in plan for v in route}
+            for v in sorted(changed - planned):
+                self._insert(plan, loads, v, departed)
+            active = {i for i in range(len(plan)) if changed.intersection(plan[i])}
+        self._departed = frozenset(departed)
+        try:
+            cost = self._optimize_local(plan, loads, self.score_all(plan),
+                                        iterations=iterations,
+                                        early_stopping=early_stopping,
+                                        tol=tol,
+                                        verbose=verbose,
+                                        first=first,
+                                        active=active)
+        finally:
+            self._departed = frozenset()
+        self.clean_plan(plan)
+        self.plan = plan
+        self.loads = loads
+        self.cost = self.score_all(plan)
+        self.lateness = self.score_lateness(plan)
+        if verbose > 0:
+            print(f"Re-planned cost: {self.cost}")
+        return self.plan, self.loads, self.cost
+
+    def _insert(self, plan, loads, v, departed):
+        """ Insert a location that is in no route where it adds the fewest miles, into a route whose vehicle
+        is still at the hub, has room for its packages and may carry them (see Routes.constrain())
+        Worst case time complexity is O(N) where N is the number of stops in the route plan
+
+        :param plan: padded route plan, changed in place
+        :param loads: list of route loads, changed in place
+        :param v: location id
+        :param departed: set of indexes of routes whose vehicle has left the hub
+        :return:
+        """
+        routes = self.routes
+        packages = routes.packages.get(v)
+        if not packages:
+            raise ValueError(f"location {v} has no packages to deliver")
+        constrained = [i for i in range(len(plan)) if v in routes.constraints[i]]
+        dist = self.short_paths.dist
+        best = None
+        for i in constrained or range(len(plan)):
+            if i in departed or loads[i] + len(packages) > routes.capacity:
+                continue
+            route = plan[i]
+            # insert after any of the stops, or right after the hub in an empty route
+            for j in range(1, len(route)):
+                if route[j - 1] == 0 and j > 1:
+                    break
+                delta = dist(route[j - 1], v) + dist(v, route[j]) - dist(route[j - 1], route[j])
+                if best is None or delta < best[0]:
+                    best = (delta, i, j)
+        if best is None:
+            raise ValueError(f"no vehicle at the hub has room for the packages of location {v}")
+        delta, i, j = best
+        plan[i].insert(j, v)
+        loads[i] += len(packages)
+
+    def _resume_point(self, plan, loads, cost, start, strength):
+        """ Returns a copy of the state of optimize_global() at the end of a start that a checkpoint would resume
+        from. Known local optima are left out, since a start that is cut short adds none.
+        Worst case time complexity is O(N) where N is the number of stops
+
+        :param plan: route plan the next start shuffles
+        :param loads: list of route loads of that plan
+        :param cost: mileage of that plan
+        :param start: index of the next start
+        :param strength: shuffle strength of the next start
+        :return: dictionary
+        """
+        return {'current': ([list(route) for route in plan], list(loads), cost),
+                'start': start,
+                'strength': strength,
+                'duplicates': self.duplicates,
+                'evaluations': self.evaluations,
+                'stats': len(self.stats.starts) if self.stats is not None else None,
+                'random': random.getstate()}
+
+    def _checkpoint_state(self, resume_point, optima):
+        """ Returns the state to save in a checkpoint, as a dictionary of plain values
+        Worst case time complexity is O(N + D + SI) where N is the number of stops, D the number of known optima,
+        S the number of recorded starts and I the iterations per start
+
+        :param resume_point: dictionary from _resume_point()
+        :param optima: set of fingerprints of known local optima
+        :return: dictionary
+        """
+        state = dict(resume_point)
+        state['instance'] = self._instance()
+        state['best'] = ([list(route) for route in self.plan], list(self.loads), self.cost, self.lateness)
+        state['optima'] = set(optima)
+        if self.stats is not None:
+            state['stats'] = self.stats.state(resume_point['stats'])
+        return state
+
+    def _instance(self):
+        """ Returns a summary of the instance, to check that a checkpoint belongs to it
+
+        :return: tuple of the number of routes, capacity and sorted location id's
+        """
+        return self.routes.n_routes, self.routes.capacity, tuple(sorted(self.routes.packages.keys()))
+
+    def fingerprint(self, plan):
+        """ Returns a canonical fingerprint of a route plan, which only depends on the sets of locations
+        that share a route. The order of routes and the order of stops within routes are ignored.
+        Worst case time complexity is O(N) where N is the number of stops in the route plan
+
+        :param plan: route plan
+        :return: frozenset of frozensets of location id's
+        """
+        return frozenset(frozenset(v for v in route if v != 0) for route in plan)
+
+    def _start_budget(self, time_budget=None, eval_budget=None, cancel=None):
+        """ Reset the evaluation count and set the budgets for a search. Constraints and packages may have
+        changed since the last search, so the batch evaluator re-reads them from the Routes object.
+
+        :param time_budget: seconds of wall-clock time to search for, or None for no limit
+        :param eval_budget: number of swaps to evaluate, or None for no limit
+        :param cancel: object with an is_set() method or a function returning True to stop, or None
+        :return:
+        """
+        self.evaluations = 0
+        self.stop_reason = None
+        self._deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        self._max_evaluations = eval_budget
+        self._cancel = cancel
+        if self.evaluator is not None:
+            self.evaluator.load_routes(self.routes)
+
+    def _out_of_budget(self):
+        """ Test if the search should stop, and record why in stop_reason
+        Worst case time complexity is O(1)
+
+        :return: True if a budget ran out or the search was cancelled
+        """
+        if self.stop_reason is None:
+            if self._max_evaluations is not None and self.evaluations >= self._max_evaluations:
+                self.stop_reason = 'evaluations'
+            elif self._deadline is not None and time.perf_counter() >= self._deadline:
+                self.stop_reason = 'time'
+            elif self._cancel is not None and (self._cancel.is_set() if hasattr(self._cancel, 'is_set')
+                                               else self._cancel()):
+                self.stop_reason = 'cancelled'
+        return self.stop_reason is not None
+
+    def _polish(self, plan):
+        """ Reorder the stops of each route exactly with the Held-Karp algorithm, and improve routes with too
+        many stops for it with 2-opt and or-opt moves (see RoutePolisher), within the time budget. With more
+        than one polish worker, the routes are polished in parallel, so the time taken is about that of the
+        slowest route. Nothing is polished once the time budget has run out or the search was cancelled, and
+        routes that cannot be solved before the deadline keep their order.
+
+        :param plan: cleaned route plan
+        :return: polished route plan
+        """
+        if self.stop_reason in ('time', 'cancelled') or self._past_deadline():
+            return plan
+        if self.polisher.workers > 1:
+            return self.polisher.polish(plan, self._deadline)
+        plan = self.exact.polish(plan, self._deadline)
+        if any(len(route) - 2 > self.exact.max_stops for route in plan) and not self._past_deadline():
+            plan = self.polisher.polish(plan)
+        return plan
+
+    def _past_deadline(self):
+        """ Test if the deadline of the time budget has passed, without recording a stop_reason, so work after
+        the search (such as polishing) can be skipped without marking the search as stopped early
+        Worst case time complexity is O(1)
+
+        :return: True if there is a time budget and its deadline has passed
+        """
+        return self._deadline is not None and time.perf_counter() >= self._deadline
+
+    def _gap_text(self):
+        """ Returns the optimality gap of the best plan for progress messages, or an empty string if the gap
+        is not computed
+
+        :return: string
+        """
+        return f" (gap: {self.gap:.1%})" if self.gap is not None else ""
+
+    def _improves(self, lateness, cost):
+        """ Compare a plan against the best plan found so far, first by lateness, then by mileage
+        Worst case time complexity is O(1)
+
+        :param lateness: total lateness of plan (in hours)
+        :param cost: total mileage of plan
+        :return: True if plan is better than best plan
+        """
+        if abs(lateness - self.lateness) > _EPS:
+            return lateness < self.lateness
+        return cost < self.cost
+
+    def _optimize_local(self, plan, loads, cost, start=1, iterations=15, early_stopping=2, tol=1, verbose=0,
+                        first=None, active=None, neighbors=None, batch=False, on_iteration=None):
         """ Swap locations between and within routes until convergence to a local optimum. This function changes
         the given data in place.
         Worst case time complexity is O(2CIVV) where C is vehicle capacity, I is the number of iterations to run,
-        and V is the number of locations in the route plan.
+        and V is the number of locations in the route plan. With candidate lists of k nearest neighbors,
+        the worst case time complexity is O(kIV).
 
         :param plan: route plan
         :param loads: list of route loads (number of packages in each route)
@@ -84,38 +508,48 @@ class SwapRoutePlanner:
         :param early_stopping: stop early if this many subsequent iterations does not lead to improvement
         :param tol: definition of "no improvement" used in early stopping, where improvements less than tol are ignored
         :param verbose: 0, 1, or 2 indicates the amount of detail to print to console while the algorithm operates
-        :return: cost of best route
+        :param first: list with the index of the first stop that may move in each route, or None to allow all stops
+        :param active: set of route indexes, where only swaps involving at least one of them are considered,
+                       or None to consider every route
+        :param neighbors: only consider swaps that move a location next to one of its k nearest neighbors,
+                          where k is this number, or None to consider every swap
+        :param batch: evaluate all swaps between each pair of routes at once and make the best one
+        :param on_iteration: function called with (plan, loads, cost, start) after each iteration, which can
+                             return True to stop the search, or None
+        :return: cost of optimized route plan
         """
+        if neighbors is not None and batch:
+            raise ValueError("candidate lists (neighbors) and batch evaluation cannot be combined")
+        if first is None:
+            first = [1 for i in range(len(plan))]
         last_cost = cost
         no_change_count = 0
+        if self.timed:
+            self.times.track(plan)
+        stats = self.stats
+        if stats is not None:
+            stats.begin_start(start, cost, self.evaluations)
         if verbose > 1:
             print(f"\tStarting cost in start {start}: {self.cost}")
         for iteration in range(iterations):
-            for i in range(len(plan)):
-                for j in range(1, len(plan[i]) - 1):
-                    for ai in range(i, len(plan)):
-                        for aj in range(j, len(plan[ai]) - 1):
-                            # validate constraints
-                            if not self._validate_constraints(plan, i, ai, j, aj):
-                                continue
-                            # validate capacities
-                            valid_cap, new_i_cap, new_ai_cap = self._validate_capacities(plan, loads, i, ai, j, aj)
-                            if valid_cap:
-                                current_cost = self.score_route(plan[i]) + self.score_route(plan[ai])
-                                self.swap(plan, i, ai, j, aj)
-                                alt_cost = self.score_route(plan[i]) + self.score_route(plan[ai])
-                                # swap if improvement
-                                if alt_cost <= current_cost:
-                                    loads[i] = new_i_cap
-                                    loads[ai] = new_ai_cap
-                                else:
-                                    self.swap(plan, i, ai, j, aj)
+            if self._out_of_budget():
+                break
+            if batch:
+                self._sweep_batch(plan, loads, first, active)
+            elif neighbors is None:
+                self._sweep_all(plan, loads, first, active)
+            else:
+                self._sweep_candidates(plan, loads, neighbors, first, active)
             # update cost
             new_cost = self.score_all(plan)
-            if new_cost < cost:
-                cost = new_cost
-                if verbose > 1:
-                    print(f"\tNew minimum cost in start {start} on iteration {iteration}: {new_cost}")
+            if new_cost < cost and verbose > 1:
+                print(f"\tNew minimum cost in start {start} on iteration {iteration}: {new_cost}")
+            cost = new_cost
+            if stats is not None:
+                stats.end_iteration(iteration, cost, self.times.total_lateness() if self.timed else 0,
+                                    self.evaluations)
+            if on_iteration is not None and on_iteration(plan, loads, cost, start):
+                break
             # early stopping
             if abs(last_cost - new_cost) < tol:
                 no_change_count += 1
@@ -126,6 +560,225 @@ class SwapRoutePlanner:
             last_cost = new_cost
         return cost
 
+    def _sweep_all(self, plan, loads, first, active):
+        """ Try every swap between and within routes once.
+        Worst case time complexity is O(2CVV) where C is vehicle capacity and V is the number of locations
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param first: list with the index of the first stop that may move in each route
+        :param active: set of route indexes, where only swaps involving at least one of them are considered,
+                       or None to consider every route
+        :return:
+        """
+        for i in range(len(plan)):
+            for j in range(first[i], len(plan[i]) - 1):
+                if self.stop_reason is not None:
+                    return
+                for ai in range(i, len(plan)):
+                    if active is not None and i not in active and ai not in active:
+                        continue
+                    for aj in range(max(j, first[ai]), len(plan[ai]) - 1):
+                        self._try_swap(plan, loads, i, ai, j, aj)
+
+    def _sweep_batch(self, plan, loads, first, active):
+        """ For each pair of routes, repeatedly make the best improving swap between them, as found by
+        the batch SwapEvaluator. Swaps within a route are tried one at a time. Pairs of routes where either
+        route is late are searched one swap at a time, since swaps that add miles may reduce lateness.
+        Worst case time complexity is O(RRCC) per pass over the pairs, where R is the number of routes
+        and C is vehicle capacity
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param first: list with the index of the first stop that may move in each route
+        :param active: set of route indexes, where only swaps involving at least one of them are considered,
+                       or None to consider every route
+        :return:
+        """
+        for i in range(len(plan)):
+            for ai in range(i, len(plan)):
+                if self.stop_reason is not None:
+                    return
+                if active is not None and i not in active and ai not in active:
+                    continue
+                self._exchange(plan, loads, i, ai, first[i], first[ai])
+
+    def _exchange(self, plan, loads, i, alt_i, first_i=1, first_alt=1):
+        """ Repeatedly make the best improving swap between two routes, as found by the batch SwapEvaluator,
+        until no swap improves the plan. Swaps within a route, and swaps between routes where either route
+        is late, are tried one at a time.
+        Worst case time complexity is O(CC) per swap made, where C is vehicle capacity
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param i: route index for first route
+        :param alt_i: route index for second route
+        :param first_i: index of the first stop that may move in the first route
+        :param first_alt: index of the first stop that may move in the second route
+        :return:
+        """
+        if self.evaluator is None:
+            self.evaluator = SwapEvaluator(self.short_paths.matrix(), self.routes)
+        if alt_i == i or self.timed and (self.times.lateness(i) or self.times.lateness(alt_i)):
+            for j in range(first_i, len(plan[i]) - 1):
+                for alt_j in range(max(j, first_alt), len(plan[alt_i]) - 1):
+                    self._try_swap(plan, loads, i, alt_i, j, alt_j)
+            return
+        swapped = True
+        while swapped and self.stop_reason is None:
+            swapped = False
+            self.evaluations += (len(plan[i]) - 1 - first_i) * (len(plan[alt_i]) - 1 - first_alt)
+            for delta, j, alt_j in self.evaluator.improving_swaps(plan, loads, i, alt_i, first_i, first_alt):
+                if self._try_swap(plan, loads, i, alt_i, j, alt_j):
+                    swapped = True
+                    break
+
+    def _sweep_candidates(self, plan, loads, k, first, active):
+        """ Try the swaps that put each location next to one of its k nearest neighbors, i.e. swaps
+        with the stop just before or just after a neighbor. Swaps between distant locations can rarely
+        improve a plan, so skipping them makes each sweep roughly linear in the number of locations.
+        Worst case time complexity is O(kV) where V is the number of locations
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param k: number of nearest neighbors to consider for each location
+        :param first: list with the index of the first stop that may move in each route
+        :param active: set of route indexes, where only swaps involving at least one of them are considered,
+                       or None to consider every route
+        :return:
+        """
+        # where each location is in the plan
+        position = {}
+        for i in range(len(plan)):
+            for j in range(len(plan[i])):
+                if plan[i][j] != 0:
+                    position[plan[i][j]] = (i, j)
+        for i in range(len(plan)):
+            for j in range(first[i], len(plan[i]) - 1):
+                if self.stop_reason is not None:
+                    return
+                v = plan[i][j]
+                if v == 0:
+                    continue
+                for w in self.short_paths.neighbors(v)[:k]:
+                    if w not in position:
+                        continue
+                    ai, wj = position[w]
+                    if active is not None and i not in active and ai not in active:
+                        continue
+                    swapped = False
+                    for aj in (wj - 1, wj + 1):
+                        if aj < first[ai] or aj >= len(plan[ai]) - 1 or (ai == i and aj == j):
+                            continue
+                        if self._try_swap(plan, loads, i, ai, j, aj):
+                            for u, u_i, u_j in ((plan[i][j], i, j), (plan[ai][aj], ai, aj)):
+                                if u != 0:
+                                    position[u] = (u_i, u_j)
+                            swapped = True
+                            break
+                    if swapped:
+                        break
+
+    def _try_swap(self, plan, loads, i, alt_i, j, alt_j):
+        """ Exchange two locations in place if the swap obeys constraints and capacities and does
+        not make the plan worse. A swap is accepted if it reduces lateness, or if it keeps lateness
+        the same without adding miles.
+        Worst case time complexity is O(1) for swaps that are rejected, and O(N) for accepted swaps when
+        arrival times are tracked, where N is the number of stops in a route
+
+        :param plan: route plan
+        :param loads: list of route loads (number of packages in each route)
+        :param i: route index for first route
+        :param alt_i: route index for second route
+        :param j: index of location id in first route list
+        :param alt_j: index of location id in second route list
+        :return: True if the swap was made, False otherwise
+        """
+        # exchanging a location with itself (usually the hub) changes nothing
+        if plan[i][j] == plan[alt_i][alt_j]:
+            return False
+        # check the budgets every 1024 evaluations
+        self.evaluations += 1
+        if self.stop_reason is not None or not self.evaluations & 1023 and self._out_of_budget():
+            return False
+        # vehicles that have left the hub keep their packages
+        if alt_i != i and (i in self._departed or alt_i in self._departed):
+            return False
+        # validate constraints
+        if not self._validate_constraints(plan, i, alt_i, j, alt_j):
+            if self.stats is not None:
+                self.stats.constraint_rejections += 1
+            return False
+        # validate capacities
+        valid_cap, new_i_cap, new_alt_i_cap = self._validate_capacities(plan, loads, i, alt_i, j, alt_j)
+        if not valid_cap:
+            if self.stats is not None:
+                self.stats.capacity_rejections += 1
+            return False
+        # swap if improvement
+        delta = self.swap_delta(plan, i, alt_i, j, alt_j)
+        if self.timed:
+            # routes that are on time can only get worse when miles are added
+            if delta > _EPS and self.times.lateness(i) == 0 and self.times.lateness(alt_i) == 0:
+                return False
+            before, after = self.times.swap_lateness(plan, i, alt_i, j, alt_j)
+            if after > before + _EPS or (after > before - _EPS and delta > _EPS):
+                if self.stats is not None and after > before + _EPS:
+                    self.stats.time_rejections += 1
+                return False
+        elif delta > _EPS:
+            return False
+        self.swap(plan, i, alt_i, j, alt_j)
+        loads[i] = new_i_cap
+        loads[alt_i] = new_alt_i_cap
+        if self.stats is not None:
+            self.stats.accepted += 1
+        if self.timed:
+            self.times.update(plan, i)
+            if alt_i != i:
+                self.times.update(plan, alt_i)
+        return True
+
+    def swap_delta(self, plan, i, alt_i, j, alt_j):
+        """ Returns the change in total mileage that would result from exchanging two locations,
+        without making the swap
+        Worst case time complexity is O(1)
+
+        :param plan: route plan
+        :param i: route index for first route
+        :param alt_i: route index for second route
+        :param j: index of location id in first route list
+        :param alt_j: index of location id in second route list
+        :return: change in miles
+        """
+        dist = self.short_paths.dist
+        if i == alt_i:
+            if j == alt_j:
+                return 0
+            if j > alt_j:
+                j, alt_j = alt_j, j
+            if alt_j == j + 1:
+                # adjacent stops share an edge
+                route = plan[i]
+                prev_v, v, alt_v, next_v = route[j - 1], route[j], route[alt_j], route[alt_j + 1]
+                return (dist(prev_v, alt_v) + dist(alt_v, v) + dist(v, next_v) -
+                        dist(prev_v, v) - dist(v, alt_v) - dist(alt_v, next_v))
+        return (self._replace_delta(plan[i], j, plan[alt_i][alt_j]) +
+                self._replace_delta(plan[alt_i], alt_j, plan[i][j]))
+
+    def _replace_delta(self, route, j, v):
+        """ Returns the change in route mileage if the j-th stop in a route were replaced by location v
+        Worst case time complexity is O(1)
+
+        :param route: list of location id's
+        :param j: index of stop in route
+        :param v: location id
+        :return: change in miles
+        """
+        dist = self.short_paths.dist
+        prev_v, old_v, next_v = route[j - 1], route[j], route[j + 1]
+        return dist(prev_v, v) + dist(v, next_v) - dist(prev_v, old_v) - dist(old_v, next_v)
+
     def shuffle(self, plan, loads, repetitions=1):
         """ Shuffle plan in-place while obeying constraints
         Worst case time complexity is O(N) where N is the number
@@ -193,9 +846,9 @@ class SwapRoutePlanner:
                     minimum = loads[i]
             loads[shortest] += len(packages.get(loc_id))
             plan[shortest].append(loc_id)
-        # fill empty slots with zeros to represent hub (keeps lists at length 16)
+        # fill empty slots with zeros to represent hub (keeps lists at length 16, ending at the hub)
         for route in plan:
-            while len(route) < capacity:
+            while len(route) < capacity or route[-1] != 0:
                 route.append(0)
         return plan, loads
 
@@ -209,10 +862,7 @@ class SwapRoutePlanner:
         :param route: list of location id's
         :return: path cost (in miles)
         """
-        cost = 0
-        for i in range(len(route) - 1):
-            cost += self.short_paths.dist(route[i], route[i + 1])
-        return cost
+        return self.cache.cost(route)
 
     def score_all(self, plan):
         """ Given a list of paths (ordered list of locaiton id's), determines
@@ -225,11 +875,24 @@ class SwapRoutePlanner:
         :return: total of path costs (in miles)
         """
         cost = 0
-        for i in range(len(plan)):
-            for j in range(len(plan[i]) - 1):
-                cost += self.short_paths.dist(plan[i][j], plan[i][j + 1])
+        for route in plan:
+            cost += self.cache.cost(route)
         return cost
 
+    def score_lateness(self, plan):
+        """ Given a route plan, determines the total number of hours by which
+        routes miss their latest deadline. Plans without time windows are never late.
+        The worst case time complexity is O(N) where N is the number of
+        delivery stops in the route plan
+
+        :param plan: list of lists of location id's
+        :return: total lateness (in hours)
+        """
+        if not self.timed:
+            return 0
+        self.times.track(plan)
+        return self.times.total_lateness()
+
     def swap(self, plan, i, alt_i, j, alt_j):
         """ exchange two items between two arrays
         Worst case time complexity is O(1)
@@ -311,12 +974,7 @@ class SwapRoutePlanner:
         :param plan: list of lists of location id's
         :return: list of lists of distances from prior elements in paths
         """
-        distances = []
-        for i in range(len(plan)):
-            distances.append([0])
-            for j in range(len(plan[i]) - 1):
-                distances[i].append(self.short_paths.dist(plan[i][j], plan[i][j + 1]))
-        return distances
+        return [self.cache.legs(route) for route in plan]
 
     def calculate_loads(self, plan, packages):
         """ calculates the number of packages on each vehicle/route.
@@ -331,3 +989,4 @@ class SwapRoutePlanner:
         for i in range(len(plan)):
             for loc_id in plan[i]:
                 loads[i] += len(packages.get(loc_id))
+        return loads
@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fromcsv
+from Routes import routes_from_config
+from Dijkstra import AllPairsDijkstra
+from DistanceMatrix import DistanceMatrix
+from SwapRouterPlanner import SwapRoutePlanner
+from reporting import ReportWriter
+
+# shortest paths oracle held by each worker, set once by init_worker()
+_worker = {}
+
+
+def init_worker(short_paths):
+    """ Keep the shared shortest paths oracle in a worker
+
+    :param short_paths: DistanceMatrix of the road network
+    :return:
+    """
+    _worker['short_paths'] = short_paths
+
+
+def find_manifests(paths):
+    """ Returns the package manifests to plan: csv files given directly, and every csv file in given directories
+
+    :param paths: list of file and directory paths
+    :return: sorted list of manifest paths
+    """
+    manifests = []
+    for path in paths:
+        if os.path.isdir(path):
+            manifests += glob.glob(os.path.join(path, '*.csv'))
+        else:
+            manifests.append(path)
+    return sorted(manifests)
+
+
+def load_config(manifest, defaults):
+    """ Returns the configuration for a manifest: the defaults, updated with the JSON file next to the
+    manifest with the same name (e.g. monday.json for monday.csv), if there is one
+
+    :param manifest: path of a package manifest
+    :param defaults: dictionary of default configuration
+    :return: dictionary (see Routes.routes_from_config() and plan_manifest())
+    """
+    config = dict(defaults)
+    path = os.path.splitext(manifest)[0] + '.json'
+    if os.path.exists(path):
+        with open(path) as file:
+            config.update(json.load(file))
+    return config
+
+
+def results_paths(manifests, out_dir, fmt):
+    """ Returns the results path of each manifest: its path relative to the directory that holds every manifest,
+    under out_dir, so manifests with the same name in different directories (depotA/monday.csv and
+    depotB/monday.csv) get different results files
+
+    :param manifests: list of manifest paths
+    :param out_dir: directory for the results files
+    :param fmt: report format, used as the file extension
+    :return: list of results paths, in the order of the manifests
+    """
+    if not manifests:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(manifest)) for manifest in manifests])
+    paths = []
+    owners = {}
+    for manifest in manifests:
+        name = os.path.splitext(os.path.relpath(os.path.abspath(manifest), root))[0]
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        if os.path.normcase(path) in owners:
+            raise ValueError(f"{manifest} and {owners[os.path.normcase(path)]} would both write {path}")
+        owners[os.path.normcase(path)] = manifest
+        paths.append(path)
+    return paths
+
+
+def plan_manifest(task):
+    """ Plan one manifest and write its results file. This function runs in worker processes.
+
+    :param task: (manifest path, configuration dictionary, results path, report format). Besides the routes
+                 configuration, the dictionary may set starts, iterations, neighbors, time_budget, gap, initializer
+                 and seed for the SwapRoutePlanner.
+    :return: dictionary with the manifest, results path, mileage, lateness, number of packages and seconds
+    """
+    manifest, config, out, fmt = task
+    clock = time.perf_counter()
+    packages_pid, packages_lid = fromcsv.import_packages(manifest)
+    routes = routes_from_config(packages_lid, config)
+    random.seed(config.get('seed'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        planner = SwapRoutePlanner(None, routes, _worker['short_paths'], config.get('initializer', 'balanced'))
+        plan, loads, cost = planner.optimize_global(starts=int(config.get('starts', 20)),
+                                                    iterations=int(config.get('iterations', 20)),
+                                                    neighbors=config.get('neighbors'),
+                                                    time_budget=config.get('time_budget'),
+                                                    gap=config.get('gap'))
+    routes.plan, routes.loads, routes.cost = plan, loads, cost
+    routes.distances = planner.distances(routes.plan)
+    with ReportWriter(out, fmt) as writer:
+        writer.write_plan_summary(routes)
+        writer.write_route_stops(routes)
+    return {'manifest': manifest, 'results': out, 'packages': len(packages_pid), 'miles': routes.cost,
+            'lateness': planner.lateness, 'seconds': time.perf_counter() - clock}
+
+
+def run(manifests, distances_path, out_dir, defaults=None, workers=None, fmt='csv'):
+    """ Plan many manifests against one road network. The graph and all pairs shortest paths are built once,
+    and the manifests are planned in parallel by a pool of worker processes that each hold the distances.
+
+    :param manifests: list of manifest paths
+    :param distances_path: path of the distances csv or binary graph file shared by every manifest
+    :param out_dir: directory for the results files, one per manifest (see results_paths())
+    :param defaults: configuration for manifests without their own JSON file, or None
+    :param workers: number of worker processes, or None for the number of CPUs (0 or 1 to run serially)
+    :param fmt: report format, 'csv' or 'jsonl'
+    :return: list of result dictionaries from plan_manifest(), in the order of the manifests
+    """
+    outs = results_paths(manifests, out_dir, fmt)
+    short_paths = DistanceMatrix(AllPairsDijkstra(fromcsv.import_graph(distances_path)).matrix())
+    tasks = []
+    for manifest, out in zip(manifests, outs):
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        tasks.append((manifest, load_config(manifest, defaults or {}), out, fmt))
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        init_worker(short_paths)
+        return [plan_manifest(task) for task in tasks]
+    with ProcessPoolExecutor(min(workers, len(tasks)), initializer=init_worker, initargs=(short_paths,)) as executor:
+        return list(executor.map(plan_manifest, tasks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan many package manifests against one road network")
+    parser.add_argument('manifests', nargs='+', help="manifest csv files, or directories of them")
+    parser.add_argument('--distances', default='data/WGUPS Distance Graph Input.csv')
+    parser.add_argument('--config', default=None, help="JSON file of default configuration for every manifest")
+    parser.add_argument('--out', default='results', help="directory for the results files")
+    parser.add_argument('--workers', type=int, default=None, help="planning processes, 0 to plan serially")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    args = parser.parse_args(argv)
+
+    defaults = {}
+    if args.config is not None:
+        with open(args.config) as file:
+            defaults = json.load(file)
+    clock = time.perf_counter()
+    results = run(find_manifests(args.manifests), args.distances, args.out, defaults, args.workers, args.format)
+    for result in results:
+        print(f"{result['manifest']}: {result['miles']:.1f} miles, {result['lateness']:.2f} hours late, "
+              f"{result['seconds']:.2f} s -> {result['results']}")
+    print(f"Planned {len(results)} manifests in {time.perf_counter() - clock:.2f} s", file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    main()
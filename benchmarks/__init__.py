@@ -0,0 +1,7 @@
+"""
+Benchmarks for the route planners and core data structures.
+
+Run from the repository root, e.g.
+
+    python -m benchmarks.planners --sizes 100 300 1000
+"""
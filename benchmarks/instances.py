@@ -0,0 +1,157 @@
+import csv
+import math
+import os
+import random
+
+# clock times used for deadlines and delayed packages
+_DEADLINES = ('9:00 AM', '10:30 AM', '12:00 PM', '3:00 PM')
+_DELAYS = ('9:05 am', '10:20 am')
+
+
+def fleet_size(n_packages, capacity=16):
+    """ Returns the number of routes used for an instance, with a quarter of the capacity spare
+
+    :param n_packages: number of packages
+    :param capacity: vehicle capacity
+    :return: number of routes
+    """
+    return max(2, math.ceil(1.25 * n_packages / capacity))
+
+
+def generate_instance(n_stops, directory, seed=0, packages_per_stop=1.5, capacity=16, degree=6,
+                      deadlines=0.1, delayed=0.02, constrained=0.02):
+    """ Generate a random instance and write it in the same csv formats as the WGUPS data: a distance graph,
+    a destinations table and a package manifest.
+
+    Stops are scattered over a square with about one stop per square mile, with the hub (location 0) in the
+    middle. Each location is joined by a road to its nearest locations, with road miles 20% longer than the
+    straight line, and any parts of the road network that are cut off from the hub are joined to it. Every
+    stop gets at least one package, and some packages get deadlines, arrive late at the hub, or can only be
+    on a given truck (noted in the manifest the same way as in the WGUPS data).
+
+    Worst case time complexity is O(N) for evenly scattered stops, where N is the number of stops
+
+    :param n_stops: number of delivery locations, not counting the hub
+    :param directory: directory to write the csv files to
+    :param seed: random seed
+    :param packages_per_stop: average number of packages per location
+    :param capacity: vehicle capacity, used to number trucks in constraints
+    :param degree: number of nearest locations each location has a road to
+    :param deadlines: fraction of packages with a deadline
+    :param delayed: fraction of packages that arrive late at the hub
+    :param constrained: fraction of locations whose packages can only be on one truck
+    :return: dictionary with the paths of the 'distances', 'locations' and 'packages' files
+    """
+    rng = random.Random(seed)
+    n = n_stops + 1
+    side = math.sqrt(n_stops)
+    points = [(side / 2, side / 2)] + [(rng.random() * side, rng.random() * side) for v in range(n_stops)]
+    edges = _road_network(points, degree)
+    n_packages = max(n_stops, round(n_stops * packages_per_stop))
+    n_routes = fleet_size(n_packages, capacity)
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {'distances': os.path.join(directory, 'distances.csv'),
+             'locations': os.path.join(directory, 'locations.csv'),
+             'packages': os.path.join(directory, 'packages.csv')}
+    with open(paths['distances'], 'w') as file:
+        file.write(f"{n}\n")
+        file.writelines(f"{v},{w},{miles}\n" for v, w, miles in edges)
+    with open(paths['locations'], 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('destination', 'address', 'v'))
+        writer.writerow(('Hub', '1 Depot Way', 0))
+        for v in range(1, n):
+            writer.writerow((f"Destination {v}", _address(v), v))
+    # every location gets a package, the rest go to random locations
+    lids = list(range(1, n)) + [rng.randrange(1, n) for p in range(n_packages - n_stops)]
+    trucks = {v: rng.randrange(1, n_routes + 1) for v in range(1, n) if rng.random() < constrained}
+    with open(paths['packages'], 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('package_id', 'location_id', 'address', 'city', 'state', 'zip', 'deadline', 'weight',
+                         'notes'))
+        for pid, lid in enumerate(lids, 1):
+            deadline = rng.choice(_DEADLINES) if rng.random() < deadlines else 'EOD'
+            if lid in trucks:
+                notes = f"Can only be on truck {trucks[lid]}"
+            elif rng.random() < delayed:
+                notes = f"Delayed on flight---will not arrive to depot until {rng.choice(_DELAYS)}"
+            else:
+                notes = ''
+            writer.writerow((pid, lid, _address(lid), 'Salt Lake City', 'UT', 84100 + lid % 100, deadline,
+                             rng.randint(1, 50), notes))
+    return paths
+
+
+def apply_notes(routes, packages_pid):
+    """ Constrain locations to trucks as described in package notes ("Can only be on truck N")
+
+    :param routes: Routes object
+    :param packages_pid: hash table dictionary with package id's as keys and Package objects as values
+    :return:
+    """
+    for pid in packages_pid.keys():
+        package = packages_pid.get(pid)
+        if package.notes.startswith('Can only be on truck'):
+            routes.constrain(int(package.notes.split()[-1]) - 1, package.lid)
+
+
+def _address(v):
+    return f"{100 + v} S {v % 900 + 100} E"
+
+
+def _road_network(points, degree):
+    """ Join each point to its nearest points, found with a grid of buckets, then join any components
+    that are cut off from point 0
+
+    :param points: list of (x, y) tuples
+    :param degree: number of nearest points to join each point to
+    :return: list of (v, w, miles) edges, with each road listed once
+    """
+    n = len(points)
+    side = max(max(x for x, y in points), max(y for x, y in points)) + 1e-9
+    cells = max(1, int(math.sqrt(n / 4)))
+    size = side / cells
+    grid = {}
+    for v, (x, y) in enumerate(points):
+        grid.setdefault((int(x / size), int(y / size)), []).append(v)
+
+    def miles(v, w):
+        (x1, y1), (x2, y2) = points[v], points[w]
+        return max(0.1, round(1.2 * math.hypot(x1 - x2, y1 - y2), 1))
+
+    roads = {}
+    for v, (x, y) in enumerate(points):
+        cx, cy = int(x / size), int(y / size)
+        radius = 1
+        while True:
+            near = [w for gx in range(cx - radius, cx + radius + 1) for gy in range(cy - radius, cy + radius + 1)
+                    for w in grid.get((gx, gy), ()) if w != v]
+            if len(near) >= degree or radius > cells:
+                break
+            radius += 1
+        near.sort(key=lambda w: (points[w][0] - x) ** 2 + (points[w][1] - y) ** 2)
+        for w in near[:degree]:
+            roads[(min(v, w), max(v, w))] = miles(v, w)
+
+    # join components cut off from the hub with union-find
+    parent = list(range(n))
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for v, w in roads:
+        parent[find(v)] = find(w)
+    components = {}
+    for v in range(n):
+        components.setdefault(find(v), []).append(v)
+    joined = list(components.pop(find(0)))
+    for members in components.values():
+        v = members[0]
+        w = min(joined, key=lambda u: (points[u][0] - points[v][0]) ** 2 + (points[u][1] - points[v][1]) ** 2)
+        roads[(min(v, w), max(v, w))] = miles(v, w)
+        joined.extend(members)
+    return [(v, w, d) for (v, w), d in roads.items()]
@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+
+import fromcsv
+from profiling import Profiler
+from Routes import Routes
+from Dijkstra import AllPairsDijkstra
+from NNRoutePlanner import NNRoutePlanner
+from RoutePolisher import RoutePolisher
+from SwapRouterPlanner import SwapRoutePlanner
+from ClusterRoutePlanner import ClusterRoutePlanner
+from benchmarks.instances import generate_instance, fleet_size, apply_notes
+
+# stages timed for each size, in order
+STAGES = ('generate', 'load', 'shortest paths', 'swap', 'cluster', 'nearest', 'insertion', 'polish', 'simulate')
+
+
+def run(n_stops, directory, seed=0, capacity=16, starts=3, time_budget=None, neighbors=10, max_paths=2000,
+        simulate_steps=20, memory=False, workers=None):
+    """ Benchmark the planners on a generated instance
+
+    All pairs shortest paths take time and space proportional to NN, so instances with more than max_paths
+    stops are only generated and loaded.
+
+    :param n_stops: number of delivery locations
+    :param directory: directory for the instance files
+    :param seed: random seed for the instance and the planners
+    :param capacity: vehicle capacity
+    :param starts: number of starts for SwapRoutePlanner.optimize_global()
+    :param time_budget: seconds for SwapRoutePlanner.optimize_global(), or None for no limit
+    :param neighbors: size of the candidate lists for SwapRoutePlanner, or None to try every swap
+    :param max_paths: largest number of stops to find all pairs shortest paths for
+    :param simulate_steps: number of times of day to simulate package statuses at
+    :param memory: record the peak memory of each stage (slows every stage down)
+    :param workers: number of processes for planning clusters and polishing routes, or None for the number of CPUs
+    :return: dictionary of results, with seconds and peak memory for each stage that ran
+    """
+    profiler = Profiler(memory=memory)
+    result = {'stops': n_stops, 'seed': seed}
+    with profiler.span('generate'):
+        paths = generate_instance(n_stops, directory, seed=seed, capacity=capacity)
+    with profiler.span('load'):
+        graph = fromcsv.import_distances(paths['distances'])
+        packages_pid, packages_lid = fromcsv.import_packages(paths['packages'])
+    result['packages'] = len(packages_pid)
+    result['routes'] = n_routes = fleet_size(len(packages_pid), capacity)
+    if n_stops <= max_paths:
+        with profiler.span('shortest paths'):
+            short_paths = AllPairsDijkstra(graph)
+        routes = Routes(packages_lid, n_routes=n_routes, capacity=capacity)
+        apply_notes(routes, packages_pid)
+        routes.load_time_windows()
+        random.seed(seed)
+        with profiler.span('swap'), contextlib.redirect_stdout(io.StringIO()):
+            planner = SwapRoutePlanner(graph, routes, short_paths)
+            plan, loads, cost = planner.optimize_global(starts=starts, time_budget=time_budget,
+                                                        neighbors=neighbors, polish=False)
+        result['swap_miles'] = cost
+        result['swap_lateness'] = planner.lateness
+        result['swap_evaluations'] = planner.evaluations
+        random.seed(seed)
+        with profiler.span('cluster'), contextlib.redirect_stdout(io.StringIO()):
+            cluster_planner = ClusterRoutePlanner(graph, routes, short_paths, cache=planner.cache)
+            cluster_planner.optimize_clusters(starts=starts, neighbors=neighbors, workers=workers, polish=False,
+                                              time_budget=time_budget)
+        result['cluster_miles'] = cluster_planner.cost
+        result['cluster_lateness'] = cluster_planner.lateness
+        nn_planner = NNRoutePlanner(graph, short_paths)
+        for method, stage in (('nearest', 'nearest'), ('insertion', 'insertion')):
+            with profiler.span(stage):
+                nn_plan = nn_planner.optimize_plan(plan, method)
+            result[f'{stage}_miles'] = nn_planner.score_all(nn_plan)
+        routes.plan = plan
+        with profiler.span('polish'):
+            RoutePolisher(short_paths, routes, workers=workers).apply(routes, planner.cache)
+        result['polish_miles'] = routes.cost
+        with profiler.span('simulate'):
+            for step in range(simulate_steps):
+                routes.set_time(10 * step / simulate_steps)
+        result['statuses_per_second'] = simulate_steps * len(packages_pid) / max(profiler.spans[-1]['seconds'], 1e-9)
+    for stage in profiler.stages():
+        result[f"{stage['name']}_seconds"] = stage['seconds']
+        if stage['peak_memory'] is not None:
+            result[f"{stage['name']}_peak_kib"] = stage['peak_memory'] / 1024
+    return result
+
+
+def format_table(results):
+    """ Format benchmark results as a table with one row per size
+
+    :param results: list of result dictionaries from run()
+    :return: string
+    """
+    columns = [('stops', 'Stops', 'd'), ('packages', 'Packages', 'd')]
+    columns += [(f'{stage}_seconds', stage.title() + ' s', '.3f') for stage in STAGES]
+    columns += [('swap_miles', 'Swap mi', '.1f'), ('swap_lateness', 'Late h', '.2f'),
+                ('cluster_miles', 'Cluster mi', '.1f'), ('cluster_lateness', 'Cluster late h', '.2f'),
+                ('nearest_miles', 'Nearest mi', '.1f'), ('insertion_miles', 'Insertion mi', '.1f'),
+                ('polish_miles', 'Polish mi', '.1f'),
+                ('statuses_per_second', 'Statuses/s', '.0f')]
+    if any(key.endswith('_peak_kib') for result in results for key in result):
+        columns += [(f'{stage}_peak_kib', stage.title() + ' KiB', '.0f') for stage in STAGES]
+    widths = [max(len(title), 10) + 2 for key, title, spec in columns]
+    lines = [''.join(f"{title:>{width}}" for (key, title, spec), width in zip(columns, widths))]
+    for result in results:
+        cells = []
+        for (key, title, spec), width in zip(columns, widths):
+            cells.append(f"{format(result[key], spec):>{width}}" if key in result else f"{'-':>{width}}")
+        lines.append(''.join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the route planners on generated instances")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000], help="numbers of stops")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--capacity', type=int, default=16)
+    parser.add_argument('--starts', type=int, default=3)
+    parser.add_argument('--time-budget', type=float, default=None, help="seconds for each swap search")
+    parser.add_argument('--neighbors', type=int, default=10, help="candidate list size, 0 to try every swap")
+    parser.add_argument('--max-paths', type=int, default=2000,
+                        help="largest size to find all pairs shortest paths and run the planners for")
+    parser.add_argument('--memory', action='store_true', help="record the peak memory of each stage")
+    parser.add_argument('--workers', type=int, default=None, help="processes for planning clusters and polishing routes")
+    parser.add_argument('--directory', default=None, help="keep generated instances in this directory")
+    parser.add_argument('--json', default=None, help="also write results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp:
+        for size in args.sizes:
+            directory = os.path.join(args.directory or temp, f"instance_{size}_{args.seed}")
+            results.append(run(size, directory, seed=args.seed, capacity=args.capacity, starts=args.starts,
+                               time_budget=args.time_budget, neighbors=args.neighbors or None,
+                               max_paths=args.max_paths, memory=args.memory, workers=args.workers))
+            print(f"Finished {size} stops", file=sys.stderr)
+    print(format_table(results))
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import heapq
+import json
+import platform
+import random
+import sys
+import time
+
+from HashDict import HashDict
+from LinkedListST import LinkedListST
+from IndexMinPQ import IndexMinPQ
+from Graph import Graph
+from DirectedEdge import DirectedEdge
+from Dijkstra import Dijkstra
+
+# (get, put, delete) fractions of each symbol table workload
+MIXES = {'read': (0.8, 0.15, 0.05), 'write': (0.2, 0.7, 0.1), 'churn': (0.4, 0.3, 0.3)}
+
+
+def measure(function, repeat=3):
+    """ Returns the fastest of several runs of a function
+
+    :param function: function with no arguments
+    :param repeat: number of runs
+    :return: seconds taken by the fastest run
+    """
+    best = float('inf')
+    for r in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def record(benchmark, implementation, n, ops, seconds, seed, **extra):
+    """ Returns a benchmark result as a dictionary of plain values
+
+    :param benchmark: name of the workload
+    :param implementation: name of the data structure
+    :param n: size of the workload
+    :param ops: number of operations in the workload
+    :param seconds: seconds taken
+    :param seed: random seed of the workload
+    :param extra: additional fields
+    :return: dictionary
+    """
+    result = {'benchmark': benchmark, 'implementation': implementation, 'n': n, 'ops': ops,
+              'seconds': seconds, 'ops_per_second': ops / seconds if seconds > 0 else float('inf'), 'seed': seed}
+    result.update(extra)
+    return result
+
+
+def symbol_table_ops(n, mix, seed):
+    """ Generate a list of symbol table operations on up to n keys. Deletes only remove keys that are present.
+
+    :param n: number of distinct keys, and number of operations after the table is filled
+    :param mix: (get, put, delete) fractions
+    :param seed: random seed
+    :return: list of ('get' | 'put' | 'delete', key) tuples
+    """
+    rng = random.Random(seed)
+    get, put, delete = mix
+    present = list(range(n))
+    index = {k: k for k in present}
+    ops = [('put', k) for k in present]
+    for o in range(n):
+        r = rng.random()
+        if r < get:
+            ops.append(('get', rng.randrange(n)))
+        elif r < get + put or not present:
+            k = rng.randrange(n)
+            ops.append(('put', k))
+            if k not in index:
+                index[k] = len(present)
+                present.append(k)
+        else:
+            # remove a random present key in O(1)
+            k = present[rng.randrange(len(present))]
+            last = present.pop()
+            if last != k:
+                present[index[k]] = last
+                index[last] = index[k]
+            del index[k]
+            ops.append(('delete', k))
+    return ops
+
+
+def run_symbol_table(table, ops):
+    get, put, delete = table.get, table.put, table.delete
+    for op, key in ops:
+        if op == 'get':
+            get(key)
+        elif op == 'put':
+            put(key, key)
+        else:
+            delete(key)
+
+
+def run_dict(ops):
+    table = {}
+    for op, key in ops:
+        if op == 'get':
+            table.get(key)
+        elif op == 'put':
+            table[key] = key
+        else:
+            del table[key]
+
+
+def bench_symbol_tables(sizes, seed, repeat):
+    """ Compare HashDict and LinkedListST with dict on get/put/delete mixes
+
+    LinkedListST takes linear time per operation, so it is only run on tables of up to 1000 keys.
+
+    :param sizes: list of numbers of keys
+    :param seed: random seed
+    :param repeat: number of runs to take the fastest of
+    :return: list of result dictionaries
+    """
+    results = []
+    for n in sizes:
+        for name, mix in MIXES.items():
+            ops = symbol_table_ops(n, mix, seed)
+            benchmark = f"symbol table {name}"
+            results.append(record(benchmark, 'HashDict', n, len(ops),
+                                  measure(lambda: run_symbol_table(HashDict(), ops), repeat), seed))
+            if n <= 1000:
+                results.append(record(benchmark, 'LinkedListST', n, len(ops),
+                                      measure(lambda: run_symbol_table(LinkedListST(), ops), repeat), seed))
+            results.append(record(benchmark, 'dict', n, len(ops), measure(lambda: run_dict(ops), repeat), seed))
+    return results
+
+
+def priority_queue_ops(n, seed, decreases=2):
+    """ Generate keys for an insert/decrease/pop workload like Dijkstra's algorithm
+
+    :param n: number of indexes
+    :param seed: random seed
+    :param decreases: number of key decreases per index
+    :return: (list of initial keys, list of (index, new key) decreases)
+    """
+    rng = random.Random(seed)
+    keys = [rng.random() * 1000 for i in range(n)]
+    current = list(keys)
+    changes = []
+    for c in range(decreases * n):
+        i = rng.randrange(n)
+        current[i] *= rng.random()
+        changes.append((i, current[i]))
+    return keys, changes
+
+
+def run_index_min_pq(keys, changes):
+    pq = IndexMinPQ(len(keys))
+    for i, key in enumerate(keys):
+        pq.insert(i, key)
+    for i, key in changes:
+        pq.change_key(i, key)
+    while not pq.empty():
+        pq.del_min()
+
+
+def run_heapq(keys, changes):
+    # lazy deletion: decreased keys are pushed again and stale entries are skipped when popped
+    heap = [(key, i) for i, key in enumerate(keys)]
+    heapq.heapify(heap)
+    current = list(keys)
+    for i, key in changes:
+        current[i] = key
+        heapq.heappush(heap, (key, i))
+    done = [False] * len(keys)
+    while heap:
+        key, i = heapq.heappop(heap)
+        if done[i] or key != current[i]:
+            continue
+        done[i] = True
+
+
+def bench_priority_queues(sizes, seed, repeat):
+    """ Compare IndexMinPQ with heapq (with lazy deletion) on insert/decrease/pop workloads
+
+    :param sizes: list of numbers of indexes
+    :param seed: random seed
+    :param repeat: number of runs to take the fastest of
+    :return: list of result dictionaries
+    """
+    results = []
+    for n in sizes:
+        keys, changes = priority_queue_ops(n, seed)
+        ops = 2 * n + len(changes)
+        results.append(record('priority queue', 'IndexMinPQ', n, ops,
+                              measure(lambda: run_index_min_pq(keys, changes), repeat), seed))
+        results.append(record('priority queue', 'heapq', n, ops,
+                              measure(lambda: run_heapq(keys, changes), repeat), seed))
+    return results
+
+
+def random_edges(n, degree, seed):
+    """ Generate a random connected undirected graph, as a ring plus random chords
+
+    :param n: number of vertices
+    :param degree: average number of edges per vertex, or None for a complete graph
+    :param seed: random seed
+    :return: list of (v, w, weight) edges, each listed once
+    """
+    rng = random.Random(seed)
+    if degree is None:
+        return [(v, w, rng.random() * 10) for v in range(n) for w in range(v + 1, n)]
+    edges = [(v, (v + 1) % n, rng.random() * 10) for v in range(n)]
+    for e in range(n * (degree - 2) // 2):
+        edges.append((rng.randrange(n), rng.randrange(n), rng.random() * 10))
+    return edges
+
+
+def build_graph(n, edges):
+    graph = Graph(n)
+    for v, w, weight in edges:
+        graph.add_edge(DirectedEdge(v, w, weight))
+        graph.add_edge(DirectedEdge(w, v, weight))
+    return graph
+
+
+def build_adjacency(n, edges):
+    adj = [[] for v in range(n)]
+    for v, w, weight in edges:
+        adj[v].append((w, weight))
+        adj[w].append((v, weight))
+    return adj
+
+
+def run_adjacency_dijkstra(adj, source):
+    dist = [float('inf')] * len(adj)
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for w, weight in adj[v]:
+            nd = d + weight
+            if nd < dist[w]:
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+
+def bench_graphs(sizes, seed, repeat, sources=5):
+    """ Compare Graph and Dijkstra with a plain adjacency array searched with heapq, on sparse graphs
+    (4 edges per vertex) and dense graphs (complete graphs, on a tenth of the vertices)
+
+    :param sizes: list of numbers of vertices
+    :param seed: random seed
+    :param repeat: number of runs to take the fastest of
+    :param sources: number of source vertices to search from
+    :return: list of result dictionaries
+    """
+    results = []
+    for n in sizes:
+        for density, v_count, degree in (('sparse', n, 4), ('dense', max(2, n // 10), None)):
+            edges = random_edges(v_count, degree, seed)
+            extra = {'vertices': v_count, 'edges': 2 * len(edges)}
+            results.append(record(f'graph build {density}', 'Graph', n, 2 * len(edges),
+                                  measure(lambda: build_graph(v_count, edges), repeat), seed, **extra))
+            results.append(record(f'graph build {density}', 'adjacency array', n, 2 * len(edges),
+                                  measure(lambda: build_adjacency(v_count, edges), repeat), seed, **extra))
+            graph = build_graph(v_count, edges)
+            adj = build_adjacency(v_count, edges)
+            chosen = random.Random(seed).sample(range(v_count), min(sources, v_count))
+            # check both searches agree before timing them
+            for s in chosen:
+                dist = run_adjacency_dijkstra(adj, s)
+                sp = Dijkstra(graph, s)
+                assert all(abs(sp.dist(v) - dist[v]) < 1e-9 for v in range(v_count))
+
+            def run_repo():
+                for s in chosen:
+                    Dijkstra(graph, s)
+
+            def run_adjacency():
+                for s in chosen:
+                    run_adjacency_dijkstra(adj, s)
+
+            results.append(record(f'dijkstra {density}', 'Dijkstra', n, len(chosen),
+                                  measure(run_repo, repeat), seed, **extra))
+            results.append(record(f'dijkstra {density}', 'adjacency array + heapq', n, len(chosen),
+                                  measure(run_adjacency, repeat), seed, **extra))
+    return results
+
+
+SUITES = {'symbol tables': bench_symbol_tables, 'priority queues': bench_priority_queues, 'graphs': bench_graphs}
+
+
+def run(sizes=(1000, 10000), seed=0, repeat=3, suites=None):
+    """ Run the microbenchmark suites
+
+    :param sizes: list of workload sizes
+    :param seed: random seed
+    :param repeat: number of runs of each workload to take the fastest of
+    :param suites: list of suite names (keys of SUITES), or None for every suite
+    :return: list of result dictionaries, each with the Python version
+    """
+    results = []
+    for name in suites or SUITES:
+        for result in SUITES[name](sizes, seed, repeat):
+            result['suite'] = name
+            result['python'] = platform.python_version()
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the core data structures against the standard library")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--suite', choices=list(SUITES), action='append', help="suite to run (default all)")
+    parser.add_argument('--out', default='-', help="file to write JSON lines to, or - for stdout")
+    args = parser.parse_args(argv)
+    results = run(args.sizes, args.seed, args.repeat, args.suite)
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    try:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return results
+
+
+if __name__ == "__main__":
+    main()
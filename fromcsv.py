@@ -1,20 +1,25 @@
+from array import array
 import csv
+import re
 from Package import Package
+from PackageStore import PackageStore
+import CSRGraph
 from HashDict import HashDict
 from Destination import Destination
 from Graph import Graph
 from DirectedEdge import DirectedEdge
 
 
-def import_packages():
+def import_packages(path='data/Daily Local Deliveries.csv'):
     """Read Daily Local Deliveries (packages) file from csv to hash table
 
+    :param path: path of the packages csv file
     :return: 1) hash table dictionary with package id's as keys and Package objects as values
              2) hash table dictionary with location id's as keys and lists of Package objects as values
     """
     packages_pid = HashDict()
     packages_lid = HashDict()
-    with open('data/Daily Local Deliveries.csv', 'r') as file:
+    with open(path, 'r') as file:
         reader = csv.reader(file, delimiter=',', quotechar='"')
         headers = next(reader, None)
         for row in reader:
@@ -22,7 +27,10 @@ def import_packages():
             pid = int(pid)
             lid = int(lid)
             weight = float(weight)
-            package = Package(pid, lid, address, city, state, zip_code, weight, deadline, 'At hub')
+            package = Package(pid, lid, address, city, state, zip_code, weight, deadline, 'At hub',
+                              due_time=parse_time(deadline),
+                              ready_time=parse_ready_time(notes),
+                              notes=notes)
             packages_pid.put(pid, package)
             if packages_lid.get(lid) is None:
                 packages_lid.put(lid, [])
@@ -32,14 +40,69 @@ def import_packages():
     return packages_pid, packages_lid
 
 
-def import_locations():
+def import_package_store(path='data/Daily Local Deliveries.csv'):
+    """Read Daily Local Deliveries (packages) file from csv to a column store, one row at a time,
+    without making a Package object per package
+
+    :param path: path of the packages csv file
+    :return: PackageStore (see packages_pid() and packages_lid() for the dictionaries import_packages() returns)
+    """
+    store = PackageStore()
+    with open(path, 'r') as file:
+        reader = csv.reader(file, delimiter=',', quotechar='"')
+        headers = next(reader, None)
+        for pid, lid, address, city, state, zip_code, deadline, weight, notes in reader:
+            store.append(int(pid), int(lid), address, city, state, zip_code, float(weight), deadline, 'At hub',
+                         due_time=parse_time(deadline),
+                         ready_time=parse_ready_time(notes),
+                         notes=notes)
+    store.build_indexes()
+    return store
+
+
+def parse_time(text):
+    """Convert a clock time such as '10:30 AM' to the number of hours since 8:00am.
+    'EOD' (end of day) and blank deadlines are converted to float('inf')
+
+    :param text: clock time string
+    :return: hours since 8:00am
+    """
+    match = _CLOCK.search(text)
+    if match is None:
+        return float('inf')
+    hour, minute, meridiem = match.groups()
+    hour = int(hour) % 12
+    if meridiem.lower() == 'pm':
+        hour += 12
+    return hour - 8 + int(minute) / 60
+
+
+def parse_ready_time(notes):
+    """Read the time a delayed package arrives at the hub from its notes,
+    e.g. 'Delayed on flight---will not arrive to depot until 9:05 am'
+
+    :param notes: package notes
+    :return: hours since 8:00am, or 0 if the package is not delayed
+    """
+    match = _UNTIL.search(notes)
+    if match is None:
+        return 0
+    return parse_time(match.group(1))
+
+
+_CLOCK = re.compile(r'(\d{1,2}):(\d{2})\s*([AaPp][Mm])')
+_UNTIL = re.compile(r'until\s+(\d{1,2}:\d{2}\s*[AaPp][Mm])')
+
+
+def import_locations(path='data/WGUPS Destinations Table.csv'):
     """Read locations file from csv to hash table
 
+    :param path: path of the locations csv file
     :return: hash table dictionary with location id as key and
              (location, address) tuples as values
     """
     locations = HashDict()
-    with open('data/WGUPS Destinations Table.csv', 'r') as file:
+    with open(path, 'r') as file:
         reader = csv.reader(file, delimiter=',', quotechar='"')
         headers = next(reader, None)
         for row in reader:
@@ -50,15 +113,19 @@ def import_locations():
     return locations
 
 
-def import_distances():
+def import_distances(path='data/WGUPS Distance Graph Input.csv'):
     """Read graph data file from csv to Graph
 
+    :param path: path of the graph csv file, with the number of vertices on the first line
+                 and one "v,w,miles" edge per line after it
     :return: A symmetric directed edge-weighted Graph
     """
-    with open('data/WGUPS Distance Graph Input.csv', 'r') as file:
+    with open(path, 'r') as file:
         v = file.readline()
         graph = Graph(int(v))
-        for line in file.readlines():
+        for line in file:
+            if not line.strip():
+                continue
             v, w, dist = line.split(',')
             v = int(v)
             w = int(w)
@@ -67,4 +134,70 @@ def import_distances():
             edge_two = DirectedEdge(w, v, dist)
             graph.add_edge(edge_one)
             graph.add_edge(edge_two)
-    return graph
\ No newline at end of file
+    return graph
+
+
+def import_csr_graph(path='data/WGUPS Distance Graph Input.csv', chunk_size=1 << 20):
+    """Read graph data file from csv to CSRGraph, parsing about chunk_size bytes of lines at a time
+    straight into typed arrays, without making an object per edge
+
+    :param path: path of the graph csv file, with either the number of vertices or a "from,to,miles" header
+                 on the first line, and one "v,w,miles" edge per line after it. Without the number of vertices,
+                 the graph has one more vertex than the largest vertex of an edge.
+    :param chunk_size: approximate number of bytes read and parsed at once
+    :return: A symmetric directed edge-weighted CSRGraph
+    """
+    sources = array('i')
+    targets = array('i')
+    weights = array('d')
+    with open(path, 'r') as file:
+        first = file.readline().strip()
+        V = int(first) if first.isdigit() else None
+        while True:
+            lines = [line.strip() for line in file.readlines(chunk_size)]
+            if not lines:
+                break
+            lines = [line for line in lines if line]
+            fields = ','.join(lines).split(',')
+            if len(fields) != 3 * len(lines):
+                raise ValueError(f"{path}: every edge must be a 'v,w,miles' line")
+            sources.extend(map(int, fields[0::3]))
+            targets.extend(map(int, fields[1::3]))
+            weights.extend(map(float, fields[2::3]))
+    if V is None:
+        V = max(max(sources, default=0), max(targets, default=0)) + 1
+    return CSRGraph.from_edges(V, sources, targets, weights, symmetric=True)
+
+
+def import_distance_table(path='data/WGUPS Distance Table.csv'):
+    """Read the distance table from csv to a dense matrix of the miles between each pair of locations.
+    The table has a "from,to,miles" header and one line per pair of locations, in either direction.
+
+    :param path: path of the distance table csv file
+    :return: square matrix (list of lists) where element [s][t] is the miles from s to t, 0 on the diagonal
+             and float('inf') for pairs not in the table
+    """
+    with open(path, 'r') as file:
+        reader = csv.reader(file, delimiter=',', quotechar='"')
+        headers = next(reader, None)
+        edges = [(int(v), int(w), float(miles)) for v, w, miles in reader]
+    V = max([max(v, w) for v, w, miles in edges], default=0) + 1
+    matrix = [[float('inf')] * V for v in range(V)]
+    for v in range(V):
+        matrix[v][v] = 0
+    for v, w, miles in edges:
+        matrix[v][w] = matrix[w][v] = miles
+    return matrix
+
+
+def import_graph(path='data/WGUPS Distance Graph Input.csv'):
+    """Read a road network from either a binary graph file, written by CSRGraph.save() and named *.graph,
+    which is mapped into memory, or a graph csv file, which is parsed straight into typed arrays
+    (see import_csr_graph())
+
+    :param path: path of the graph file
+    :return: CSRGraph
+    """
+    if path.endswith('.graph'):
+        return CSRGraph.load(path)
+    return import_csr_graph(path)
@@ -0,0 +1,129 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """
+    Times the stages of a run with named spans, e.g.
+
+        profiler = Profiler()
+        with profiler.span('import distances'):
+            graph = fromcsv.import_distances()
+        print(profiler.report())
+
+    Spans can be nested, and a stage that runs more than once is reported once with its total time.
+    Each span can also capture a cProfile profile of the functions called in the stage, and the peak memory
+    allocated during the stage with tracemalloc. Only the outermost span that is being profiled runs cProfile,
+    since a single profiler can be active at a time.
+
+    A disabled profiler hands out a shared empty context, so spans can be left in place at almost no cost.
+    """
+
+    def __init__(self, enabled=True, cprofile=False, memory=False):
+        """ Constructor
+
+        :param enabled: record spans, or False to make every span a no-op
+        :param cprofile: capture a cProfile profile for each stage
+        :param memory: record the peak memory of each stage with tracemalloc
+        """
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.memory = memory
+        # finished spans in the order they started: dicts of name, depth, seconds, peak memory and profile
+        self.spans = []
+        self.__depth = 0
+        self.__profiling = False
+        # running peak memory of each open span
+        self.__peaks = []
+        self.__tracing = False
+        self.__null = nullcontext()
+
+    def span(self, name):
+        """ Returns a context manager that records the time (and optionally the profile and memory) of a stage
+
+        :param name: name of the stage
+        :return: context manager
+        """
+        if not self.enabled:
+            return self.__null
+        return self.__span(name)
+
+    @contextmanager
+    def __span(self, name):
+        record = {'name': name, 'depth': self.__depth, 'seconds': 0, 'peak_memory': None, 'profile': None}
+        self.spans.append(record)
+        self.__depth += 1
+        if self.memory:
+            if not self.__peaks and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.__tracing = True
+            if self.__peaks:
+                self.__peaks[-1] = max(self.__peaks[-1], tracemalloc.get_traced_memory()[1])
+            self.__peaks.append(0)
+            tracemalloc.reset_peak()
+        profile = None
+        if self.cprofile and not self.__profiling:
+            profile = cProfile.Profile()
+            self.__profiling = True
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self.__profiling = False
+                record['profile'] = pstats.Stats(profile)
+            if self.memory:
+                peak = max(self.__peaks.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_memory'] = peak
+                if self.__peaks:
+                    self.__peaks[-1] = max(self.__peaks[-1], peak)
+                elif self.__tracing:
+                    tracemalloc.stop()
+                    self.__tracing = False
+            self.__depth -= 1
+
+    def stages(self):
+        """ Returns the spans grouped by name, in the order they first started
+
+        :return: list of dicts with name, depth, number of calls, total seconds and largest peak memory
+        """
+        grouped = {}
+        for record in self.spans:
+            stage = grouped.get(record['name'])
+            if stage is None:
+                stage = grouped[record['name']] = {'name': record['name'], 'depth': record['depth'],
+                                                   'calls': 0, 'seconds': 0, 'peak_memory': None}
+            stage['calls'] += 1
+            stage['seconds'] += record['seconds']
+            if record['peak_memory'] is not None:
+                stage['peak_memory'] = max(stage['peak_memory'] or 0, record['peak_memory'])
+        return list(grouped.values())
+
+    def report(self, top=10):
+        """ Returns a summary of the time and memory of each stage, followed by the functions
+        with the most cumulative time in each stage that was profiled
+
+        :param top: number of functions to list for each profiled stage
+        :return: string
+        """
+        lines = [f"{'Stage':<32}{'Calls':>7}{'Seconds':>11}{'Peak KiB':>11}"]
+        for stage in self.stages():
+            name = '  ' * stage['depth'] + stage['name']
+            peak = f"{stage['peak_memory'] / 1024:.1f}" if stage['peak_memory'] is not None else '-'
+            lines.append(f"{name:<32}{stage['calls']:>7}{stage['seconds']:>11.4f}{peak:>11}")
+        for record in self.spans:
+            if record['profile'] is not None:
+                out = io.StringIO()
+                record['profile'].stream = out
+                record['profile'].sort_stats('cumulative').print_stats(top)
+                lines.append('')
+                lines.append(f"Profile of {record['name']}:")
+                lines.append(out.getvalue().strip())
+        return "\n".join(lines)
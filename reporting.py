@@ -1,3 +1,8 @@
+import csv
+import json
+import sys
+
+
 def print_status(packages_pid, package_id):
     """ Print status of specific package
 
@@ -5,7 +10,8 @@ def print_status(packages_pid, package_id):
     :param package_id: package id
     :return:
     """
-    print(f"Package: {package_id} Deadline: {packages_pid.get(package_id).deadline} Status: {packages_pid.get(package_id).status}")
+    package = packages_pid.get(package_id)
+    print(f"Package: {package_id} Deadline: {package.deadline} Status: {package.status}")
 
 
 def print_all_statuses(packages_pid):
@@ -14,8 +20,8 @@ def print_all_statuses(packages_pid):
     :param packages_pid: package dictionary where keys are package ids
     :return:
     """
-    for pid, package in packages_pid:
-        print(f"Package: {pid} Deadline: {package.deadline} Status: {package.status}")
+    print("\n".join([f"Package: {pid} Deadline: {package.deadline} Status: {package.status}"
+                     for pid, package in packages_pid]))
 
 
 def print_route_status(packages_lid, route):
@@ -25,7 +31,151 @@ def print_route_status(packages_lid, route):
     :param route: iterable of location ids
     :return:
     """
-    print(f"Rotue: {route}")
+    lines = [f"Rotue: {route}"]
     for lid in route:
         for package in packages_lid.get(lid):
-            print(f"Package: {package.pid} Deadline: {package.deadline} Status: {package.status}")
\ No newline at end of file
+            lines.append(f"Package: {package.pid} Deadline: {package.deadline} Status: {package.status}")
+    print("\n".join(lines))
+
+
+class ReportWriter:
+    """
+    Writes machine-readable reports as CSV or JSON Lines through a single buffered stream.
+    Every row starts with a record type ('status', 'plan' or 'stop') so that different
+    reports can share one file. In CSV format, a header row is written before each report.
+
+    Rows are formatted in bulk rather than printed one at a time, so writing a report
+    takes time proportional to N, the number of rows, with a small constant.
+    """
+
+    STATUS_FIELDS = ('record', 'time', 'pid', 'lid', 'deadline', 'status')
+    PLAN_FIELDS = ('record', 'route', 'stops', 'load', 'miles', 'departure')
+    STOP_FIELDS = ('record', 'route', 'stop', 'lid', 'miles', 'total_miles', 'packages')
+
+    def __init__(self, out, fmt='csv', buffer_size=1 << 20):
+        """ Constructor
+
+        :param out: path of file to write, '-' for standard output, or an open text stream such as a pipe
+        :param fmt: 'csv' or 'jsonl'
+        :param buffer_size: size of write buffer in bytes
+        """
+        if fmt not in ('csv', 'jsonl'):
+            raise ValueError("report format must be 'csv' or 'jsonl'")
+        self.fmt = fmt
+        self.__owned = False
+        if out == '-':
+            out = sys.stdout
+        elif isinstance(out, str):
+            out = open(out, 'w', newline='', buffering=buffer_size)
+            self.__owned = True
+        self.__out = out
+        self.__csv = csv.writer(out, lineterminator='\n')
+        self.__quoted = _Quoted(_csv_quote if fmt == 'csv' else json.dumps)
+
+    def write_statuses(self, packages_pid, hours_since_8am=None):
+        """ Write a snapshot of every package's status
+
+        :param packages_pid: package dictionary where keys are package ids
+        :param hours_since_8am: time of the snapshot, or None if not known
+        :return: number of rows written
+        """
+        quoted = self.__quoted
+        if self.fmt == 'csv':
+            time = '' if hours_since_8am is None else repr(hours_since_8am)
+            lines = [f"status,{time},{pid},{package.lid},{quoted[package.deadline]},{quoted[package.status]}\n"
+                     for pid, package in packages_pid]
+            self.__out.write(','.join(self.STATUS_FIELDS) + '\n')
+        else:
+            time = json.dumps(hours_since_8am)
+            lines = [f'{{"record": "status", "time": {time}, "pid": {pid}, "lid": {package.lid}, '
+                     f'"deadline": {quoted[package.deadline]}, "status": {quoted[package.status]}}}\n'
+                     for pid, package in packages_pid]
+        self.__out.write(''.join(lines))
+        return len(lines)
+
+    def write_plan_summary(self, routes):
+        """ Write one row per route with its number of stops, load, mileage and departure time
+
+        :param routes: Routes object with plan, loads and distances
+        :return: number of rows written
+        """
+        rows = []
+        for i in range(routes.n_routes):
+            route = routes.plan[i]
+            load = routes.loads[i] if routes.loads else ''
+            miles = sum(routes.distances[i]) if routes.distances else ''
+            stops = len([v for v in route if v != 0])
+            rows.append(('plan', i, stops, load, miles, routes.departure(i)))
+        self.__write(self.PLAN_FIELDS, rows)
+        return len(rows)
+
+    def write_route_stops(self, routes):
+        """ Write one row per stop in each route, with the miles driven to reach it and the packages delivered
+
+        :param routes: Routes object with plan and distances
+        :return: number of rows written
+        """
+        rows = []
+        for i in range(routes.n_routes):
+            total = 0
+            for j, lid in enumerate(routes.plan[i]):
+                miles = routes.distances[i][j]
+                total += miles
+                packages = routes.packages.get(lid) or []
+                rows.append(('stop', i, j, lid, miles, total, ' '.join([str(p.pid) for p in packages])))
+        self.__write(self.STOP_FIELDS, rows)
+        return len(rows)
+
+    def flush(self):
+        """ Flush buffered rows to the file or stream
+
+        :return:
+        """
+        self.__out.flush()
+
+    def close(self):
+        """ Flush buffered rows, and close the file if the writer opened it
+
+        :return:
+        """
+        if self.__owned:
+            self.__out.close()
+        else:
+            self.__out.flush()
+
+    def __write(self, fields, rows):
+        if self.fmt == 'csv':
+            self.__csv.writerow(fields)
+            self.__csv.writerows(rows)
+            return
+        # JSON Lines
+        lines = [json.dumps(dict(zip(fields, row))) + '\n' for row in rows]
+        self.__out.write(''.join(lines))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _Quoted(dict):
+    """ Cache of quoted strings. Package deadlines and statuses take only a few distinct values,
+    so each is quoted once per report writer. """
+
+    def __init__(self, quote):
+        super().__init__()
+        self.quote = quote
+
+    def __missing__(self, key):
+        value = self.quote(key)
+        self[key] = value
+        return value
+
+
+def _csv_quote(text):
+    """ Quote a CSV field if it contains a delimiter, quote character or line break """
+    text = str(text)
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import fromcsv
+from Routes import routes_from_config
+from Dijkstra import AllPairsDijkstra
+from SwapRouterPlanner import SwapRoutePlanner
+
+# HTTP reason phrases for the status codes the service returns
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+# instance held by each worker, loaded once by init_worker()
+_worker = {}
+
+
+class HTTPError(Exception):
+    """
+    An error to answer a request with, carrying the HTTP status code
+    """
+
+    def __init__(self, status, message):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def init_worker(distances_path, packages_path):
+    """ Load the graph and packages, and find all pairs shortest paths, once for each worker
+
+    :param distances_path: path of the distances csv file, or of a binary graph file (see fromcsv.import_graph())
+    :param packages_path: path of the packages csv file
+    :return:
+    """
+    graph = fromcsv.import_graph(distances_path)
+    _worker['graph'] = graph
+    _worker['packages_lid'] = fromcsv.import_packages(packages_path)[1]
+    _worker['short_paths'] = AllPairsDijkstra(graph)
+
+
+def build_routes(packages_lid, request):
+    """ Build a Routes object from the fields of a plan request (see Routes.routes_from_config())
+
+    :param packages_lid: package dictionary where keys are location ids
+    :param request: plan request dictionary
+    :return: Routes object
+    """
+    try:
+        return routes_from_config(packages_lid, request)
+    except ValueError as error:
+        raise HTTPError(400, f"invalid plan request: {error}")
+
+
+def plan_task(request):
+    """ Plan routes for a request. This function runs in a worker.
+
+    :param request: plan request dictionary (see build_routes()), with optional starts, iterations, neighbors,
+                    time_budget, gap and seed for the planner
+    :return: dictionary with the plan, loads, distances, cost, lateness and seconds taken
+    """
+    clock = time.perf_counter()
+    routes = build_routes(_worker['packages_lid'], request)
+    if request.get('seed') is not None:
+        random.seed(request['seed'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        planner = SwapRoutePlanner(_worker['graph'], routes, _worker['short_paths'])
+        plan, loads, cost = planner.optimize_global(starts=int(request.get('starts', 20)),
+                                                    iterations=int(request.get('iterations', 20)),
+                                                    neighbors=request.get('neighbors'),
+                                                    time_budget=request.get('time_budget'),
+                                                    gap=request.get('gap'))
+    return {'plan': plan, 'loads': loads, 'distances': planner.distances(plan), 'cost': cost,
+            'lateness': planner.lateness, 'seconds': time.perf_counter() - clock}
+
+
+def replan_task(request, plan, distances, hours_since_8am, changed):
+    """ Re-plan the undelivered stops of a plan after deadlines change. This function runs in a worker.
+
+    :param request: plan request dictionary the plan was made for, with any changed due times
+    :param plan: route plan being driven
+    :param distances: distances between the stops of each route
+    :param hours_since_8am: time of the change
+    :param changed: list of changed location id's, or None to re-optimize every route
+    :return: dictionary with the plan, loads, distances, cost, lateness and seconds taken
+    """
+    clock = time.perf_counter()
+    routes = build_routes(_worker['packages_lid'], request)
+    routes.plan = plan
+    routes.distances = distances
+    planner = SwapRoutePlanner(_worker['graph'], routes, _worker['short_paths'])
+    try:
+        plan, loads, cost = planner.replan(hours_since_8am, changed, iterations=int(request.get('iterations', 20)))
+    except ValueError as error:
+        raise HTTPError(400, f"cannot re-plan: {error}")
+    return {'plan': plan, 'loads': loads, 'distances': planner.distances(plan), 'cost': cost,
+            'lateness': planner.lateness, 'seconds': time.perf_counter() - clock}
+
+
+def parse_hours(value):
+    """ Convert a time of day to hours since 8:00am: a number of hours, or a clock time such as '10:25 AM'
+
+    :param value: number or string
+    :return: hours since 8:00am
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        hours = fromcsv.parse_time(str(value))
+        if hours == float('inf'):
+            raise HTTPError(400, f"invalid time: {value}")
+        return hours
+
+
+class PlanningService:
+    """
+    A long-running planning and status service. The graph and all pairs shortest paths are loaded once by each
+    worker, and plans are kept in memory, so requests skip the csv parsing and Dijkstra's algorithm that every
+    run of Main repeats.
+
+    Requests are JSON over HTTP/1.1, on a TCP port or a Unix socket, handled by an asyncio event loop:
+
+        POST /plans                     plan routes (see routes_from_config() and plan_task() for the fields)
+        GET  /plans/<id>                the plan, its loads, mileage and lateness
+        POST /plans/<id>/replan         re-plan at {"time": ...} with new {"due_times": {...}} and {"changed": [...]}
+        GET  /plans/<id>/status?time=t  status of every package at time t (hours since 8:00am, or e.g. 10:25 AM)
+        GET  /health                    number of plans and of plan requests in progress
+
+    Planning and re-planning run in a pool of worker processes, so the event loop stays free to answer status
+    requests while plans are computed. The delivery schedule of each plan (see Routes.schedule()) is computed
+    once when the plan is stored, so a status request is a single pass over the packages, with no shortest
+    paths or route traversal.
+    """
+
+    def __init__(self, distances_path='data/WGUPS Distance Graph Input.csv',
+                 packages_path='data/Daily Local Deliveries.csv', workers=None):
+        """ Constructor
+
+        :param distances_path: path of the distances csv file, or of a binary graph file (see fromcsv.import_graph())
+        :param packages_path: path of the packages csv file
+        :param workers: number of worker processes, or 0 to plan in a thread of this process
+        """
+        self.distances_path = distances_path
+        self.packages_path = packages_path
+        self.packages_pid, self.packages_lid = fromcsv.import_packages(packages_path)
+        if workers == 0:
+            init_worker(distances_path, packages_path)
+            self.executor = ThreadPoolExecutor(1)
+        else:
+            # workers are started on the first plan request, so they must not be forked from this process, or
+            # they would inherit its open client connections and keep them from closing
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.executor = ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=init_worker,
+                                                initargs=(distances_path, packages_path),
+                                                mp_context=multiprocessing.get_context(method))
+        self.plans = {}
+        self.pending = 0
+        self.__next_id = 1
+
+    def close(self):
+        """ Shut down the worker pool
+
+        :return:
+        """
+        self.executor.shutdown(cancel_futures=True)
+
+    async def serve(self, host='127.0.0.1', port=8950, path=None):
+        """ Start serving on a TCP port, or on a Unix socket if a path is given
+
+        :param host: interface to listen on
+        :param port: TCP port, or 0 to pick a free port
+        :param path: path of a Unix socket, or None to use TCP
+        :return: asyncio Server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """ Answer the requests on a connection until the client closes it
+
+        :param reader: asyncio StreamReader
+        :param writer: asyncio StreamWriter
+        :return:
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = header.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as error:
+                    status, payload = error.status, {'error': str(error)}
+                except Exception as error:
+                    status, payload = 500, {'error': repr(error)}
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """ Route a request to its handler
+
+        :param method: HTTP method
+        :param target: request target, with the query string
+        :param body: request body
+        :return: (HTTP status code, JSON payload)
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+        if parts == ['health']:
+            return 200, {'plans': len(self.plans), 'pending': self.pending}
+        if parts == ['plans']:
+            if method != 'POST':
+                raise HTTPError(405, "use POST to plan routes")
+            return 201, await self.plan(request)
+        if len(parts) >= 2 and parts[0] == 'plans':
+            entry = self.plans.get(parts[1])
+            if entry is None:
+                raise HTTPError(404, f"no plan with id {parts[1]}")
+            if len(parts) == 2 and method == 'GET':
+                return 200, self.describe(parts[1])
+            if parts[2:] == ['status'] and method == 'GET':
+                return 200, self.status(parts[1], parse_hours(query.get('time', 0)))
+            if parts[2:] == ['replan'] and method == 'POST':
+                return 200, await self.replan(parts[1], request)
+        raise HTTPError(404, f"no handler for {method} {url.path}")
+
+    async def plan(self, request):
+        """ Plan routes in a worker, and keep the plan
+
+        :param request: plan request dictionary
+        :return: description of the plan
+        """
+        build_routes(self.packages_lid, request)
+        result = await self.__run(plan_task, request)
+        plan_id = str(self.__next_id)
+        self.__next_id += 1
+        self.__store(plan_id, request, result)
+        return self.describe(plan_id)
+
+    async def replan(self, plan_id, request):
+        """ Re-plan a kept plan in a worker, from the given time, and keep the new plan
+
+        :param plan_id: id of the plan
+        :param request: dictionary with the time, new due_times and the changed locations
+        :return: description of the new plan
+        """
+        entry = self.plans[plan_id]
+        hours = parse_hours(request.get('time', 0))
+        config = dict(entry['request'])
+        due_times = dict(config.get('due_times', {}))
+        due_times.update(request.get('due_times', {}))
+        config['due_times'] = due_times
+        changed = request.get('changed')
+        if changed is None and request.get('due_times'):
+            changed = [int(v) for v in request['due_times']]
+        build_routes(self.packages_lid, config)
+        result = await self.__run(replan_task, config, entry['routes'].plan, entry['routes'].distances, hours,
+                                  changed)
+        self.__store(plan_id, config, result, entry['version'] + 1)
+        return self.describe(plan_id)
+
+    def describe(self, plan_id):
+        """ Returns a description of a kept plan
+
+        :param plan_id: id of the plan
+        :return: dictionary
+        """
+        entry = self.plans[plan_id]
+        routes = entry['routes']
+        return {'id': plan_id, 'version': entry['version'], 'plan': routes.plan, 'loads': routes.loads,
+                'cost': routes.cost, 'lateness': entry['lateness'], 'seconds': entry['seconds']}
+
+    def status(self, plan_id, hours_since_8am):
+        """ Returns the status of every package at a time of day, without changing the packages
+        Worst case time complexity is O(N) where N is the number of packages
+
+        :param plan_id: id of the plan
+        :param hours_since_8am: time of day
+        :return: dictionary with the time and a list of statuses
+        """
+        entry = self.plans[plan_id]
+        statuses = {}
+        for i, package, status in entry['routes'].statuses(hours_since_8am, entry['schedule']):
+            statuses[package.pid] = {'pid': package.pid, 'lid': package.lid, 'route': i,
+                                     'deadline': package.deadline, 'status': status}
+        # packages not on any route are still at the hub
+        for pid, package in self.packages_pid:
+            if pid not in statuses:
+                statuses[pid] = {'pid': pid, 'lid': package.lid, 'route': None, 'deadline': package.deadline,
+                                 'status': 'At hub'}
+        return {'id': plan_id, 'time': hours_since_8am, 'statuses': [statuses[pid] for pid in sorted(statuses)]}
+
+    async def __run(self, function, *args):
+        """ Run a function in the worker pool without blocking the event loop
+
+        :param function: top-level function
+        :param args: arguments
+        :return: return value of the function
+        """
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        finally:
+            self.pending -= 1
+
+    def __store(self, plan_id, request, result, version=1):
+        """ Keep a plan, with a Routes object and delivery schedule for status requests
+
+        :param plan_id: id of the plan
+        :param request: plan request dictionary the plan was made for
+        :param result: dictionary returned by plan_task() or replan_task()
+        :param version: number of times the plan was made or re-planned
+        :return:
+        """
+        routes = build_routes(self.packages_lid, request)
+        routes.plan = result['plan']
+        routes.loads = result['loads']
+        routes.distances = result['distances']
+        routes.cost = result['cost']
+        self.plans[plan_id] = {'request': request, 'routes': routes, 'schedule': routes.schedule(),
+                               'lateness': result['lateness'], 'seconds': result['seconds'], 'version': version}
+
+
+async def run(args):
+    service = PlanningService(args.distances, args.packages, args.workers)
+    server = await service.serve(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Serving on {where}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve route plans and package statuses over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8950)
+    parser.add_argument('--unix', default=None, help="serve on this Unix socket instead of a TCP port")
+    parser.add_argument('--workers', type=int, default=None, help="planning processes, 0 to plan in a thread")
+    parser.add_argument('--distances', default='data/WGUPS Distance Graph Input.csv')
+    parser.add_argument('--packages', default='data/Daily Local Deliveries.csv')
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,170 @@
+import random
+
+import fromcsv
+from Routes import Routes, split_location
+from ArrivalTimes import ArrivalTimes
+from Dijkstra import AllPairsDijkstra
+from SwapRouterPlanner import SwapRoutePlanner
+
+
+def main():
+    # run tests
+    test_parse_time()
+    test_swap_lateness()
+    test_optimize_on_time()
+    test_replan()
+    test_replan_en_route()
+    test_replan_new_location()
+    test_split_location()
+
+
+def make_planner():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.load_time_windows()
+    routes.set_ready_time(21, 0)
+    routes.set_departure_time(2, 1+5/60)
+    return SwapRoutePlanner(graph, routes)
+
+
+def test_parse_time():
+    assert fromcsv.parse_time('10:30 AM') == 2.5
+    assert fromcsv.parse_time('9:00 AM') == 1
+    assert fromcsv.parse_time('1:15 PM') == 5.25
+    assert fromcsv.parse_time('EOD') == float('inf')
+    assert fromcsv.parse_ready_time('will not arrive to depot until 9:05 am') == 1 + 5/60
+    assert fromcsv.parse_ready_time('Can only be on truck 2') == 0
+
+
+def test_swap_lateness():
+    planner = make_planner()
+    plan = [list(route) for route in planner.plan]
+    times = planner.times
+    times.track(plan)
+    random.seed(7)
+    for trial in range(500):
+        i = random.randrange(len(plan))
+        alt_i = random.randrange(len(plan))
+        j = random.randrange(1, len(plan[i]) - 1)
+        alt_j = random.randrange(1, len(plan[alt_i]) - 1)
+        before, after = times.swap_lateness(plan, i, alt_i, j, alt_j)
+        # compare with arrival times rebuilt from scratch
+        planner.swap(plan, i, alt_i, j, alt_j)
+        rebuilt = ArrivalTimes(planner.short_paths, planner.routes)
+        rebuilt.track(plan)
+        expected = rebuilt.lateness(i) + (rebuilt.lateness(alt_i) if alt_i != i else 0)
+        assert abs(after - expected) < 1e-9
+        times.track(plan)
+
+
+def test_optimize_on_time():
+    planner = make_planner()
+    plan, loads, cost = planner.optimize_global(starts=10)
+    assert planner.lateness == 0
+    assert abs(cost - planner.score_all(plan)) < 1e-9
+
+
+def test_replan():
+    planner = make_planner()
+    routes = planner.routes
+    routes.plan, routes.loads, routes.cost = planner.optimize_global(starts=10)
+    routes.distances = planner.distances(routes.plan)
+    positions = routes.positions(1.5)
+    delivered = [routes.plan[i][:positions[i] + 1] for i in range(routes.n_routes)]
+    # tighten a deadline at 9:30am
+    v = routes.plan[2][-2]
+    routes.set_due_time(v, 2)
+    lateness = planner.score_lateness(routes.plan)
+    plan, loads, cost = planner.replan(1.5, changed=[v])
+    for i in range(routes.n_routes):
+        assert plan[i][:len(delivered[i])] == delivered[i]
+    assert sorted(v for route in plan for v in route if v) == sorted(v for route in routes.plan for v in route if v)
+    assert planner.lateness <= lateness
+
+
+def planned_routes():
+    random.seed(4)
+    planner = make_planner()
+    routes = planner.routes
+    routes.plan, routes.loads, routes.cost = planner.optimize_global(starts=10)
+    routes.distances = planner.distances(routes.plan)
+    return planner, routes
+
+
+def test_replan_en_route():
+    planner, routes = planned_routes()
+    # at 9:30am every vehicle has left the hub
+    assert all(routes.departed(1.5))
+    before = [sorted(route) for route in routes.plan]
+    for i in range(routes.n_routes):
+        routes.set_due_time(routes.plan[i][-2], 1.6)
+    plan, loads, cost = planner.replan(1.5)
+    # stops are only reordered within each vehicle
+    assert [sorted(route) for route in plan] == before
+    assert loads == routes.loads
+
+
+def test_replan_new_location():
+    planner, routes = planned_routes()
+    # at 8:01am only the vehicles without delayed packages or a later departure have left the hub
+    departed = routes.departed(1 / 60)
+    assert any(departed) and not all(departed)
+    i = next(i for i in range(routes.n_routes) if departed[i] and len(routes.plan[i]) > 2 and
+             not any(routes.plan[i][-2] in c for c in routes.constraints))
+    v = routes.plan[i].pop(-2)
+    routes.distances = planner.distances(routes.plan)
+    before = [set(route) for route in routes.plan]
+    plan, loads, cost = planner.replan(1 / 60, changed=[v])
+    assert any(v in plan[k] for k in range(routes.n_routes) if not departed[k])
+    for k in range(routes.n_routes):
+        if departed[k]:
+            assert set(plan[k]) == before[k]
+    # a location without packages cannot be inserted
+    routes.plan = plan
+    routes.distances = planner.distances(routes.plan)
+    try:
+        planner.replan(1 / 60, changed=[99])
+        assert False
+    except ValueError:
+        pass
+    # nor can a new location once every vehicle has left the hub
+    routes.plan = [[u for u in route if u != v] for route in plan]
+    routes.distances = planner.distances(routes.plan)
+    try:
+        planner.replan(5, changed=[v])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_split_location():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    # package 9 is ready at 10:20, but location 21 cannot be reached by 10:30 (package 37) after 10:20
+    graph, w = split_location(graph, packages_lid, 21, {9})
+    assert w == 27 and graph.V() == 28
+    assert [package.pid for package in packages_lid.get(w)] == [9]
+    assert 9 not in [package.pid for package in packages_lid.get(21)]
+    short_paths = AllPairsDijkstra(graph)
+    assert short_paths.dist(21, w) == 0 and short_paths.dist(0, w) == short_paths.dist(0, 21)
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    for v in (4, 12, 20, 21):
+        routes.constrain(1, v)
+    routes.load_time_windows()
+    routes.set_departure_time(2, 1+5/60)
+    routes.set_departure_time(3, 2+20/60)
+    planner = SwapRoutePlanner(graph, routes, short_paths)
+    routes.plan, routes.loads, routes.cost = planner.optimize_global(starts=10)
+    routes.distances = planner.distances(routes.plan)
+    assert planner.lateness == 0
+    # every package leaves the hub after it is ready and is delivered by its own deadline
+    rows = routes.schedule()
+    assert sorted(package.pid for i, package, departure, miles in rows) == sorted(packages_pid.keys())
+    for i, package, departure, miles in rows:
+        assert package.ready_time <= departure
+        assert departure + miles / routes.mph <= package.due_time + 1e-9
+
+
+if __name__ == "__main__":
+    main()
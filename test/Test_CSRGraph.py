@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import tempfile
+
+import CSRGraph
+import fromcsv
+from Dijkstra import Dijkstra, AllPairsDijkstra
+from DistanceMatrix import shortest_paths
+from benchmarks.instances import generate_instance
+
+
+def main():
+    # run tests
+    test_import_csr_graph()
+    test_dijkstra()
+    test_save_load()
+    test_distance_table()
+
+
+def assert_close(matrix, expected):
+    assert len(matrix) == len(expected)
+    for row, expected_row in zip(matrix, expected):
+        assert all(abs(a - b) < 1e-9 for a, b in zip(row, expected_row))
+
+
+def test_import_csr_graph():
+    graph = fromcsv.import_distances()
+    csr = fromcsv.import_csr_graph()
+    assert csr.V() == graph.V() == 27 and csr.E() == graph.E()
+    assert sorted((e.start(), e.end(), e.weight()) for e in csr.edges()) == \
+        sorted((e.start(), e.end(), e.weight()) for e in graph.edges())
+    # small chunks give the same arrays
+    small = fromcsv.import_csr_graph(chunk_size=64)
+    assert list(small.offsets) == list(csr.offsets)
+    assert list(small.targets) == list(csr.targets) and list(small.weights) == list(csr.weights)
+    # the table has a header instead of the number of vertices
+    table = fromcsv.import_csr_graph('data/WGUPS Distance Table.csv')
+    assert table.V() == 27 and list(table.targets) == list(csr.targets)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bad.csv')
+        with open(path, 'w') as file:
+            file.write("3\n0,1,2.5\n1,2\n")
+        try:
+            fromcsv.import_csr_graph(path)
+            assert False
+        except ValueError:
+            pass
+        with open(path, 'w') as file:
+            file.write("2\n0,1,2.5\n1,2,1.0\n")
+        try:
+            fromcsv.import_csr_graph(path)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_dijkstra():
+    graph = fromcsv.import_distances()
+    csr = fromcsv.import_csr_graph()
+    assert_close(AllPairsDijkstra(csr).matrix(), AllPairsDijkstra(graph).matrix())
+    path = Dijkstra(csr, 0).path(4)
+    assert path[0].start() == 0 and path[-1].end() == 4
+    assert abs(sum(e.weight() for e in path) - Dijkstra(graph, 0).dist(4)) < 1e-9
+
+
+def test_save_load():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_instance(300, directory, seed=2)
+        target = os.path.join(directory, 'network.graph')
+        with contextlib.redirect_stdout(io.StringIO()):
+            CSRGraph.main([paths['distances'], target])
+        graph = fromcsv.import_graph(target)
+        expected = fromcsv.import_graph(paths['distances'])
+        assert isinstance(expected, CSRGraph.CSRGraph)
+        assert graph.V() == expected.V() and graph.E() == expected.E()
+        assert list(graph.offsets) == list(expected.offsets) and list(graph.targets) == list(expected.targets)
+        for s in (0, 150):
+            sp, expected_sp = Dijkstra(graph, s), Dijkstra(fromcsv.import_distances(paths['distances']), s)
+            assert all(abs(sp.dist(t) - expected_sp.dist(t)) < 1e-9 for t in range(graph.V()))
+        try:
+            CSRGraph.load(paths['distances'])
+            assert False
+        except ValueError:
+            pass
+
+
+def test_distance_table():
+    matrix = fromcsv.import_distance_table()
+    assert len(matrix) == 27 and matrix[25][1] == matrix[1][25] == 4.8 and matrix[3][3] == 0
+    expected = AllPairsDijkstra(fromcsv.import_distances())
+    short_paths = shortest_paths(matrix)
+    assert_close(short_paths.matrix(), expected.matrix())
+    assert short_paths.neighbors(0) == expected.neighbors(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+
+import fromcsv
+from Routes import Routes
+from Checkpoint import Checkpoint
+from OptimizerStats import OptimizerStats
+from SwapRouterPlanner import SwapRoutePlanner
+from Dijkstra import AllPairsDijkstra
+
+
+def main():
+    # run tests
+    test_save_load()
+    test_resume()
+
+
+def make_routes():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    routes.constrain(0, 2)
+    routes.constrain(0, 5)
+    return routes
+
+
+def without_seconds(stats):
+    return [{**current, 'seconds': 0, 'iterations': [dict(record, seconds=0) for record in current['iterations']]}
+            for current in stats.starts]
+
+
+def test_save_load():
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = Checkpoint(os.path.join(directory, 'state.ckpt'), interval=0)
+        assert checkpoint.load() is None
+        assert checkpoint.due()
+        state = {'start': 3, 'plan': [[0, 1, 2, 0]], 'optima': {frozenset([1, 2])}}
+        assert checkpoint.save(state, wait=True)
+        assert checkpoint.load() == state
+        checkpoint.save({'start': 4})
+        checkpoint.wait()
+        assert checkpoint.load() == {'start': 4}
+        assert checkpoint.saves == 2
+        assert not os.path.exists(checkpoint.path + '.tmp')
+
+
+def test_resume():
+    graph = fromcsv.import_distances()
+    short_paths = AllPairsDijkstra(graph)
+    options = {'starts': 8, 'iterations': 10, 'polish': False}
+    # uninterrupted search
+    random.seed(7)
+    planner = SwapRoutePlanner(graph, make_routes(), short_paths, stats=OptimizerStats())
+    plan, loads, cost = planner.optimize_global(**options)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'search.ckpt')
+        # the same search, stopped after 3 starts
+        random.seed(7)
+        first = SwapRoutePlanner(graph, make_routes(), short_paths, stats=OptimizerStats())
+        first.optimize_global(checkpoint=path, checkpoint_interval=0, **dict(options, starts=3))
+        # resumed by a new planner, with a different random state
+        random.seed(99)
+        stats = OptimizerStats()
+        second = SwapRoutePlanner(graph, make_routes(), short_paths, stats=stats)
+        resumed = second.optimize_global(checkpoint=path, resume=True, **options)
+        assert resumed[2] == cost
+        assert second.fingerprint(resumed[0]) == planner.fingerprint(plan)
+        assert second.evaluations == planner.evaluations
+        assert without_seconds(stats) == without_seconds(planner.stats)
+        # the same search, cut short in its third start by the evaluation budget
+        os.remove(path)
+        random.seed(7)
+        first = SwapRoutePlanner(graph, make_routes(), short_paths, stats=OptimizerStats())
+        states = []
+        checkpoint_state = first._checkpoint_state
+        first._checkpoint_state = lambda *args: states.append(checkpoint_state(*args)) or states[-1]
+        budget = sum(record['candidates'] for current in planner.stats.starts[:2] for record in current['iterations'])
+        budget += planner.stats.starts[2]['iterations'][0]['candidates']
+        first.optimize_global(checkpoint=path, checkpoint_interval=3600, eval_budget=budget, **options)
+        assert first.stop_reason == 'evaluations'
+        # the state is only built for the checkpoint at the end, which resumes at the start that was cut short
+        assert len(states) == 1 and states[0]['start'] == 2 and len(states[0]['stats']['starts']) == 2
+        random.seed(99)
+        stats = OptimizerStats()
+        second = SwapRoutePlanner(graph, make_routes(), short_paths, stats=stats)
+        resumed = second.optimize_global(checkpoint=path, resume=True, **options)
+        assert resumed[2] == cost
+        assert second.evaluations == planner.evaluations
+        assert without_seconds(stats) == without_seconds(planner.stats)
+        # a checkpoint of another instance is refused
+        routes = make_routes()
+        routes.capacity = 20
+        try:
+            SwapRoutePlanner(graph, routes, short_paths).optimize_global(checkpoint=path, resume=True, **options)
+            assert False
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
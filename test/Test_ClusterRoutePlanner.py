@@ -0,0 +1,120 @@
+import random
+import tempfile
+import time
+
+import fromcsv
+from Routes import Routes
+from Dijkstra import AllPairsDijkstra
+from ClusterRoutePlanner import ClusterRoutePlanner
+from DistanceMatrix import submatrix
+from benchmarks.instances import generate_instance, fleet_size, apply_notes
+
+
+def main():
+    # run tests
+    test_submatrix()
+    test_cluster()
+    test_optimize()
+    test_capacity()
+
+
+def make_planner(directory, n_stops=120, seed=5):
+    paths = generate_instance(n_stops, directory, seed=seed)
+    graph = fromcsv.import_distances(paths['distances'])
+    packages_pid, packages_lid = fromcsv.import_packages(paths['packages'])
+    routes = Routes(packages_lid, n_routes=fleet_size(len(packages_pid)), capacity=16)
+    apply_notes(routes, packages_pid)
+    routes.load_time_windows()
+    return ClusterRoutePlanner(graph, routes, AllPairsDijkstra(graph))
+
+
+def test_submatrix():
+    with tempfile.TemporaryDirectory() as directory:
+        planner = make_planner(directory, n_stops=30)
+        vertices = [0, 7, 3, 12]
+        d = submatrix(planner.short_paths, vertices)
+        assert d.V() == 4
+        for a in range(4):
+            for b in range(4):
+                assert d.dist(a, b) == planner.short_paths.dist(vertices[a], vertices[b])
+        assert d.neighbors(0) == sorted([1, 2, 3], key=lambda t: (d.dist(0, t), t))
+
+
+def test_cluster():
+    random.seed(4)
+    with tempfile.TemporaryDirectory() as directory:
+        planner = make_planner(directory)
+        routes = planner.routes
+        medoids, members, vehicles = planner.cluster(cluster_routes=4)
+        assert len(medoids) == -(-routes.n_routes // 4)
+        assert sorted(v for group in members for v in group) == sorted(v for v in routes.packages.keys() if v)
+        assert sorted(i for group in vehicles for i in group) == list(range(routes.n_routes))
+        for c in range(len(medoids)):
+            for i in vehicles[c]:
+                assert routes.constraints[i].issubset(members[c])
+
+
+def check_plan(planner, plan, loads, cost):
+    routes = planner.routes
+    assert sorted(v for route in plan for v in route if v != 0) == sorted(v for v in routes.packages.keys() if v)
+    for i in range(routes.n_routes):
+        assert routes.constraints[i].issubset(plan[i])
+        assert loads[i] == sum(len(routes.packages.get(v)) for v in plan[i])
+        assert loads[i] <= routes.capacity
+    assert abs(cost - planner.score_all(plan)) < 1e-9
+
+
+def test_optimize():
+    random.seed(6)
+    with tempfile.TemporaryDirectory() as directory:
+        planner = make_planner(directory)
+        routes = planner.routes
+        improvements = []
+        plan, loads, cost = planner.optimize_clusters(cluster_routes=3, starts=1, iterations=5, neighbors=8,
+                                                      workers=2, callback=lambda *args: improvements.append(args))
+        check_plan(planner, plan, loads, cost)
+        assert improvements and improvements[-1][0] == cost
+        # the repair pass of the next search obeys a constraint added after this one
+        v = next(v for route in plan[2:] for v in route if v != 0 and v not in set().union(*routes.constraints))
+        planner.routes.constrain(1, v)
+        plan, loads, cost = planner.optimize_clusters(cluster_routes=3, starts=1, iterations=5, workers=0)
+        assert planner.evaluator.fixed[v] == 1
+        check_plan(planner, plan, loads, cost)
+        # any plan is within a gap of 100%, so the merged plan of the clusters is kept without repair
+        improvements = []
+        plan, loads, cost = planner.optimize_clusters(cluster_routes=3, starts=1, iterations=5, workers=0, gap=1,
+                                                      polish=False, callback=lambda *args: improvements.append(args))
+        assert planner.stop_reason == 'gap' and len(improvements) == 1
+        assert improvements[0][0] == cost and 0 < planner.gap < 1
+        check_plan(planner, plan, loads, cost)
+        # out of time, the plan of the clusters is kept without repair
+        planner = make_planner(directory)
+        clock = time.perf_counter()
+        plan, loads, cost = planner.optimize_clusters(cluster_routes=3, starts=100, workers=0, time_budget=1)
+        assert time.perf_counter() - clock < 3
+        assert planner.stop_reason == 'time'
+        check_plan(planner, plan, loads, cost)
+
+
+def test_capacity():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    locations = [v for v in packages_lid.keys() if v != 0]
+    # 40 packages in four clusters of one vehicle carrying 10 each: the nearest cluster is often full
+    planner = ClusterRoutePlanner(graph, Routes(packages_lid, n_routes=4, capacity=10))
+    for seed in range(20):
+        medoids = random.Random(seed).sample(locations, 4)
+        members, vehicles = planner._assign(locations, medoids, [[0], [1], [2], [3]])
+        assert sorted(v for group in members for v in group) == sorted(locations)
+        assert all(sum(len(packages_lid.get(v)) for v in group) <= 10 for group in members)
+    # 40 packages do not fit in four vehicles carrying 9
+    planner = ClusterRoutePlanner(graph, Routes(packages_lid, n_routes=4, capacity=9), planner.short_paths)
+    try:
+        planner._assign(locations, locations[:4], [[0], [1], [2], [3]])
+        assert False
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
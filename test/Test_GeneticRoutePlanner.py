@@ -0,0 +1,94 @@
+import random
+
+import fromcsv
+from Routes import Routes
+from GeneticRoutePlanner import GeneticRoutePlanner
+
+
+def main():
+    # run tests
+    test_fitness()
+    test_crossover()
+    test_optimize()
+
+
+def make_planner():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    routes.constrain(1, 20)
+    routes.constrain(0, 2)
+    routes.constrain(0, 5)
+    return GeneticRoutePlanner(fromcsv.import_distances(), routes)
+
+
+def check_plan(planner, plan, loads):
+    routes = planner.routes
+    assert sorted(v for route in plan for v in route if v != 0) == sorted(v for v in routes.packages.keys() if v)
+    for i in range(routes.n_routes):
+        assert routes.constraints[i].issubset(plan[i])
+        assert loads[i] == sum(len(routes.packages.get(v)) for v in plan[i])
+        assert loads[i] <= routes.capacity
+
+
+def test_fitness():
+    random.seed(1)
+    planner = make_planner()
+    rows = []
+    for k in range(10):
+        plan = [list(route) for route in planner.plan]
+        planner.shuffle(plan, planner.calculate_loads(plan, planner.routes.packages), 2)
+        rows.append(planner.encode(plan))
+        assert planner.fingerprint(planner.decode(rows[-1])) == planner.fingerprint(plan)
+    for row, cost in zip(rows, planner.fitness(rows)):
+        assert abs(cost - planner.score_all(planner.decode(row))) < 1e-9
+
+
+def test_crossover():
+    random.seed(2)
+    planner = make_planner()
+    parents = []
+    for k in range(2):
+        plan = planner.decode(planner.encode(planner.plan))
+        planner.shuffle(plan, planner.calculate_loads(plan, planner.routes.packages), 3)
+        parents.append(plan)
+    for trial in range(50):
+        child = planner._crossover(*parents)
+        assert all(len(route) == planner.width for route in child)
+        check_plan(planner, child, planner.calculate_loads(child, planner.routes.packages))
+
+
+def test_optimize():
+    random.seed(3)
+    planner = make_planner()
+    start_cost = planner.cost
+    improvements = []
+    plan, loads, cost = planner.evolve(generations=10, population=12,
+                                       callback=lambda *args: improvements.append(args[0]))
+    check_plan(planner, plan, loads)
+    assert abs(cost - planner.score_all(plan)) < 1e-9
+    assert cost < start_cost
+    assert improvements == sorted(improvements, reverse=True)
+    assert planner.gap is None
+    # a constraint added after the planner was made is obeyed
+    random.seed(0)
+    planner = make_planner()
+    v = next(v for v in planner.plan[3] if v != 0 and v not in set().union(*planner.routes.constraints))
+    planner.routes.constrain(2, v)
+    plan, loads, cost = planner.evolve(generations=5, population=12)
+    assert v in plan[2]
+    check_plan(planner, plan, loads)
+    # any plan is within a gap of 100%, so the search stops at the first generation
+    planner = make_planner()
+    planner.evolve(generations=10, population=12, gap=1, verbose=1)
+    assert planner.stop_reason == 'gap' and 0 < planner.gap < 1
+    # the restart search of SwapRoutePlanner takes the same arguments as ever
+    planner = make_planner()
+    plan, loads, cost = planner.optimize_global(starts=2, dedupe=False, time_budget=10)
+    check_plan(planner, plan, loads)
+    assert planner.stop_reason is None
+
+
+if __name__ == "__main__":
+    main()
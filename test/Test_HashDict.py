@@ -0,0 +1,48 @@
+import random
+
+from HashDict import HashDict
+from LinkedListST import LinkedListST
+
+
+def main():
+    # run tests
+    test_linked_list_delete()
+    test_hash_dict_against_dict()
+
+
+def test_linked_list_delete():
+    st = LinkedListST()
+    assert st.delete(1) is None
+    for key in range(5):
+        st.put(key, str(key))
+    st.put(3, 'three')
+    assert len(st) == 5
+    # delete the last node, a middle node, a missing key and the head
+    assert st.delete(0) == '0'
+    assert st.delete(3) == 'three'
+    assert st.delete(7) is None
+    assert st.delete(4) == '4'
+    assert len(st) == 2
+    assert sorted(key for key, val in st) == [1, 2]
+
+
+def test_hash_dict_against_dict():
+    random.seed(2)
+    table = HashDict(m=7)
+    expected = {}
+    for op in range(20000):
+        key = random.randrange(500)
+        r = random.random()
+        if r < 0.5:
+            table.put(key, op)
+            expected[key] = op
+        elif r < 0.8:
+            assert table.delete(key) == expected.pop(key, None)
+        else:
+            assert table.get(key) == expected.get(key)
+        assert len(table) == len(expected)
+    assert sorted(table.keys()) == sorted(expected)
+
+
+if __name__ == "__main__":
+    main()
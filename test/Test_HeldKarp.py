@@ -0,0 +1,100 @@
+import itertools
+import random
+import time
+
+import fromcsv
+from Dijkstra import AllPairsDijkstra
+from HeldKarp import solve_tour, HeldKarpSolver
+from Routes import Routes
+
+
+def main():
+    # run tests
+    test_solve_tour()
+    test_due_times()
+    test_polish()
+    test_deadline()
+    test_cache_size()
+
+
+def tour_length(d, tour):
+    return sum(d[tour[k]][tour[k + 1]] for k in range(len(tour) - 1))
+
+
+def random_matrix(n):
+    points = [(random.random(), random.random()) for i in range(n + 1)]
+    return [[((x - u) ** 2 + (y - v) ** 2) ** 0.5 for u, v in points] for x, y in points]
+
+
+def test_solve_tour():
+    random.seed(3)
+    for n in range(1, 8):
+        d = random_matrix(n)
+        tour, length = solve_tour(d)
+        assert tour[0] == 0 and tour[-1] == 0
+        assert sorted(tour[1:-1]) == list(range(1, n + 1))
+        assert abs(tour_length(d, tour) - length) < 1e-9
+        best = min(tour_length(d, (0,) + order + (0,)) for order in itertools.permutations(range(1, n + 1)))
+        assert abs(best - length) < 1e-9
+
+
+def test_due_times():
+    random.seed(5)
+    d = random_matrix(6)
+    tour, length = solve_tour(d)
+    # the stop visited last must now be visited first
+    last = tour[-2]
+    due = [float('inf')] * 7
+    due[last] = d[0][last]
+    timed_tour, timed_length = solve_tour(d, due)
+    assert timed_tour[1] == last
+    assert timed_length >= length
+    # impossible deadline
+    due[last] = d[0][last] / 2
+    assert solve_tour(d, due) == (None, float('inf'))
+
+
+def test_polish():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=2, capacity=16)
+    solver = HeldKarpSolver(AllPairsDijkstra(fromcsv.import_distances()), routes)
+    plan = [[0, 18, 10, 3, 12, 21, 13, 4, 20, 23, 19, 0], [0, 1, 6, 2, 5, 0]]
+    polished = solver.polish(plan)
+    for route, polished_route in zip(plan, polished):
+        assert sorted(route) == sorted(polished_route)
+        assert solver.solve(route)[1] <= tour_length_oracle(solver.short_paths, route)
+    # solutions are cached by stop set
+    assert solver.solve(list(reversed(plan[0])))[0] == solver.solve(plan[0])[0]
+
+
+def test_deadline():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    solver = HeldKarpSolver(AllPairsDijkstra(fromcsv.import_distances()))
+    plan = [[0, 18, 10, 3, 12, 21, 13, 4, 20, 23, 19, 0], [0, 1, 6, 2, 5, 0]]
+    # past the deadline, routes keep their order and nothing is cached
+    assert solver.solve(plan[0], deadline=time.perf_counter())[0] is None
+    assert solver.polish(plan, deadline=time.perf_counter())[0] == plan[0]
+    assert solver.solve(plan[0])[0] is not None
+    polished = solver.polish(plan, deadline=time.perf_counter() + 60)
+    assert abs(tour_length_oracle(solver.short_paths, polished[0]) - solver.solve(plan[0])[1]) < 1e-9
+
+
+def test_cache_size():
+    solver = HeldKarpSolver(AllPairsDijkstra(fromcsv.import_distances()), max_cache=3)
+    routes = [[0, 1, 2, 0], [0, 3, 4, 0], [0, 5, 6, 0], [0, 7, 8, 0]]
+    for route in routes[:3]:
+        solver.solve(route)
+    # using the first route again makes the second the least recently used
+    solver.solve(routes[0])
+    solver.solve(routes[3])
+    assert len(solver) == 3
+    first = solver.solve(routes[0])
+    assert len(solver) == 3 and first[0] is not None
+
+
+def tour_length_oracle(short_paths, route):
+    return sum(short_paths.dist(route[k], route[k + 1]) for k in range(len(route) - 1))
+
+
+if __name__ == "__main__":
+    main()
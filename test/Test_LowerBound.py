@@ -0,0 +1,75 @@
+import itertools
+
+import fromcsv
+from HashDict import HashDict
+from Routes import Routes
+from Dijkstra import AllPairsDijkstra
+from HeldKarp import solve_tour
+from LowerBound import LowerBound, k_tree
+
+
+def main():
+    # run tests
+    test_k_tree()
+    test_single_route()
+    test_two_routes()
+
+
+def small_routes(locations, n_routes, capacity):
+    packages_pid, packages_lid = fromcsv.import_packages()
+    packages = HashDict()
+    packages.put(0, [])
+    for v in locations:
+        packages.put(v, packages_lid.get(v))
+    return Routes(packages, n_routes=n_routes, capacity=capacity)
+
+
+def test_k_tree():
+    # a square with the hub in one corner
+    d = [[0, 1, 2, 1],
+         [1, 0, 1, 2],
+         [2, 1, 0, 1],
+         [1, 2, 1, 0]]
+    weight, degrees = k_tree(d, [0, 0, 0, 0], 1)
+    # spanning tree of 3 unit edges, plus one unit edge from the hub
+    assert weight == 4
+    assert sum(degrees) == 8
+    assert degrees[0] == 3
+
+
+def test_single_route():
+    short_paths = AllPairsDijkstra(fromcsv.import_distances())
+    locations = [1, 5, 9, 13, 17, 20, 24]
+    routes = small_routes(locations, 1, 100)
+    vertices = [0] + locations
+    d = [[short_paths.dist(a, b) for b in vertices] for a in vertices]
+    tour, optimum = solve_tour(d)
+    plain = LowerBound(short_paths, routes, iterations=0).value()
+    bound = LowerBound(short_paths, routes).value(optimum)
+    assert plain <= bound <= optimum + 1e-9
+    assert LowerBound(short_paths, routes).gap(optimum) < 0.25
+
+
+def test_two_routes():
+    short_paths = AllPairsDijkstra(fromcsv.import_distances())
+    locations = [2, 6, 11, 15, 19, 23]
+    routes = small_routes(locations, 2, 100)
+    bound = LowerBound(short_paths, routes)
+    packages = sum(len(routes.packages.get(v)) for v in locations)
+    routes.capacity = packages - 1
+    assert bound.min_routes() == 2
+    # the best plan over every split of the locations into two routes
+    optimum = float('inf')
+    for size in range(1, len(locations)):
+        for first in itertools.combinations(locations, size):
+            second = [v for v in locations if v not in first]
+            miles = 0
+            for group in (list(first), second):
+                vertices = [0] + group
+                miles += solve_tour([[short_paths.dist(a, b) for b in vertices] for a in vertices])[1]
+            optimum = min(optimum, miles)
+    assert bound.value(optimum) <= optimum + 1e-9
+
+
+if __name__ == "__main__":
+    main()
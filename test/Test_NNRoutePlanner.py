@@ -0,0 +1,34 @@
+import fromcsv
+from NNRoutePlanner import NNRoutePlanner
+
+
+def main():
+    # run tests
+    test_nearest()
+    test_insertion()
+
+
+def test_nearest():
+    planner = NNRoutePlanner(fromcsv.import_distances())
+    route = planner.optimize_route([0, 18, 10, 3, 12, 21, 13, 4, 20, 23, 19, 0])
+    assert route[0] == 0 and route[-1] == 0
+    assert sorted(route[1:-1]) == [3, 4, 10, 12, 13, 18, 19, 20, 21, 23]
+    # each step goes to the closest remaining location
+    for k in range(1, len(route) - 2):
+        remaining = route[k + 1:-1]
+        closest = min(planner.short_paths.dist(route[k], v) for v in remaining)
+        assert planner.short_paths.dist(route[k], route[k + 1]) == closest
+
+
+def test_insertion():
+    planner = NNRoutePlanner(fromcsv.import_distances())
+    locations = [15, 14, 9, 7, 17, 16, 22, 11, 24, 8, 25, 26]
+    route = planner.optimize_route(locations, method='insertion')
+    assert route[0] == 0 and route[-1] == 0
+    assert sorted(route[1:-1]) == sorted(locations)
+    # cheapest insertion has a 2-approximation guarantee on metric distances
+    assert planner.score_route(route) <= 2 * planner.score_route(planner.optimize_route(locations))
+
+
+if __name__ == "__main__":
+    main()
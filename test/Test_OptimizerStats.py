@@ -0,0 +1,62 @@
+import io
+import json
+import random
+
+import fromcsv
+from Routes import Routes
+from OptimizerStats import OptimizerStats
+from SwapRouterPlanner import SwapRoutePlanner
+
+
+def main():
+    # run tests
+    test_counters()
+    test_dump()
+
+
+def make_planner(stats):
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    routes.constrain(0, 2)
+    routes.load_time_windows()
+    routes.set_ready_time(21, 0)
+    return SwapRoutePlanner(fromcsv.import_distances(), routes, stats=stats)
+
+
+def test_counters():
+    random.seed(0)
+    stats = OptimizerStats()
+    planner = make_planner(stats)
+    planner.optimize_global(starts=3, polish=False)
+    assert len(stats.starts) == 3
+    totals = stats.totals()
+    assert totals['candidates'] == planner.evaluations
+    assert totals['constraint_rejections'] > 0
+    assert totals['capacity_rejections'] > 0
+    assert totals['accepted'] > 0
+    assert totals['constraint_rejections'] + totals['capacity_rejections'] + totals['time_rejections'] + \
+        totals['accepted'] <= totals['candidates']
+    for current, costs in zip(stats.starts, stats.trajectory()):
+        assert len(costs) == len(current['iterations'])
+        assert current['final_cost'] == costs[-1]
+    # the best start is the plan the planner kept
+    assert min(current['final_cost'] for current in stats.starts) == planner.score_all(planner.plan)
+
+
+def test_dump():
+    random.seed(0)
+    stats = OptimizerStats()
+    planner = make_planner(stats)
+    planner.optimize_global(starts=2)
+    out = io.StringIO()
+    stats.dump(out)
+    data = json.loads(out.getvalue())
+    assert data['totals']['starts'] == 2
+    assert data['totals']['iterations'] == sum(len(current['iterations']) for current in data['starts'])
+    assert len(stats.summary().splitlines()) == 3
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+
+import fromcsv
+import PackageStore
+from Routes import Routes
+from benchmarks.instances import generate_instance
+from reporting import ReportWriter
+
+
+def main():
+    # run tests
+    test_store_matches_packages()
+    test_save_load()
+    test_callers()
+    test_compact()
+
+
+def assert_same(packages_pid, packages_lid, store):
+    store_pid = store.packages_pid()
+    store_lid = store.packages_lid()
+    assert len(store_pid) == len(packages_pid)
+    assert sorted(store_pid.keys()) == sorted(packages_pid.keys())
+    for pid, package in packages_pid:
+        view = store_pid.get(pid)
+        for name in ('pid', 'lid', 'address', 'city', 'state', 'zip_code', 'weight', 'deadline', 'status',
+                     'due_time', 'ready_time', 'notes'):
+            assert getattr(view, name) == getattr(package, name), name
+        assert view == package
+    assert sorted(store_lid.keys()) == sorted(packages_lid.keys())
+    for lid, packages in packages_lid:
+        assert sorted(view.pid for view in store_lid.get(lid)) == sorted(package.pid for package in packages)
+    assert store_pid.get(10 ** 6) is None
+    assert store_lid.get(10 ** 6) is None
+    assert store_lid.get(0) == []
+
+
+def test_store_matches_packages():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    store = fromcsv.import_package_store()
+    assert_same(packages_pid, packages_lid, store)
+    # delayed packages and deadlines are read from the notes and deadline columns
+    assert store.get(6).ready_time == packages_pid.get(6).ready_time > 0
+    assert store.get(1).due_time == 2.5
+
+
+def test_save_load():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'packages.store')
+        fromcsv.import_package_store().save(path)
+        store = PackageStore.load(path)
+        assert_same(packages_pid, packages_lid, store)
+        # statuses change in memory, not in the file
+        store.get(3).status = 'Delivered'
+        assert store.get(3).status == 'Delivered'
+        assert PackageStore.load(path).get(3).status == 'At hub'
+        try:
+            store.append(41, 1, '', '', '', '', 1.0, 'EOD')
+            assert False
+        except ValueError:
+            pass
+        with open(path, 'r+b') as file:
+            file.write(b'X')
+        try:
+            PackageStore.load(path)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_callers():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    store = fromcsv.import_package_store()
+    routes = Routes(packages_lid, n_routes=2, capacity=16)
+    store_routes = Routes(store.packages_lid(), n_routes=2, capacity=16)
+    routes.load_time_windows()
+    store_routes.load_time_windows()
+    assert [store_routes.time_window(v) for v in range(28)] == [routes.time_window(v) for v in range(28)]
+    for r in (routes, store_routes):
+        r.plan = [[0, 5, 2, 0], [0, 21, 0]]
+        r.distances = [[0, 3.4, 2.0, 1.9], [0, 6.5, 6.5]]
+        r.set_time(1)
+    assert store.get(21).status == packages_pid.get(21).status
+    writers = []
+    for packages in (packages_pid, store.packages_pid()):
+        out = io.StringIO()
+        with ReportWriter(out, 'csv') as writer:
+            assert writer.write_statuses(packages, 1) == 40
+        writers.append(sorted(out.getvalue().splitlines()))
+    assert writers[0] == writers[1]
+
+
+def test_compact():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_instance(2000, directory, seed=5)
+        packages_pid, packages_lid = fromcsv.import_packages(paths['packages'])
+        store = fromcsv.import_package_store(paths['packages'])
+        assert len(store) == len(packages_pid)
+        assert store.nbytes() < 80 * len(store)
+        store.save(os.path.join(directory, 'packages.store'))
+        loaded = PackageStore.load(os.path.join(directory, 'packages.store'))
+        for pid in (1, len(store) // 2, len(store)):
+            assert loaded.get(pid) == packages_pid.get(pid)
+
+
+if __name__ == "__main__":
+    main()
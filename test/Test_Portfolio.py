@@ -0,0 +1,83 @@
+import fromcsv
+from Routes import Routes
+from Dijkstra import AllPairsDijkstra
+from Portfolio import Portfolio
+
+
+def main():
+    # run tests
+    test_serial()
+    test_concurrent()
+    test_workers()
+
+
+def make_portfolio(configs=None):
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    routes.constrain(1, 20)
+    routes.constrain(0, 2)
+    routes.constrain(0, 5)
+    graph = fromcsv.import_distances()
+    return Portfolio(graph, routes, AllPairsDijkstra(graph), configs)
+
+
+def check_plan(portfolio, plan, loads, cost):
+    routes = portfolio.routes
+    assert sorted(v for route in plan for v in route if v != 0) == sorted(v for v in routes.packages.keys() if v)
+    for i in range(routes.n_routes):
+        assert plan[i][0] == 0 and plan[i][-1] == 0
+        assert routes.constraints[i].issubset(plan[i])
+        assert loads[i] <= routes.capacity
+    miles = sum(portfolio.short_paths.dist(route[k], route[k + 1]) for route in plan for k in range(len(route) - 1))
+    assert abs(miles - cost) < 1e-6
+
+
+def test_serial():
+    configs = [{'planner': 'nearest', 'method': 'insertion'},
+               {'planner': 'swap', 'starts': 3, 'polish': False}]
+    portfolio = make_portfolio(configs)
+    plan, loads, cost = portfolio.run(time_budget=30, workers=1, seed=0)
+    check_plan(portfolio, plan, loads, cost)
+    assert cost == min(portfolio.costs)
+    assert portfolio.costs[portfolio.winner] == cost
+
+
+def test_concurrent():
+    portfolio = make_portfolio()
+    plan, loads, cost = portfolio.run(time_budget=2, seed=1)
+    check_plan(portfolio, plan, loads, cost)
+    assert cost == min(portfolio.costs)
+    assert len(portfolio.costs) == len(portfolio.CONFIGS)
+
+
+
+def test_workers():
+    # three configurations on two worker processes, one of which fails
+    configs = [{'planner': 'swap', 'starts': 2, 'polish': False},
+               {'planner': 'swap', 'starts': 2, 'unknown': 1},
+               {'planner': 'nearest', 'method': 'insertion'}]
+    portfolio = make_portfolio(configs)
+    plan, loads, cost = portfolio.run(time_budget=30, workers=2, seed=2)
+    check_plan(portfolio, plan, loads, cost)
+    assert list(portfolio.errors) == [1] and 'TypeError' in portfolio.errors[1]
+    assert portfolio.costs[0] < float('inf') and portfolio.costs[2] < float('inf')
+    # two workers busy until the deadline leave no time for a third configuration
+    configs = [{'planner': 'swap', 'starts': 100000}, {'planner': 'swap', 'starts': 100000},
+               {'planner': 'nearest', 'method': 'insertion'}]
+    portfolio = make_portfolio(configs)
+    plan, loads, cost = portfolio.run(time_budget=1, workers=2, seed=2)
+    check_plan(portfolio, plan, loads, cost)
+    assert portfolio.costs[2] == float('inf') and not portfolio.errors
+    # the failure of the only configuration, before it found a plan, is raised in this process
+    portfolio = make_portfolio([{'planner': 'genetic', 'initializer': 'unknown'}])
+    try:
+        portfolio.run(time_budget=30, workers=2, seed=2)
+        assert False
+    except RuntimeError as error:
+        assert 'ValueError' in str(error)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+
+import fromcsv
+from Dijkstra import AllPairsDijkstra
+from RouteCostCache import RouteCostCache
+from NNRoutePlanner import NNRoutePlanner
+from SwapRouterPlanner import SwapRoutePlanner
+from Routes import Routes
+
+
+def main():
+    # run tests
+    test_cost()
+    test_eviction()
+    test_shared()
+
+
+def test_cost():
+    short_paths = AllPairsDijkstra(fromcsv.import_distances())
+    cache = RouteCostCache(short_paths)
+    random.seed(4)
+    for trial in range(50):
+        route = [0] + random.sample(range(1, 27), 8) + [0]
+        expected = sum(short_paths.dist(route[k], route[k + 1]) for k in range(len(route) - 1))
+        assert abs(cache.cost(route) - expected) < 1e-9
+        assert cache.legs(route) == [0] + [short_paths.dist(route[k], route[k + 1]) for k in range(len(route) - 1)]
+    assert cache.misses == 50
+    assert cache.hits == 50
+    assert cache.hit_rate() == 0.5
+
+
+def test_eviction():
+    short_paths = AllPairsDijkstra(fromcsv.import_distances())
+    cache = RouteCostCache(short_paths, max_size=2)
+    cache.cost([0, 1, 0])
+    cache.cost([0, 2, 0])
+    # using a route makes it the most recently used
+    cache.cost([0, 1, 0])
+    cache.cost([0, 3, 0])
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert [0, 1, 0] in cache
+    assert [0, 2, 0] not in cache
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+
+
+def test_shared():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    short_paths = AllPairsDijkstra(graph)
+    cache = RouteCostCache(short_paths)
+    planner = SwapRoutePlanner(graph, Routes(packages_lid, n_routes=4, capacity=16), short_paths, cache=cache)
+    plan, loads, cost = planner.optimize_global(starts=2, polish=False)
+    assert cache.hits > 0
+    nn_planner = NNRoutePlanner(graph, short_paths, cache=cache)
+    hits = cache.hits
+    assert nn_planner.score_all(plan) == cost
+    assert cache.hits == hits + len(plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import math
+import random
+import time
+
+import fromcsv
+from Routes import Routes
+from Dijkstra import AllPairsDijkstra
+from HeldKarp import solve_tour
+from RoutePolisher import RoutePolisher, polish_order, tour_length, tour_lateness, two_opt, or_opt
+from SwapRouterPlanner import SwapRoutePlanner
+
+
+def main():
+    # run tests
+    test_local_search()
+    test_polish_order()
+    test_planner()
+    test_parallel()
+
+
+def random_matrix(n, seed):
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for v in range(n)]
+    return [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+
+
+def circle_matrix(n):
+    points = [(math.cos(2 * math.pi * k / n), math.sin(2 * math.pi * k / n)) for k in range(n)]
+    return [[math.dist(a, b) for b in points] for a in points]
+
+
+def test_local_search():
+    # points around a circle: the shortest tour visits them in order, around the perimeter
+    d = circle_matrix(8)
+    perimeter = 8 * 2 * math.sin(math.pi / 8)
+    # a reversed segment crosses itself, which 2-opt undoes
+    tour = [0, 1, 5, 4, 3, 2, 6, 7, 0]
+    before = tour_length(d, tour)
+    assert two_opt(d, tour)
+    assert tour == [0, 1, 2, 3, 4, 5, 6, 7, 0]
+    assert abs(tour_length(d, tour) - perimeter) < 1e-9 and before - perimeter > 1
+    assert not two_opt(d, tour)
+    # a stop out of place is moved back by or-opt, saving the detour
+    tour = [0, 1, 2, 3, 5, 6, 4, 7, 0]
+    saving = tour_length(d, tour) - perimeter
+    assert or_opt(d, tour)
+    assert tour == [0, 1, 2, 3, 4, 5, 6, 7, 0]
+    assert abs(tour_length(d, [0, 1, 2, 3, 5, 6, 4, 7, 0]) - tour_length(d, tour) - saving) < 1e-9
+    assert not or_opt(d, tour)
+    # on a random tour, or-opt only shortens what 2-opt leaves
+    d = random_matrix(30, 1)
+    tour = list(range(30)) + [0]
+    assert two_opt(d, tour)
+    after_two_opt = tour_length(d, tour)
+    changed = or_opt(d, tour)
+    assert tour[0] == 0 and tour[-1] == 0
+    assert sorted(tour[:-1]) == list(range(30))
+    assert tour_length(d, tour) < after_two_opt - 1e-9 if changed else tour_length(d, tour) == after_two_opt
+
+
+def test_polish_order():
+    for seed in range(5):
+        d = random_matrix(9, seed)
+        tour, length = polish_order(d)
+        assert abs(length - solve_tour(d)[1]) < 1e-9
+    # a stop 10 miles east, and two stops north of the hub
+    points = [(0, 0), (10, 0), (0, 1), (0, 2)]
+    d = [[math.dist(a, b) for b in points] for a in points]
+    current = tour_length(d, [0, 1, 2, 3, 0])
+    shortest = 10 + math.dist((10, 0), (0, 2)) + 2
+    # the shortest order that reaches the east stop by its due time goes there first
+    tour, length = polish_order(d, [float('inf'), 10, float('inf'), float('inf')])
+    assert tour == [0, 1, 3, 2, 0] and abs(length - shortest) < 1e-9 < current - length
+    # no order is on time, and the shortest order the other way round is later than the current order
+    due = [float('inf'), 9, float('inf'), float('inf')]
+    tour, length = polish_order(d, due)
+    assert tour in ([0, 1, 3, 2, 0], [0, 1, 2, 3, 0])
+    assert tour_lateness(d, tour, due) <= tour_lateness(d, [0, 1, 2, 3, 0], due) + 1e-9
+    # long routes are improved with 2-opt and or-opt instead
+    d = circle_matrix(12)
+    order = [0, 6, 1, 7, 2, 8, 3, 9, 4, 10, 5, 11]
+    tour, length = polish_order([[d[a][b] for b in order] for a in order], max_exact=4)
+    assert abs(length - 12 * 2 * math.sin(math.pi / 12)) < 1e-9
+    # past the deadline the current order is kept
+    tour, length = polish_order([[d[a][b] for b in order] for a in order], deadline=time.perf_counter())
+    assert tour == list(range(12)) + [0]
+
+
+def test_planner():
+    # one vehicle with every location: too many stops to order exactly, so the route is improved with 2-opt
+    packages_pid, packages_lid = fromcsv.import_packages()
+    graph = fromcsv.import_distances()
+    random.seed(1)
+    planner = SwapRoutePlanner(graph, Routes(packages_lid, n_routes=1, capacity=40))
+    plan, loads, unpolished = planner.optimize_global(starts=1, polish=False)
+    random.seed(1)
+    planner = SwapRoutePlanner(graph, Routes(packages_lid, n_routes=1, capacity=40))
+    plan, loads, cost = planner.optimize_global(starts=1)
+    assert len(plan[0]) - 2 > planner.exact.max_stops
+    assert cost < unpolished - 1
+    assert sorted(plan[0]) == sorted([0, 0] + [v for v in packages_lid.keys() if v != 0])
+    # the routes of a plan are polished in worker processes, to the same mileage
+    for workers in (1, 2):
+        random.seed(2)
+        planner = SwapRoutePlanner(graph, Routes(packages_lid, n_routes=4, capacity=16), polish_workers=workers)
+        plan, loads, cost = planner.optimize_global(starts=2)
+        if workers == 1:
+            serial = cost
+    assert planner.polisher.workers == 2 and planner.polisher.max_exact == planner.exact.max_stops
+    assert abs(cost - serial) < 1e-9
+
+
+def test_parallel():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    short_paths = AllPairsDijkstra(graph)
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    locations = [v for v in packages_lid.keys() if v != 0]
+    random.seed(3)
+    random.shuffle(locations)
+    routes.plan = [[0] + locations[k::4] + [0] for k in range(4)]
+    before = sum(tour_length(short_paths.matrix(), route) for route in routes.plan)
+    serial = RoutePolisher(short_paths, workers=1).polish(routes.plan)
+    polisher = RoutePolisher(short_paths, workers=2, max_exact=5)
+    parallel = RoutePolisher(short_paths, workers=2).polish(routes.plan)
+    assert serial == parallel
+    polisher.apply(routes)
+    for route, original in zip(routes.plan, parallel):
+        assert sorted(route) == sorted(original)
+    assert routes.cost < before
+    assert abs(routes.cost - sum(map(sum, routes.distances))) < 1e-9
+
+
+if __name__ == "__main__":
+    main()
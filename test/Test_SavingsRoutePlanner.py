@@ -0,0 +1,78 @@
+import fromcsv
+from Routes import Routes
+from SavingsRoutePlanner import SavingsRoutePlanner
+from SwapRouterPlanner import SwapRoutePlanner
+
+
+def main():
+    # run tests
+    test_savings_plan()
+    test_savings_initializer()
+    test_split_capacity()
+
+
+def make_routes(extra=()):
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    for v in extra:
+        routes.constrain(1, v)
+    routes.constrain(0, 2)
+    routes.constrain(0, 5)
+    return routes
+
+
+def test_savings_plan():
+    graph = fromcsv.import_distances()
+    # with location 20 also constrained, routes built around different constrained locations share a vehicle
+    for extra in ((), (20,)):
+        routes = make_routes(extra)
+        plan, loads, cost = SavingsRoutePlanner(graph, routes).optimize()
+        # every location is visited once
+        stops = sorted(v for route in plan for v in route if v != 0)
+        assert stops == sorted(v for v in routes.packages.keys() if v != 0)
+        # constraints and capacities hold
+        for i in range(routes.n_routes):
+            assert plan[i][0] == 0 and plan[i][-1] == 0
+            assert routes.constraints[i].issubset(plan[i])
+            assert loads[i] == sum(len(routes.packages.get(v)) for v in plan[i])
+            assert loads[i] <= routes.capacity
+
+
+def test_savings_initializer():
+    graph = fromcsv.import_distances()
+    balanced = SwapRoutePlanner(graph, make_routes())
+    savings = SwapRoutePlanner(graph, make_routes(), short_paths=balanced.short_paths, initializer='savings')
+    assert savings.cost < balanced.cost
+    plan, loads, cost = savings.optimize_global(starts=2)
+    assert cost <= SavingsRoutePlanner(graph, make_routes(), balanced.short_paths).optimize()[2]
+
+
+def test_split_capacity():
+    graph = fromcsv.import_distances()
+    packages_pid, packages_lid = fromcsv.import_packages()
+    locations = sorted(v for v in packages_lid.keys() if v != 0)
+    # routes of at most 10 packages, more routes than vehicles
+    built = [([], 0, set())]
+    for v in locations:
+        size = len(packages_lid.get(v))
+        if built[-1][1] + size > 10:
+            built.append(([], 0, set()))
+        built[-1][0].append(v)
+        built[-1] = (built[-1][0], built[-1][1] + size, set())
+    routes = Routes(packages_lid, n_routes=3, capacity=16)
+    plan, loads = SavingsRoutePlanner(graph, routes)._assign(built)
+    assert sorted(v for route in plan for v in route if v != 0) == locations
+    assert max(loads) <= 16
+    # 40 packages cannot fit in three vehicles of 12
+    routes = Routes(packages_lid, n_routes=3, capacity=12)
+    try:
+        SavingsRoutePlanner(graph, routes)._assign(built)
+        assert False
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import random
+import tempfile
+import threading
+import time
+
+import fromcsv
+from Routes import Routes
+from SwapRouterPlanner import SwapRoutePlanner
+from SwapEvaluator import SwapEvaluator
+from Dijkstra import AllPairsDijkstra
+from HeldKarp import HeldKarpSolver
+from benchmarks.instances import generate_instance
+
+
+def main():
+    # run tests
+    test_candidate_lists()
+    test_swap_evaluator()
+    test_batch()
+    test_budgets()
+    test_polish_budget()
+    test_cancel()
+    test_fingerprint()
+    test_dedupe()
+    test_gap()
+
+
+def make_routes():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=4, capacity=16)
+    routes.constrain(1, 4)
+    routes.constrain(1, 12)
+    routes.constrain(1, 20)
+    routes.constrain(0, 2)
+    routes.constrain(0, 5)
+    return routes
+
+
+def check_plan(planner, plan, loads, cost):
+    routes = planner.routes
+    stops = sorted(v for route in plan for v in route if v != 0)
+    assert stops == sorted(v for v in routes.packages.keys() if v != 0)
+    for i in range(routes.n_routes):
+        assert routes.constraints[i].issubset(plan[i])
+        assert loads[i] <= routes.capacity
+    assert abs(cost - planner.score_all(plan)) < 1e-9
+
+
+def test_candidate_lists():
+    random.seed(0)
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    start_cost = planner.cost
+    plan, loads, cost = planner.optimize_global(starts=5, neighbors=5)
+    check_plan(planner, plan, planner.calculate_loads(plan, planner.routes.packages), cost)
+    assert cost < start_cost
+
+
+def test_swap_evaluator():
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    evaluator = SwapEvaluator(planner.short_paths.matrix(), planner.routes)
+    plan, loads = planner.plan, planner.loads
+    for i in range(len(plan)):
+        for alt_i in range(i + 1, len(plan)):
+            swaps = evaluator.improving_swaps(plan, loads, i, alt_i)
+            assert swaps == sorted(swaps)
+            for delta, j, alt_j in swaps:
+                assert abs(delta - planner.swap_delta(plan, i, alt_i, j, alt_j)) < 1e-9
+                assert planner._validate_constraints(plan, i, alt_i, j, alt_j)
+                assert planner._validate_capacities(plan, loads, i, alt_i, j, alt_j)[0]
+            # every improving swap is found
+            found = {(j, alt_j) for delta, j, alt_j in swaps}
+            for j in range(1, len(plan[i]) - 1):
+                for alt_j in range(1, len(plan[alt_i]) - 1):
+                    if (planner.swap_delta(plan, i, alt_i, j, alt_j) < -1e-6 and
+                            planner._validate_constraints(plan, i, alt_i, j, alt_j) and
+                            planner._validate_capacities(plan, loads, i, alt_i, j, alt_j)[0]):
+                        assert (j, alt_j) in found
+
+
+def test_batch():
+    random.seed(0)
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    start_cost = planner.cost
+    plan, loads, cost = planner.optimize_global(starts=5, batch=True)
+    check_plan(planner, plan, planner.calculate_loads(plan, planner.routes.packages), cost)
+    assert cost < start_cost
+
+
+def test_budgets():
+    random.seed(0)
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    start_cost = planner.cost
+    improvements = []
+    plan, loads, cost = planner.optimize_global(starts=50, eval_budget=2000,
+                                                callback=lambda *args: improvements.append(args))
+    assert planner.stop_reason == 'evaluations'
+    assert planner.evaluations < 2000 + 1024
+    check_plan(planner, plan, loads, cost)
+    assert cost <= start_cost
+    # each improvement reports a better plan than the last
+    assert improvements
+    costs = [c for c, lateness, best, start in improvements]
+    assert costs == sorted(costs, reverse=True)
+    for c, lateness, best, start in improvements:
+        assert abs(c - planner.score_all(best)) < 1e-9
+    # time budget
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    plan, loads, cost = planner.optimize_global(starts=10000, time_budget=0.2)
+    assert planner.stop_reason == 'time'
+    check_plan(planner, plan, loads, cost)
+
+
+def test_polish_budget():
+    # one vehicle with every location: the search is quick, but the exact polish of 26 stops is not
+    packages_pid, packages_lid = fromcsv.import_packages()
+    planner = SwapRoutePlanner(fromcsv.import_distances(), Routes(packages_lid, n_routes=1, capacity=40))
+    planner.exact = HeldKarpSolver(planner.short_paths, planner.routes, max_stops=30)
+    clock = time.perf_counter()
+    plan, loads, cost = planner.optimize_global(starts=1, time_budget=1)
+    assert time.perf_counter() - clock < 1.5
+    assert planner.stop_reason is None
+    check_plan(planner, plan, loads, cost)
+
+
+def test_cancel():
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    cancel = threading.Event()
+    cancel.set()
+    start_plan = [list(route) for route in planner.plan]
+    plan, loads, cost = planner.optimize_global(starts=5, cancel=cancel)
+    assert planner.stop_reason == 'cancelled'
+    assert planner.evaluations == 0
+    planner.clean_plan(start_plan)
+    assert plan == start_plan
+    # functions work as cancellation flags too
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    plan, loads, cost = planner.optimize_global(starts=2, cancel=lambda: False)
+    assert planner.stop_reason is None
+    check_plan(planner, plan, loads, cost)
+
+
+def test_fingerprint():
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    plan = [list(route) for route in planner.plan]
+    reordered = [[0] + list(reversed([v for v in route if v != 0])) + [0, 0] for route in reversed(plan)]
+    assert planner.fingerprint(plan) == planner.fingerprint(reordered)
+    i = next(i for i in range(len(plan)) if plan[i][1] not in planner.routes.constraints[i])
+    alt_i = (i + 1) % len(plan)
+    planner.swap(plan, i, alt_i, 1, 1)
+    assert planner.fingerprint(plan) != planner.fingerprint(reordered)
+
+
+def test_dedupe():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_instance(12, directory, seed=1, deadlines=0, delayed=0, constrained=0)
+        graph = fromcsv.import_distances(paths['distances'])
+        packages_pid, packages_lid = fromcsv.import_packages(paths['packages'])
+    short_paths = AllPairsDijkstra(graph)
+    results = {}
+    for dedupe in (True, False):
+        random.seed(0)
+        planner = SwapRoutePlanner(graph, Routes(packages_lid, n_routes=3, capacity=16), short_paths)
+        plan, loads, cost = planner.optimize_global(starts=40, polish=False, dedupe=dedupe)
+        results[dedupe] = planner.duplicates, planner.evaluations, cost
+    assert results[True][0] > 0
+    assert results[False][0] == 0
+    # starts that reach a known local optimum stop early
+    assert results[True][1] < results[False][1]
+    assert results[True][2] <= results[False][2] + 1
+
+
+def test_gap():
+    random.seed(3)
+    planner = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    bound = planner.bound.value()
+    plan, loads, cost = planner.optimize_global(starts=50, gap=1, polish=False)
+    # any plan is within a gap of 100%, so the search stops after the first improvement
+    assert planner.stop_reason == 'gap'
+    assert bound <= cost
+    assert abs(planner.gap - (cost - bound) / cost) < 1e-9
+    full = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    full.optimize_global(starts=3, gap=0, polish=False)
+    assert full.stop_reason is None
+    assert full.gap > 0
+    assert full.evaluations > planner.evaluations
+    # verbose output alone does not compute the lower bound, while report_gap does without stopping early
+    quiet = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    quiet.optimize_global(starts=2, verbose=1, polish=False)
+    assert quiet.gap is None
+    reported = SwapRoutePlanner(fromcsv.import_distances(), make_routes())
+    reported.optimize_global(starts=1, report_gap=True, polish=False)
+    assert reported.stop_reason is None and 0 < reported.gap < 1
+
+
+if __name__ == "__main__":
+    main()
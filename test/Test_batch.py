@@ -0,0 +1,79 @@
+import csv
+import json
+import os
+import tempfile
+
+import batch
+
+MANIFEST = 'data/Daily Local Deliveries.csv'
+DISTANCES = 'data/WGUPS Distance Graph Input.csv'
+
+
+def main():
+    # run tests
+    test_batch()
+    test_same_names()
+
+
+def write_manifests(directory):
+    with open(MANIFEST) as file:
+        lines = file.readlines()
+    with open(os.path.join(directory, 'monday.csv'), 'w') as file:
+        file.writelines(lines)
+    # a smaller day with its own configuration
+    with open(os.path.join(directory, 'tuesday.csv'), 'w') as file:
+        file.writelines(lines[:21])
+    with open(os.path.join(directory, 'tuesday.json'), 'w') as file:
+        json.dump({'n_routes': 2, 'constraints': {'1': [12]}}, file)
+
+
+def test_batch():
+    with tempfile.TemporaryDirectory() as directory:
+        write_manifests(directory)
+        manifests = batch.find_manifests([directory])
+        assert [os.path.basename(path) for path in manifests] == ['monday.csv', 'tuesday.csv']
+        defaults = {'starts': 2, 'seed': 0}
+        serial = batch.run(manifests, DISTANCES, os.path.join(directory, 'serial'), defaults, workers=1)
+        parallel = batch.run(manifests, DISTANCES, os.path.join(directory, 'parallel'), defaults, workers=2)
+        assert [result['packages'] for result in parallel] == [40, 20]
+        # seeded runs give the same plans in workers as in this process
+        assert [result['miles'] for result in serial] == [result['miles'] for result in parallel]
+        with open(os.path.join(directory, 'parallel', 'tuesday.csv')) as file:
+            rows = list(csv.reader(file))
+        plan_rows = [row for row in rows if row[0] == 'plan']
+        assert len(plan_rows) == 2
+        stops = [row for row in rows if row[0] == 'stop']
+        assert any(row[1] == '1' and row[3] == '12' for row in stops)
+        miles = sum(float(row[4]) for row in stops)
+        assert abs(miles - parallel[1]['miles']) < 1e-6
+
+
+
+def test_same_names():
+    with tempfile.TemporaryDirectory() as directory:
+        for depot in ('depotA', 'depotB'):
+            os.makedirs(os.path.join(directory, depot))
+            write_manifests(os.path.join(directory, depot))
+        manifests = batch.find_manifests([os.path.join(directory, 'depotA'), os.path.join(directory, 'depotB')])
+        out = os.path.join(directory, 'results')
+        # manifests with the same name keep their directories, so neither results file overwrites the other
+        expected = [os.path.join(out, depot, day) for depot in ('depotA', 'depotB') for day in ('monday.csv',
+                                                                                                'tuesday.csv')]
+        assert batch.results_paths(manifests, out, 'csv') == expected
+        results = batch.run(manifests[1::2], DISTANCES, out, {'starts': 1, 'seed': 0}, workers=1)
+        assert [result['results'] for result in results] == [os.path.join(out, depot, 'tuesday.csv')
+                                                             for depot in ('depotA', 'depotB')]
+        assert all(os.path.exists(result['results']) for result in results)
+        # manifests of one directory are written straight into the results directory
+        assert batch.results_paths(manifests[:2], out, 'jsonl') == [os.path.join(out, 'monday.jsonl'),
+                                                                    os.path.join(out, 'tuesday.jsonl')]
+        # the same manifest given twice would write one file twice
+        try:
+            batch.results_paths([manifests[0], manifests[0]], out, 'csv')
+            assert False
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import fromcsv
+from Dijkstra import Dijkstra
+from benchmarks.instances import generate_instance, fleet_size
+from benchmarks.planners import run
+
+
+def main():
+    # run tests
+    test_generate_instance()
+    test_run()
+
+
+def test_generate_instance():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_instance(200, directory, seed=3)
+        graph = fromcsv.import_distances(paths['distances'])
+        packages_pid, packages_lid = fromcsv.import_packages(paths['packages'])
+        locations = fromcsv.import_locations(paths['locations'])
+        assert graph.V() == 201
+        assert len(locations) == 201
+        assert len(packages_pid) == 300
+        # every location has a package and can be reached from the hub
+        sp = Dijkstra(graph, 0)
+        for v in range(1, 201):
+            assert packages_lid.get(v)
+            assert sp.ispath(v)
+        n_routes = fleet_size(len(packages_pid))
+        notes = [packages_pid.get(pid).notes for pid in packages_pid.keys()]
+        trucks = [int(note.split()[-1]) for note in notes if note.startswith('Can only be on truck')]
+        assert all(1 <= truck <= n_routes for truck in trucks)
+        assert any(packages_pid.get(pid).due_time < float('inf') for pid in packages_pid.keys())
+        # instances are reproducible
+        with open(paths['packages']) as file:
+            first = file.read()
+        generate_instance(200, os.path.join(directory, 'again'), seed=3)
+        with open(os.path.join(directory, 'again', 'packages.csv')) as file:
+            assert file.read() == first
+
+
+def test_run():
+    with tempfile.TemporaryDirectory() as directory:
+        result = run(60, directory, starts=1, memory=True)
+        assert result['swap_miles'] > 0
+        assert result['insertion_miles'] > 0
+        assert result['shortest paths_peak_kib'] > 0
+        result = run(60, directory, max_paths=50)
+        assert 'swap_miles' not in result
+        assert 'load_seconds' in result
+
+
+if __name__ == "__main__":
+    main()
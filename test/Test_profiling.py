@@ -0,0 +1,51 @@
+import time
+
+from profiling import Profiler
+
+
+def main():
+    # run tests
+    test_spans()
+    test_profiles()
+    test_disabled()
+
+
+def test_spans():
+    profiler = Profiler(memory=True)
+    with profiler.span('load'):
+        time.sleep(0.01)
+    for repeat in range(3):
+        with profiler.span('optimize'):
+            with profiler.span('allocate'):
+                block = [0] * 100000
+            del block
+    stages = profiler.stages()
+    assert [stage['name'] for stage in stages] == ['load', 'optimize', 'allocate']
+    assert [stage['depth'] for stage in stages] == [0, 0, 1]
+    assert [stage['calls'] for stage in stages] == [1, 3, 3]
+    assert stages[0]['seconds'] >= 0.01
+    # the outer span's peak includes the inner span's allocation
+    assert stages[2]['peak_memory'] >= 800000
+    assert stages[1]['peak_memory'] >= stages[2]['peak_memory']
+    assert 'allocate' in profiler.report()
+
+
+def test_profiles():
+    profiler = Profiler(cprofile=True)
+    with profiler.span('outer'):
+        with profiler.span('inner'):
+            sorted(range(1000), key=lambda x: -x)
+    report = profiler.report()
+    assert 'Profile of outer' in report
+    assert 'Profile of inner' not in report
+
+
+def test_disabled():
+    profiler = Profiler(enabled=False)
+    with profiler.span('load'):
+        pass
+    assert profiler.spans == []
+
+
+if __name__ == "__main__":
+    main()
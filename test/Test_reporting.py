@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+
+import fromcsv
+from Routes import Routes
+from reporting import ReportWriter
+
+
+def main():
+    # run tests
+    test_statuses_csv()
+    test_statuses_jsonl()
+    test_plan_reports()
+
+
+def test_statuses_csv():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    out = io.StringIO()
+    writer = ReportWriter(out, 'csv')
+    assert writer.write_statuses(packages_pid, 1.5) == 40
+    writer.close()
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == list(ReportWriter.STATUS_FIELDS)
+    assert len(rows) == 41
+    by_pid = {row[2]: row for row in rows[1:]}
+    assert by_pid['15'] == ['status', '1.5', '15', '5', '9:00 AM', 'At hub']
+
+
+def test_statuses_jsonl():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    out = io.StringIO()
+    with ReportWriter(out, 'jsonl') as writer:
+        writer.write_statuses(packages_pid)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(records) == 40
+    assert all(record['time'] is None and record['status'] == 'At hub' for record in records)
+
+
+def test_plan_reports():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=2, capacity=16)
+    routes.plan = [[0, 5, 2, 0], [0, 21, 0]]
+    routes.loads = [5, 4]
+    routes.distances = [[0, 3.4, 2.0, 1.9], [0, 6.5, 6.5]]
+    out = io.StringIO()
+    with ReportWriter(out, 'jsonl') as writer:
+        assert writer.write_plan_summary(routes) == 2
+        assert writer.write_route_stops(routes) == 7
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[1] == {'record': 'plan', 'route': 1, 'stops': 1, 'load': 4, 'miles': 13.0, 'departure': 0}
+    assert sorted(records[-2]['packages'].split()) == ['37', '38', '5', '9']
+    assert records[-1]['total_miles'] == 13.0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+import fromcsv
+from Routes import Routes
+from service import PlanningService
+
+# the WGUPS day, as in Main
+WGUPS = {'n_routes': 4, 'capacity': 16,
+         'constraints': {'1': [4, 12, 20, 21], '0': [2, 5, 6]},
+         'ready_times': {'21': 0},
+         'departure_times': {'2': 1 + 5 / 60, '3': 2 + 20 / 60},
+         'starts': 5, 'seed': 0}
+
+
+def main():
+    # run tests
+    test_statuses()
+    test_service()
+    test_concurrent_status()
+
+
+async def fetch(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, payload = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_statuses():
+    packages_pid, packages_lid = fromcsv.import_packages()
+    routes = Routes(packages_lid, n_routes=2, capacity=16)
+    routes.plan = [[0, 1, 2, 0], [0, 3, 0]]
+    routes.distances = [[0, 2, 3, 4], [0, 9, 9]]
+    routes.set_departure_time(1, 1)
+    schedule = routes.schedule()
+    before = [package.status for pid, package in packages_pid]
+    statuses = {package.pid: (i, status) for i, package, status in routes.statuses(0.2, schedule)}
+    # 3.6 miles driven: location 1 (2 miles) is delivered, location 2 (5 miles) is not, route 1 has not left
+    for package in packages_lid.get(1):
+        assert statuses[package.pid] == (0, 'Delivered')
+    for package in packages_lid.get(2):
+        assert statuses[package.pid] == (0, 'In route')
+    for package in packages_lid.get(3):
+        assert statuses[package.pid] == (1, 'At hub')
+    # packages are not changed
+    assert [package.status for pid, package in packages_pid] == before
+    routes.set_time(0.2)
+    for package in packages_lid.get(1):
+        assert package.status == 'Delivered'
+
+
+def test_service():
+    async def scenario():
+        service = PlanningService(workers=0)
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, plan = await fetch(port, 'POST', '/plans', WGUPS)
+            assert status == 201
+            assert sorted(v for route in plan['plan'] for v in route if v) == list(range(1, 27))
+            assert {4, 12, 20, 21}.issubset(plan['plan'][1])
+            status, described = await fetch(port, 'GET', f"/plans/{plan['id']}")
+            assert status == 200 and described['cost'] == plan['cost']
+            status, early = await fetch(port, 'GET', f"/plans/{plan['id']}/status?time=0")
+            assert status == 200 and len(early['statuses']) == 40
+            assert not any(row['status'] == 'Delivered' for row in early['statuses'])
+            status, late = await fetch(port, 'GET', f"/plans/{plan['id']}/status?time=11:00%20PM")
+            assert late['time'] == 15
+            assert all(row['status'] == 'Delivered' for row in late['statuses'] if row['route'] is not None)
+            status, replanned = await fetch(port, 'POST', f"/plans/{plan['id']}/replan",
+                                            {'time': 1, 'due_times': {'9': 2}})
+            assert status == 200 and replanned['version'] == 2
+            assert sorted(v for route in replanned['plan'] for v in route if v) == list(range(1, 27))
+            assert (await fetch(port, 'GET', '/plans/99'))[0] == 404
+            assert (await fetch(port, 'GET', '/plans'))[0] == 405
+            assert (await fetch(port, 'POST', '/plans', {'n_routes': 'four'}))[0] == 400
+            assert (await fetch(port, 'GET', f"/plans/{plan['id']}/status?time=noon"))[0] == 400
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_status():
+    async def scenario():
+        service = PlanningService(workers=1)
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, plan = await fetch(port, 'POST', '/plans', dict(WGUPS, starts=1))
+            # status requests are answered while another plan is computed in the worker
+            slow = asyncio.ensure_future(fetch(port, 'POST', '/plans', dict(WGUPS, starts=200, seed=1)))
+            while service.pending == 0:
+                await asyncio.sleep(0.001)
+            clock = time.perf_counter()
+            status, statuses = await fetch(port, 'GET', f"/plans/{plan['id']}/status?time=2.5")
+            assert status == 200 and len(statuses['statuses']) == 40
+            assert time.perf_counter() - clock < 0.5
+            assert not slow.done()
+            assert (await fetch(port, 'GET', '/health'))[1]['pending'] == 1
+            status, second = await slow
+            assert status == 201 and second['id'] == '2'
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import io
+import json
+
+from benchmarks import structures
+
+
+def main():
+    # run tests
+    test_run()
+
+
+def test_run():
+    out = io.StringIO()
+    results = structures.run(sizes=[200], repeat=1)
+    benchmarks = {(result['benchmark'], result['implementation']) for result in results}
+    assert ('symbol table churn', 'HashDict') in benchmarks
+    assert ('priority queue', 'heapq') in benchmarks
+    assert ('dijkstra dense', 'Dijkstra') in benchmarks
+    for result in results:
+        assert result['seconds'] > 0
+        out.write(json.dumps(result) + "\n")
+    assert len(out.getvalue().splitlines()) == len(results)
+    # workloads are reproducible
+    assert structures.symbol_table_ops(100, structures.MIXES['churn'], 1) == \
+        structures.symbol_table_ops(100, structures.MIXES['churn'], 1)
+
+
+if __name__ == "__main__":
+    main()